@@ -0,0 +1,146 @@
+#barridos de parámetros sin consola: cada combinación (flota x clientes x parámetros de config.py)
+#se simula en paralelo y sale una única tabla de resultados
+import argparse             #parámetros por línea de comandos
+import csv                  #tabla de resultados
+import itertools            #producto cartesiano de las listas del barrido
+import json                 #fichero de barrido y salida .json
+import sys                  #progreso por stderr y tabla por stdout
+
+from typing import Dict, List
+
+import numpy as np
+
+import config
+from montecarlo import (METRICAS, MOTORES, Corrida, ejecutar, parse_override, parse_valor, run_seed,
+                        semilla_lote)
+
+
+#columnas de cada fila además de los parámetros de la celda
+COLUMNAS = ("corridas",) + METRICAS + ("segundos",)
+
+
+def celdas(taxis: List[int], clientes: List[int], barrer: Dict[str, list]) -> List[dict]:
+    #producto cartesiano: cada celda es {"n_taxis", "n_clients", NOMBRE: valor, ...}
+    nombres = list(barrer)
+    out = []
+    for n_taxis, n_clients, *valores in itertools.product(taxis, clientes, *(barrer[n] for n in nombres)):
+        celda = {"n_taxis": n_taxis, "n_clients": n_clients}
+        celda.update(zip(nombres, valores))
+        out.append(celda)
+    return out
+
+
+def lote(lista: List[dict], semilla: int, repeticiones: int, motor: str,
+         fijos: Dict[str, object]) -> List[Corrida]:
+    """
+    Corridas de todas las celdas (repeticiones por celda), con run_id = posición en el lote.
+    La repetición r usa la misma semilla en todas las celdas: las diferencias entre celdas
+    salen de los parámetros y no del azar. Un SEMILLA en fijos o en la celda hace de semilla maestra
+    de sus repeticiones.
+    """
+    out = []
+    for celda in lista:
+        overrides = dict(fijos)
+        overrides.update((k, v) for k, v in celda.items() if k not in ("n_taxis", "n_clients"))
+        for nombre in overrides:
+            if not nombre.isupper() or not hasattr(config, nombre):
+                raise KeyError(f"Parámetro desconocido: {nombre}")
+        semilla_celda, overrides = semilla_lote(semilla, overrides)
+        for r in range(repeticiones):
+            out.append(Corrida(len(out), run_seed(semilla_celda, r), celda["n_taxis"], celda["n_clients"],
+                               overrides, motor))
+    return out
+
+
+def tabla(lista: List[dict], repeticiones: int, resultados: List[dict]) -> List[dict]:
+    #una fila por celda: sus parámetros y la media de cada métrica sobre sus repeticiones
+    por_celda = [[] for _ in lista]
+    for r in resultados:
+        por_celda[r["run_id"] // repeticiones].append(r)
+    filas = []
+    for celda, rs in zip(lista, por_celda):
+        fila = dict(celda)
+        fila["corridas"] = len(rs)
+        for m in METRICAS + ("segundos",):
+            fila[m] = float(np.mean([r[m] for r in rs])) if rs else 0.0
+        filas.append(fila)
+    return filas
+
+
+def escribir(filas: List[dict], path: str = None) -> None:
+    #CSV (por stdout si no hay ruta) o JSON si la ruta acaba en .json
+    if path and path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(filas, fh, indent=2)
+        return
+    campos = list(filas[0]) if filas else ["n_taxis", "n_clients", *COLUMNAS]
+    fh = open(path, "w", newline="", encoding="utf-8") if path else sys.stdout
+    try:
+        w = csv.DictWriter(fh, fieldnames=campos)
+        w.writeheader()
+        w.writerows(filas)
+    finally:
+        if path:
+            fh.close()
+
+
+def parse_barrer(texto: str):
+    #"NOMBRE=v1,v2,..." -> (NOMBRE, [valores con el tipo de config])
+    nombre, _, valores = texto.partition("=")
+    return nombre, [parse_valor(nombre, v) for v in valores.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Barrido de parámetros sin consola: simula cada combinación en paralelo "
+                    "y escribe una tabla con una fila por combinación.")
+    parser.add_argument("--fichero", default=None,
+                        help="barrido en JSON: taxis, clientes, semilla, motor, repeticiones, "
+                             "set {NOMBRE: valor} y barrer {NOMBRE: [valores]}; "
+                             "lo que se pase por línea de comandos manda")
+    parser.add_argument("--taxis", type=int, nargs="+", default=None)
+    parser.add_argument("--clientes", type=int, nargs="+", default=None)
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--motor", choices=MOTORES, default=None)
+    parser.add_argument("--repeticiones", type=int, default=None, help="días por celda")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--set", action="append", default=[], metavar="NOMBRE=valor",
+                        help="cambia un parámetro de config.py en todas las celdas (se puede repetir)")
+    parser.add_argument("--barrer", action="append", default=[], metavar="NOMBRE=v1,v2",
+                        help="valores de un parámetro de config.py a barrer (se puede repetir)")
+    parser.add_argument("--salida", default=None, help="CSV o .json (por defecto, CSV por stdout)")
+    args = parser.parse_args()
+
+    spec = {}
+    if args.fichero:
+        with open(args.fichero, encoding="utf-8") as fh:
+            spec = json.load(fh)
+    taxis = args.taxis or spec.get("taxis", [50])
+    clientes = args.clientes or spec.get("clientes", [200])
+    semilla = args.semilla if args.semilla is not None else spec.get("semilla", 1)
+    motor = args.motor or spec.get("motor", "eventos")
+    repeticiones = args.repeticiones or spec.get("repeticiones", 1)
+    fijos = dict(spec.get("set", {}))
+    fijos.update(parse_override(t) for t in args.set)
+    barrer = dict(spec.get("barrer", {}))
+    barrer.update(parse_barrer(t) for t in args.barrer)
+
+    lista = celdas(taxis, clientes, barrer)
+    corridas = lote(lista, semilla, repeticiones, motor, fijos)
+    print(f"{len(lista)} celdas x {repeticiones} repeticiones = {len(corridas)} corridas ({motor})",
+          file=sys.stderr)
+
+    resultados = []
+    for r in ejecutar(corridas, args.procesos):
+        resultados.append(r)
+        print(f"[{len(resultados):>4}/{len(corridas)}] taxis {r['n_taxis']:>6} | clientes {r['n_clients']:>6} | "
+              f"{r['overrides']} | servicios {r['services']:>6} | fallidas {r['failed']:>6} | "
+              f"{r['segundos']:.1f} s", file=sys.stderr)
+
+    escribir(tabla(lista, repeticiones, resultados), args.salida)
+    if args.salida:
+        print(f"Tabla guardada en {args.salida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
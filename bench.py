@@ -0,0 +1,450 @@
+#benchmarks de despacho: assign_taxi, finish_trip, taxi_status_snapshot y días completos
+import argparse             #parámetros por línea de comandos
+import json                 #resultados legibles por máquina
+import math                 #distancia de la referencia con diccionarios
+import platform             #info de la máquina en los resultados
+import random               #puntos de consulta
+import sys                  #código de salida si hay regresión
+import threading            #semáforo de la referencia con diccionarios
+import time                 #perf_counter_ns
+import tracemalloc          #memoria por taxi
+
+from typing import Dict, List
+
+import numpy as np
+
+import config
+from fleet import Fleet
+from sistema import Sistema
+from cliente import ClienteBase
+from simulador import SimuladorEventos
+from despacho import Despachador
+import unietaxi
+from main import simular_hilos
+
+
+FLEET_SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+FREE_RATIOS = (1.0, 0.5, 0.1)
+DAY_CLIENTS = (100, 500, 2_000)
+ESPERA_SIZES = (1_000, 10_000)               #clientes esperando
+REBALANCEO_DAYS = ((200, 600), (1_000, 2_000))    #(taxis, clientes)
+BATCH_SIZES = (1, 10, 100, 1_000)
+
+
+def _result(name: str, value: float, unit: str, better: str) -> dict:
+    #better = "lower" (latencias) o "higher" (rendimiento)
+    return {"name": name, "value": value, "unit": unit, "better": better}
+
+
+def _sistema(n_taxis: int, free_ratio: float, concurrent: bool) -> Sistema:
+    #flota aleatoria con una fracción de taxis ya ocupados
+    fleet = Fleet.random(n_taxis, config.MAP_MIN, config.MAP_MAX)
+    n_busy = int(round(n_taxis * (1.0 - free_ratio)))
+    fleet.free[:n_busy] = False
+    return Sistema(fleet, verbose=False, concurrent=concurrent)
+
+
+def _percentiles(ns: List[int]) -> Dict[str, float]:
+    us = np.array(ns, dtype=np.float64) / 1000.0
+    return {"mean": float(us.mean()), "p50": float(np.percentile(us, 50)), "p99": float(np.percentile(us, 99))}
+
+
+def bench_dispatch(n_taxis: int, free_ratio: float, ops: int, concurrent: bool) -> List[dict]:
+    """
+    assign_taxi + finish_trip en bucle: cada taxi asignado se libera en otro punto,
+    así la proporción de libres se mantiene durante toda la medida.
+    """
+    sistema = _sistema(n_taxis, free_ratio, concurrent)
+    rp = sistema.rand_point
+    assign_ns = []
+    finish_ns = []
+    clock = time.perf_counter_ns
+
+    t_total = clock()
+    for k in range(ops):
+        ox, oy = rp()
+        t0 = clock()
+        taxi = sistema.assign_taxi(k, ox, oy)
+        assign_ns.append(clock() - t0)
+        if taxi is not None:
+            dx, dy = rp()
+            t0 = clock()
+            sistema.finish_trip(taxi, dx, dy, 10.0, 3)
+            finish_ns.append(clock() - t0)
+    elapsed = (clock() - t_total) / 1e9
+
+    tag = f"n={n_taxis},free={free_ratio}"
+    a = _percentiles(assign_ns)
+    out = [
+        _result(f"assign_taxi.mean_us[{tag}]", a["mean"], "us", "lower"),
+        _result(f"assign_taxi.p50_us[{tag}]", a["p50"], "us", "lower"),
+        _result(f"assign_taxi.p99_us[{tag}]", a["p99"], "us", "lower"),
+        _result(f"dispatch.ops_per_s[{tag}]", ops / elapsed, "ops/s", "higher"),
+    ]
+    if finish_ns:
+        out.append(_result(f"finish_trip.mean_us[{tag}]", _percentiles(finish_ns)["mean"], "us", "lower"))
+    return out
+
+
+def bench_snapshot(n_taxis: int, reps: int) -> List[dict]:
+    #taxi_status_snapshot tras un cambio (reconstruye) y sin cambios (caché)
+    sistema = _sistema(n_taxis, 0.5, concurrent=False)
+    rebuild_ns = []
+    cached_ns = []
+    clock = time.perf_counter_ns
+    for k in range(reps):
+        taxi = sistema.assign_taxi(k, *sistema.rand_point())
+        if taxi is not None:
+            sistema.finish_trip(taxi, *sistema.rand_point(), 10.0, 3)
+        t0 = clock()
+        sistema.taxi_status_snapshot()
+        rebuild_ns.append(clock() - t0)
+        t0 = clock()
+        sistema.taxi_status_snapshot()
+        cached_ns.append(clock() - t0)
+    return [
+        _result(f"snapshot.rebuild_us[n={n_taxis}]", _percentiles(rebuild_ns)["mean"], "us", "lower"),
+        _result(f"snapshot.cached_us[n={n_taxis}]", _percentiles(cached_ns)["mean"], "us", "lower"),
+    ]
+
+
+def bench_batch(n_taxis: int, batch: int, ops: int) -> List[dict]:
+    #despachador central: peticiones emparejadas por segundo según el tamaño del lote
+    sistema = _sistema(n_taxis, 1.0, concurrent=False)
+    desp = Despachador(sistema)
+    rp = sistema.rand_point
+    done = 0
+    elapsed = 0.0
+    while done < ops:
+        sols = [desp.submit(done + k, *rp()) for k in range(batch)]
+        t0 = time.perf_counter()
+        desp.despachar()
+        elapsed += time.perf_counter() - t0
+        done += batch
+
+        #los taxis asignados vuelven a quedar libres en otro punto
+        for sol in sols:
+            if sol.future.done():
+                sistema.finish_trip(sol.future.result(), *rp(), 10.0, 3)
+    return [_result(f"batch.req_per_s[n={n_taxis},batch={batch}]", desp.matched / elapsed, "req/s", "higher")]
+
+
+def bench_day(n_clients: int) -> List[dict]:
+    #un día completo con el motor de eventos; una flota de un taxi por cada 5 clientes
+    n_taxis = max(1, n_clients // 5)
+    sistema = Sistema(Fleet.random(n_taxis, config.MAP_MIN, config.MAP_MAX), verbose=False, concurrent=False)
+    clients = [ClienteBase(sistema, client_id=i + 1) for i in range(n_clients)]
+    t0 = time.perf_counter()
+    SimuladorEventos(sistema, clients).run()
+    elapsed = time.perf_counter() - t0
+    trips = int(sistema.taxis.services.sum())
+    tag = f"clients={n_clients},taxis={n_taxis}"
+    return [
+        _result(f"day.wall_s[{tag}]", elapsed, "s", "lower"),
+        _result(f"day.trips_per_s[{tag}]", trips / elapsed, "trips/s", "higher"),
+    ]
+
+
+def bench_day_hilos(n_clients: int) -> List[dict]:
+    #el mismo día en modo hilos con el reloj rápido (barrera: el minuto pasa cuando todos están parados)
+    n_taxis = max(1, n_clients // 5)
+    previos = config.aplicar({"RELOJ_BARRERA": True, "RELOJ_RAPIDO": True})
+    try:
+        sistema = Sistema(Fleet.random(n_taxis, config.MAP_MIN, config.MAP_MAX), verbose=False)
+        t0 = time.perf_counter()
+        simular_hilos(sistema, n_clients)
+        elapsed = time.perf_counter() - t0
+    finally:
+        config.aplicar(previos)
+    trips = int(sistema.taxis.services.sum())
+    tag = f"clients={n_clients},taxis={n_taxis}"
+    return [
+        _result(f"day_hilos.wall_s[{tag}]", elapsed, "s", "lower"),
+        _result(f"day_hilos.trips_per_s[{tag}]", trips / elapsed, "trips/s", "higher"),
+    ]
+
+
+def bench_rebalanceo(n_taxis: int, n_clients: int, semilla: int = 1) -> List[dict]:
+    """
+    El mismo día con y sin rebalanceo (radio de 1 km): asignaciones por minuto y búsquedas por viaje.
+    Las dos corridas salen de la misma flota y de la misma semilla de clientes:
+    la única diferencia entre ellas es el rebalanceo.
+    """
+    tag = f"clients={n_clients},taxis={n_taxis}"
+    fleet = Fleet.random(n_taxis, config.MAP_MIN, config.MAP_MAX, semilla)
+    results = []
+    for nombre, every in (("sin", 0), ("con", 5)):
+        previos = config.aplicar({"REBALANCEO_MINUTES": every, "SEARCH_RADIUS_KM": 1.0})
+        try:
+            sistema = Sistema(fleet.snapshot(), verbose=False, concurrent=False, semilla=semilla)
+            SimuladorEventos(sistema, [ClienteBase(sistema, client_id=i + 1) for i in range(n_clients)]).run()
+        finally:
+            config.aplicar(previos)
+        se = sistema.series
+        trips = max(1, int(sistema.taxis.services.sum()))
+        results += [
+            _result(f"rebalanceo.{nombre}.assigned_per_min[{tag}]", se.total_assigned / config.DAY_MINUTES,
+                    "assign/min", "higher"),
+            _result(f"rebalanceo.{nombre}.scans_per_trip[{tag}]", (se.total_assigned + se.total_failed) / trips,
+                    "scans/trip", "lower"),
+        ]
+    return results
+
+
+def bench_red(n_taxis: int, ops: int) -> List[dict]:
+    """
+    assign_taxi con y sin red de calles sobre la misma flota y los mismos puntos, alternando
+    una asignación de cada para que el ruido de la máquina caiga igual en las dos:
+    la razón de medianas vigila que la red no frene el despacho.
+    """
+    fleet = Fleet.random(n_taxis, config.MAP_MIN, config.MAP_MAX)
+    sistemas = []
+    for red in (False, True):
+        previos = config.aplicar({"RED_VIARIA": red})
+        try:
+            sistemas.append(Sistema(fleet.snapshot(), verbose=False, concurrent=False))
+        finally:
+            config.aplicar(previos)
+    rp = Sistema.rand_point
+    ns = ([], [])
+    clock = time.perf_counter_ns
+    for k in range(ops):
+        o = rp()
+        d = rp()
+        for j in ((0, 1) if k % 2 else (1, 0)):
+            t0 = clock()
+            taxi = sistemas[j].assign_taxi(k, *o)
+            ns[j].append(clock() - t0)
+            if taxi is not None:
+                sistemas[j].finish_trip(taxi, *d, 10.0, 3)
+    recta, red = (_percentiles(x)["p50"] for x in ns)
+    return [_result(f"red.assign_p50_ratio[n={n_taxis}]", red / recta, "x", "lower")]
+
+
+def bench_distancia(ops: int) -> List[dict]:
+    #una distancia suelta (la del viaje y la tarifa) en línea recta y por la red de calles
+    pts = [Sistema.rand_point() + Sistema.rand_point() for _ in range(ops)]
+    out = []
+    for nombre, red in (("recta", False), ("red", True)):
+        previos = config.aplicar({"RED_VIARIA": red})
+        try:
+            distancia = Sistema(Fleet(0), verbose=False, concurrent=False).distancia
+        finally:
+            config.aplicar(previos)
+        t0 = time.perf_counter_ns()
+        for p in pts:
+            distancia(*p)
+        out.append(_result(f"distancia.{nombre}_us", (time.perf_counter_ns() - t0) / ops / 1000, "us", "lower"))
+    return out
+
+
+def bench_espera(n_waiting: int, ops: int) -> List[dict]:
+    #wake_near con la sala llena (un día de 2000 clientes tiene unos 1000 esperando):
+    #por cada cliente despertado entra otro, así la sala no se vacía
+    sala = Sistema(Fleet(0), verbose=False, concurrent=False).waiting
+    for i in range(n_waiting):
+        sala.park(i, *Sistema.rand_point())
+    pts = [Sistema.rand_point() for _ in range(ops)]
+    elapsed = 0
+    for i, p in enumerate(pts):
+        t0 = time.perf_counter_ns()
+        sala.wake_near(*p)
+        elapsed += time.perf_counter_ns() - t0
+        sala.park(n_waiting + i, *Sistema.rand_point())
+    return [_result(f"espera.wake_near_us[waiting={n_waiting}]", elapsed / ops / 1000, "us", "lower")]
+
+
+def _taxis_dict(n_taxis: int) -> list:
+    #flota como la creaba la antigua unietaxi.py: un diccionario por taxi
+    return [{"id": i, "x": random.uniform(config.MAP_MIN, config.MAP_MAX),
+             "y": random.uniform(config.MAP_MIN, config.MAP_MAX), "free": True, "current_client": None,
+             "services": 0, "earnings": 0.0, "rating_sum": 0.0, "rating_count": 0}
+            for i in range(1, n_taxis + 1)]
+
+
+def _asignar_dict(taxis: list, sem, client_id: int, ox: float, oy: float):
+    #asignación de la antigua unietaxi.py (un semáforo global y recorrido de toda la flota)
+    sem.acquire()
+    try:
+        candidates = []
+        for t in taxis:
+            if not t["free"]:
+                continue
+            d = math.dist((ox, oy), (t["x"], t["y"]))
+            if d <= config.SEARCH_RADIUS_KM:
+                rating_avg = (t["rating_sum"] / t["rating_count"]) if t["rating_count"] else 0.0
+                candidates.append((round(d, 6), -rating_avg, t["id"], t))
+        if not candidates:
+            return None
+        candidates.sort()
+        chosen = candidates[0][3]
+        chosen["free"] = False
+        chosen["current_client"] = client_id
+        return chosen
+    finally:
+        sem.release()
+
+
+def _bytes(build) -> int:
+    #memoria que queda reservada tras build() (lo que devuelve se mantiene vivo hasta medir)
+    tracemalloc.start()
+    try:
+        obj = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del obj
+    return size
+
+
+def bench_unietaxi(n_taxis: int, ops: int) -> List[dict]:
+    """
+    unietaxi.py antes (taxis en diccionarios, semáforo global) y ahora (lanzador sobre Sistema):
+    asignación + liberación y memoria por taxi. La versión antigua se reproduce aquí como referencia.
+    """
+    tag = f"n={n_taxis}"
+    sem = threading.Semaphore(1)
+    taxis = _taxis_dict(n_taxis)
+    rp = Sistema.rand_point
+    clock = time.perf_counter_ns
+    legacy_ops = min(ops, max(20, 2_000_000 // n_taxis))
+    legacy_ns = []
+    for k in range(legacy_ops):
+        t0 = clock()
+        taxi = _asignar_dict(taxis, sem, k, *rp())
+        legacy_ns.append(clock() - t0)
+        if taxi is not None:
+            taxi["free"] = True
+            taxi["current_client"] = None
+            taxi["x"], taxi["y"] = rp()
+
+    sistema = unietaxi.crear_sistema(n_taxis)
+    try:
+        assign_ns = []
+        for k in range(ops):
+            ox, oy = rp()
+            t0 = clock()
+            taxi = sistema.assign_taxi(k, ox, oy)
+            assign_ns.append(clock() - t0)
+            if taxi is not None:
+                sistema.finish_trip(taxi, *rp(), 10.0, 3)
+    finally:
+        sistema.close_events()
+
+    def build_sistema():
+        s = unietaxi.crear_sistema(n_taxis)
+        s.close_events()
+        return s
+
+    return [
+        _result(f"unietaxi.legacy_assign_us[{tag}]", _percentiles(legacy_ns)["mean"], "us", "lower"),
+        _result(f"unietaxi.assign_us[{tag}]", _percentiles(assign_ns)["mean"], "us", "lower"),
+        _result(f"unietaxi.legacy_bytes_per_taxi[{tag}]", _bytes(lambda: _taxis_dict(n_taxis)) / n_taxis,
+                "B", "lower"),
+        _result(f"unietaxi.bytes_per_taxi[{tag}]", _bytes(build_sistema) / n_taxis, "B", "lower"),
+    ]
+
+
+def run_all(sizes, ratios, day_clients, ops: int, concurrent: bool) -> List[dict]:
+    results = []
+    for n in sizes:
+        for r in ratios:
+            print(f"assign/finish n={n} free={r}", file=sys.stderr)
+            results += bench_dispatch(n, r, ops, concurrent)
+        print(f"snapshot n={n}", file=sys.stderr)
+        results += bench_snapshot(n, max(3, min(200, 2_000_000 // n)))
+        if n <= 100_000:
+            print(f"unietaxi n={n}", file=sys.stderr)
+            results += bench_unietaxi(n, ops)
+        if 1_000 <= n <= 100_000:
+            print(f"red n={n}", file=sys.stderr)
+            results += bench_red(n, ops)
+        if n >= 1_000:
+            for b in BATCH_SIZES:
+                print(f"batch n={n} batch={b}", file=sys.stderr)
+                results += bench_batch(n, b, max(ops, b))
+    print("distancia", file=sys.stderr)
+    results += bench_distancia(ops)
+    for n in ESPERA_SIZES:
+        print(f"espera waiting={n}", file=sys.stderr)
+        results += bench_espera(n, ops)
+    for n_taxis, n_clients in REBALANCEO_DAYS:
+        print(f"rebalanceo taxis={n_taxis} clients={n_clients}", file=sys.stderr)
+        results += bench_rebalanceo(n_taxis, n_clients)
+    for c in day_clients:
+        print(f"day clients={c}", file=sys.stderr)
+        results += bench_day(c)
+        print(f"day hilos clients={c}", file=sys.stderr)
+        results += bench_day_hilos(c)
+    return results
+
+
+def compare(results: List[dict], baseline: List[dict], threshold: float) -> List[str]:
+    #métricas que empeoran más que threshold (fracción) respecto a la línea base
+    base = {r["name"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get(r["name"])
+        if b is None or b["value"] == 0:
+            continue
+        change = (r["value"] - b["value"]) / b["value"]
+        worse = change > threshold if r["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append(f"{r['name']}: {b['value']:.3f} -> {r['value']:.3f} {r['unit']} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de despacho.")
+    parser.add_argument("--salida", default="bench_results.json", help="fichero JSON de resultados")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="resultados de referencia")
+    parser.add_argument("--guardar-baseline", action="store_true", help="guarda estos resultados como referencia")
+    parser.add_argument("--umbral", type=float, default=0.20, help="regresión tolerada (0.20 = 20%%)")
+    parser.add_argument("--ops", type=int, default=2000, help="asignaciones por medida")
+    parser.add_argument("--max-taxis", type=int, default=FLEET_SIZES[-1])
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--concurrent", action="store_true", help="semáforos de modo hilos en vez de Lock")
+    parser.add_argument("--red-viaria", action="store_true", help="distancias por calles (config.RED_VIARIA)")
+    args = parser.parse_args()
+    config.RED_VIARIA = args.red_viaria
+
+    random.seed(args.semilla)
+    sizes = [n for n in FLEET_SIZES if n <= args.max_taxis]
+    results = run_all(sizes, FREE_RATIOS, DAY_CLIENTS, args.ops, args.concurrent)
+
+    doc = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": args.semilla,
+        "red_viaria": args.red_viaria,
+        "results": results,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    for r in results:
+        print(f"{r['name']:<60} {r['value']:>14.3f} {r['unit']}")
+
+    if args.guardar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+        print(f"\nLínea base guardada en {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    except FileNotFoundError:
+        print(f"\nSin línea base ({args.baseline}); usa --guardar-baseline para crearla.")
+        return
+
+    regressions = compare(results, baseline, args.umbral)
+    if regressions:
+        print(f"\nREGRESIONES (> {args.umbral:.0%}):")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print(f"\nSin regresiones respecto a {args.baseline} (umbral {args.umbral:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#guardar y reanudar una simulación del motor de eventos
+import functools            #aviso de la sala de espera para las peticiones al despachador
+import json                 #días ya sellados de los agregados
+import os                   #reemplazo atómico del fichero
+import random               #estado del generador global
+
+from typing import Optional
+
+import numpy as np
+
+from series import COLUMNAS
+from fleet import Fleet
+from sistema import Sistema
+from cliente import ClienteBase, EN_VIAJE
+from espera import Espera
+from despacho import Solicitud
+from eventos import EventSink
+from simulador import SimuladorEventos
+
+
+VERSION = 6
+
+#campos de la flota que se guardan tal cual (los mismos que lee Fleet)
+CAMPOS_FLOTA = Fleet.FIELDS
+
+#campos de cada cliente (se guardan como columnas)
+CAMPOS_CLIENTE = ("client_id", "trips", "failed", "fase", "ox", "oy", "dx", "dy", "distance", "trip_start", "trip_end")
+
+#agregados y serie por minuto
+CAMPOS_STATS = ("hour_services", "hour_earnings", "hour_rating_sum", "zone_services", "zone_earnings")
+CAMPOS_SERIE = COLUMNAS
+
+#posición en la cola de un cliente que no está en ella
+NO_AGENDA = -1
+
+MASK64 = (1 << 64) - 1
+
+#en qué está parado un cliente que espera taxi (columna c_pendiente)
+SIN_PENDIENTE, PENDIENTE_ESPERA, PENDIENTE_SOLICITUD = 0, 1, 2
+
+
+def guardar(sim: SimuladorEventos, path: str) -> None:
+    """
+    Foto binaria (.npz sin comprimir) del estado en un minuto cerrado:
+    - reloj, day_finished, services_active, semilla maestra y estado de random
+    - arrays de la flota, agregados (con los días ya sellados) y serie por minuto
+    - cada cliente: contadores, fase, viaje en curso, minuto en que le toca seguir
+      y su flujo aleatorio (generador y lo que queda del bloque)
+    - los que esperan taxi: su orden de llegada a la sala de espera (o el taxi que
+      el despachador ya les dio)
+    - mapa de calor de la demanda, próximo rebalanceo y taxis que van de camino (si está activo)
+    Se escribe en un temporal y se renombra, así nunca queda un fichero a medias.
+    """
+    s = sim.sistema
+    f = s.taxis
+    clientes = sim.clientes
+
+    wake = np.full(len(clientes), NO_AGENDA, dtype=np.int64)
+    order = np.full(len(clientes), NO_AGENDA, dtype=np.int64)
+    for pos, (minute, idx) in enumerate(sim.agenda()):
+        wake[idx] = minute
+        order[idx] = pos
+
+    #orden de llegada de los que siguen en la sala de espera
+    s.waiting.sem.acquire()
+    try:
+        seqs = {e.client_id: e.seq for bucket in s.waiting._cells.values() for e in bucket}
+    finally:
+        s.waiting.sem.release()
+
+    taxi = np.array([-1 if c.taxi is None else c.taxi.index for c in clientes], dtype=np.int64)
+    pendiente = np.full(len(clientes), SIN_PENDIENTE, dtype=np.int64)
+    wait_seq = np.full(len(clientes), -1, dtype=np.int64)
+    intentos = np.zeros(len(clientes), dtype=np.int64)
+    for idx, p in enumerate(sim.pendientes):
+        if p is None:
+            continue
+        wait_seq[idx] = seqs.get(p.client_id, -1)
+        if isinstance(p, Espera):
+            pendiente[idx] = PENDIENTE_ESPERA
+        else:
+            pendiente[idx] = PENDIENTE_SOLICITUD
+            intentos[idx] = p.intentos
+            if p.future.done() and p.future.result() is not None:
+                taxi[idx] = p.future.result().index
+
+    data = {
+        "meta": np.array([VERSION, s.current_minute, int(s.day_finished), s.services_active], dtype=np.int64),
+        "c_wake": wake,
+        "c_order": order,
+        "c_taxi": taxi,
+        "c_pendiente": pendiente,
+        "c_wait_seq": wait_seq,
+        "c_intentos": intentos,
+    }
+    for campo in CAMPOS_FLOTA:
+        data["f_" + campo] = getattr(f, campo)
+    for campo in CAMPOS_CLIENTE:
+        data["c_" + campo] = np.array([getattr(c, campo) for c in clientes])
+    data.update(_guardar_flujos(clientes))
+    data["semilla"] = np.array(str(s.semilla))
+
+    st = s.stats
+    for campo in CAMPOS_STATS:
+        data["s_" + campo] = getattr(st, campo)
+    data["s_totals"] = np.array([st.services, st.total_earnings, st.rating_sum], dtype=np.float64)
+    data["s_day"] = np.array([st.day, st.day_start, st.day_services], dtype=np.int64)
+    data["s_day_sums"] = np.array([st.day_earnings, st.day_rating_sum], dtype=np.float64)
+    data["s_dias"] = np.array(json.dumps(st.dias))
+
+    data["k_demanda"] = s.demanda.calor if s.demanda is not None else np.zeros((0, 0))
+    data["k_rebalanceo"] = np.array([s.next_rebalance, s.rebalanced], dtype=np.int64)
+    data["k_en_camino"] = np.array([(llegada, i, x, y) for llegada, grupo in s.en_camino.items()
+                                    for i, x, y in grupo], dtype=np.float64).reshape(-1, 4)
+
+    se = s.series
+    for campo in CAMPOS_SERIE:
+        data["m_" + campo] = getattr(se, campo)
+    data["m_state"] = np.array([se.rows, se.next_minute, se._assigned, se._failed,
+                                se.total_assigned, se.total_failed], dtype=np.int64)
+    data["m_sums"] = np.array([se._pickup_sum, se._revenue], dtype=np.float64)
+
+    version, internal, gauss = random.getstate()
+    data["rng"] = np.array(internal, dtype=np.uint32)
+    data["rng_gauss"] = np.array([np.nan if gauss is None else gauss, version], dtype=np.float64)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        np.savez(fh, **data)
+    os.replace(tmp, path)
+
+
+def cargar(path: str, sink: Optional[EventSink] = None, verbose: bool = False) -> SimuladorEventos:
+    """
+    Rehace Sistema, clientes y cola de eventos desde un fichero de guardar().
+    Devuelve el simulador listo para run(): los viajes en curso terminan en su minuto,
+    los clientes siguen desde su fase y los que esperaban taxi vuelven a la sala de espera
+    en su orden de llegada.
+    """
+    with np.load(path) as z:
+        data = {k: z[k] for k in z.files}
+
+    version, minute, day_finished, services_active = data["meta"].tolist()
+    if version != VERSION:
+        raise ValueError(f"Versión de checkpoint no soportada: {version}")
+
+    fleet = Fleet(len(data["f_id"]))
+    for campo in CAMPOS_FLOTA:
+        getattr(fleet, campo)[:] = data["f_" + campo]
+
+    s = Sistema(fleet, verbose=verbose, concurrent=False, sink=sink)
+    s.semilla = int(str(data["semilla"]))
+    s.current_minute = minute
+    s.day_finished = bool(day_finished)
+    s.services_active = services_active
+    if s.day_finished:
+        s.release_waiters()
+
+    #agregados: cubetas tal cual y top-k rehecho con los valores actuales de la flota
+    st = s.stats
+    for campo in CAMPOS_STATS:
+        getattr(st, campo)[:] = data["s_" + campo]
+    services, st.total_earnings, st.rating_sum = data["s_totals"].tolist()
+    st.services = int(services)
+    st.day, st.day_start, st.day_services = data["s_day"].tolist()
+    st.day_earnings, st.day_rating_sum = data["s_day_sums"].tolist()
+    st.dias = json.loads(str(data["s_dias"]))
+    #demanda reciente (si el checkpoint la tiene y el rebalanceo sigue activo con la misma rejilla)
+    if s.demanda is not None and data["k_demanda"].shape == s.demanda.calor.shape:
+        s.demanda.calor[:] = data["k_demanda"]
+        s.next_rebalance, s.rebalanced = data["k_rebalanceo"].tolist()
+        #los que iban de camino salen otra vez de la rejilla hasta su llegada
+        for llegada, i, x, y in data["k_en_camino"].tolist():
+            s.free_grid.remove(int(i))
+            s.en_camino.setdefault(int(llegada), []).append((int(i), x, y))
+
+    rated = np.flatnonzero(fleet.rating_count > 0)
+    for i, g, r in zip(rated.tolist(), fleet.earnings[rated].tolist(), fleet.rating_avg(rated).tolist()):
+        st.earnings.update(i, g)
+        st.rating.update(i, r)
+
+    se = s.series
+    for campo in CAMPOS_SERIE:
+        getattr(se, campo)[:] = data["m_" + campo]
+    se.rows, se.next_minute, se._assigned, se._failed, se.total_assigned, se.total_failed = data["m_state"].tolist()
+    se._pickup_sum, se._revenue = data["m_sums"].tolist()
+
+    clientes = []
+    columnas = {campo: data["c_" + campo].tolist() for campo in CAMPOS_CLIENTE}
+    taxis = data["c_taxi"].tolist()
+    for k in range(len(taxis)):
+        c = ClienteBase(s, columnas["client_id"][k])
+        for campo in CAMPOS_CLIENTE[1:]:
+            setattr(c, campo, columnas[campo][k])
+        if c.fase == EN_VIAJE:
+            c.taxi = fleet[taxis[k]]
+        clientes.append(c)
+    _cargar_flujos(clientes, data)
+
+    pendientes = _pendientes(s, clientes, data)
+
+    wake = data["c_wake"]
+    queued = np.flatnonzero(data["c_order"] != NO_AGENDA)
+    queued = queued[np.argsort(data["c_order"][queued])]
+    agenda = list(zip(wake[queued].tolist(), queued.tolist()))
+
+    internal = tuple(int(v) for v in data["rng"])
+    gauss, rng_version = data["rng_gauss"].tolist()
+    random.setstate((int(rng_version), internal, None if np.isnan(gauss) else gauss))
+
+    return SimuladorEventos(s, clientes, agenda, pendientes)
+
+
+def _guardar_flujos(clientes: list) -> dict:
+    """
+    Flujos aleatorios de los clientes como columnas:
+    - c_rng: una fila por cliente con el PCG64 partido en uint64 (state, inc) y sus dos campos sueltos
+    - c_buf / c_nbuf: lo que queda de los bloques de todos, seguido, y cuántos valores son de cada uno
+    """
+    gens = np.zeros((len(clientes), 6), dtype=np.uint64)
+    bufs = []
+    lens = np.zeros(len(clientes), dtype=np.int64)
+    for k, c in enumerate(clientes):
+        (state, inc, has_uint32, uinteger), buf = c.azar.estado()
+        gens[k] = (state & MASK64, state >> 64, inc & MASK64, inc >> 64, has_uint32, uinteger)
+        bufs.extend(buf)
+        lens[k] = len(buf)
+    return {"c_rng": gens, "c_buf": np.array(bufs, dtype=np.float64), "c_nbuf": lens}
+
+
+def _cargar_flujos(clientes: list, data: dict) -> None:
+    #inverso de _guardar_flujos
+    gens = data["c_rng"].tolist()
+    bufs = data["c_buf"].tolist()
+    ends = np.cumsum(data["c_nbuf"]).tolist()
+    for k, c in enumerate(clientes):
+        lo, hi, inc_lo, inc_hi, has_uint32, uinteger = gens[k]
+        c.azar.restaurar([lo | (hi << 64), inc_lo | (inc_hi << 64), has_uint32, uinteger],
+                         bufs[(ends[k - 1] if k else 0):ends[k]])
+
+
+def _pendientes(s: Sistema, clientes: list, data: dict) -> dict:
+    """
+    Rehace la Espera / Solicitud de cada cliente que esperaba taxi:
+    - los que seguían en la sala vuelven a ella en su orden de llegada original
+    - una Espera ya despertada queda despierta (el cliente está en la cola)
+    - una Solicitud resuelta vuelve con su taxi; una despertada vuelve a la cola del despachador
+    """
+    fleet = s.taxis
+    desp = s.despachador
+    kind = data["c_pendiente"].tolist()
+    seq = data["c_wait_seq"].tolist()
+    intentos = data["c_intentos"].tolist()
+    taxis = data["c_taxi"].tolist()
+
+    out = {}
+    for idx in np.flatnonzero(data["c_pendiente"] != SIN_PENDIENTE).tolist():
+        c = clientes[idx]
+        if kind[idx] == PENDIENTE_ESPERA:
+            out[idx] = Espera(c.client_id, c.ox, c.oy, -1, s.waiting)
+            out[idx].woken = True
+        else:
+            sol = out[idx] = Solicitud(c.client_id, c.ox, c.oy)
+            sol.intentos = intentos[idx]
+
+    #de vuelta a la sala, del que más lleva esperando al último
+    for idx in sorted((i for i in out if seq[i] >= 0), key=seq.__getitem__):
+        c = clientes[idx]
+        p = out[idx]
+        espera = s.waiting.park(c.client_id, c.ox, c.oy)
+        if isinstance(p, Espera):
+            out[idx] = espera
+        else:
+            espera.listen(functools.partial(desp._requeue, p))
+
+    for idx, p in out.items():
+        if isinstance(p, Solicitud) and seq[idx] < 0:
+            if taxis[idx] >= 0:
+                p.future.set_result(fleet[taxis[idx]])
+            else:
+                desp._requeue(p)
+    return out
@@ -1,90 +1,242 @@
-import math
-import random
+import asyncio
+import functools
 import threading
 
-from config import (
-    DAY_MINUTES,
-    TRIP_MIN, TRIP_MODE, TRIP_MAX,
-    WAIT_MIN, WAIT_MODE, WAIT_MAX,
-    RETRY_MIN, RETRY_MODE, RETRY_MAX,
-)
+from typing import Generator, Iterator, Optional, Union
+
+import config
 from sistema import Sistema
+from espera import Espera
+from despacho import Solicitud
+from fleet import TaxiView
+from flujos import FlujoCliente
+
+
+#fases del cliente: dónde se quedó parado (para poder guardarlo y reanudarlo, ver checkpoint.py)
+ARRANQUE = 0        #desfase inicial
+LIBRE = 1           #entre viajes (o tras un reintento)
+ESPERANDO = 2       #con origen y destino elegidos, esperando taxi
+EN_VIAJE = 3        #viaje en curso con self.taxi
 
 
-class Cliente(threading.Thread):
+class ClienteBase:
     """
-    Cliente persistente:
-    - Puede iniciar viajes mientras hora < 24:00
+    Lógica de un cliente, sin hilo ni corrutina propios:
+    - Puede iniciar viajes hasta las 24:00 del último día (config.DAYS); los días
+      intermedios sigue sin parar
     - Si un viaje se pasa de 24:00, se termina igual
     - Entre viajes espera un tiempo aleatorio razonable
+    La usan tal cual el motor de eventos, Cliente (hilos) y ClienteAsync (asyncio).
+    El estado del viaje en curso está en atributos (fase, taxi, origen, destino...),
+    no solo en el generador, así se puede guardar y continuar con continuar().
+    Todo lo aleatorio (puntos, duraciones, esperas, precio, rating) sale de su propio
+    flujo (self.azar), no del módulo random compartido.
     """
+    __slots__ = ("sistema", "client_id", "trips", "failed", "azar",
+                 "fase", "taxi", "ox", "oy", "dx", "dy", "distance", "trip_start", "trip_end")
+
     def __init__(self, sistema: Sistema, client_id: int):
-        super().__init__(daemon=True)
         self.sistema = sistema
         self.client_id = client_id
 
-    def run(self):
+        #contadores propios del cliente (sin semáforo: solo los toca él)
+        self.trips = 0       #viajes completados
+        self.failed = 0      #intentos de asignación sin taxi
+
+        #números aleatorios propios (mismo client_id y semilla -> misma secuencia)
+        self.azar: FlujoCliente = sistema.flujo(client_id)
+
+        #viaje actual
+        self.fase = ARRANQUE
+        self.taxi: Optional[TaxiView] = None
+        self.ox = self.oy = self.dx = self.dy = 0.0
+        self.distance = 0.0
+        self.trip_start = self.trip_end = 0   #no start/end: chocarían con threading.Thread.start en Cliente
+
+    def pasos(self) -> Iterator[Union[int, Espera, Solicitud]]:
+        """
+        Comportamiento del cliente como generador.
+        Cada yield devuelve los minutos simulados que hay que esperar
+        (desfase inicial, reintento, viaje o espera entre viajes),
+        o una Espera / Solicitud si está parado hasta que quede un taxi libre cerca
+        o hasta que el despachador le asigne uno.
+        Lo comparten el modo con hilos, el modo asyncio y el motor de eventos.
+        """
         #desfase inicial suave para que no arranquen todos a la vez
-        self.sistema.sleep_minutes(random.randint(0, 10))
+        self.fase = ARRANQUE
+        yield self.azar.desfase()
+        yield from self.continuar()
+
+    def continuar(self, pendiente: Union[Espera, Solicitud, None] = None) -> Iterator[Union[int, Espera, Solicitud]]:
+        """
+        Sigue desde la fase actual, como si acabara de volver del último yield:
+        - EN_VIAJE: termina el viaje en curso
+        - ESPERANDO: sigue esperando con pendiente (la Espera o Solicitud ya en la sala)
+          o, sin ella, vuelve a pedir taxi para el mismo origen y destino
+        - ARRANQUE / LIBRE: empieza un viaje nuevo
+        """
+        if self.fase == EN_VIAJE:
+            yield from self._terminar_viaje()
+        elif self.fase == ESPERANDO:
+            if (yield from self._viaje(pendiente)):
+                return
 
         while True:
+            self.fase = LIBRE
             now = self.sistema.now_minute()
-            if now >= DAY_MINUTES or self.sistema.is_day_finished():
-                break  #no iniciar viajes nuevos tras terminar el día
+            if now >= self.sistema.end_minute() or self.sistema.is_day_finished():
+                break  #no iniciar viajes nuevos tras terminar el último día
 
-            ox, oy = self.sistema.rand_point()
-            dx, dy = self.sistema.rand_point()
-            distance = math.dist((ox, oy), (dx, dy))
+            self.ox, self.oy = self.azar.punto()
+            self.dx, self.dy = self.azar.punto()
+            self.distance = self.sistema.distancia(self.ox, self.oy, self.dx, self.dy)
 
-            taxi = self.sistema.assign_taxi(self.client_id, ox, oy)
+            if (yield from self._viaje()):
+                break
+
+    def _viaje(self, pendiente: Union[Espera, Solicitud, None] = None
+               ) -> Generator[Union[int, Espera, Solicitud], None, bool]:
+        """
+        Pide taxi para el origen y destino ya elegidos, hace el viaje y la espera posterior.
+        Devuelve True si el día terminó sin conseguir taxi.
+        """
+        self.fase = ESPERANDO
+        ox, oy = self.ox, self.oy
+        if self.sistema.despachador is not None:
+            taxi = yield from self._pedir_despacho(ox, oy, pendiente)
+            if taxi is None:
+                self.fase = LIBRE
+                return True  #terminó el día sin taxi
+        elif config.ESPERA_EVENTOS:
+            taxi = yield from self._esperar_taxi(ox, oy, pendiente)
             if taxi is None:
-                retry = max(1, self.sistema.tri_int(RETRY_MIN, RETRY_MODE, RETRY_MAX))
-                self.sistema.sleep_minutes(retry)
-                continue
-
-            start = self.sistema.now_minute()
-            duration = max(1, self.sistema.tri_int(TRIP_MIN, TRIP_MODE, TRIP_MAX))
-            end = start + duration  #puede pasar de 24:00
-
-            self.sistema.begin_service()
-
-            #imprimir inicio + estado taxis
-            self.sistema.sem_print.acquire()
-            try:
-                libres, ocupados = self.sistema.taxi_status_snapshot()
-                print(f"\nTaxi-{taxi.id} inicia servicio con Cliente-{self.client_id}")
-                print(f"Hora inicio: {self.sistema.minute_to_clock(start)}")
-                print(f"Hora fin prevista: {self.sistema.minute_to_clock(end)}")
-                print(f"Origen: ({ox:.2f}, {oy:.2f}) → Destino: ({dx:.2f}, {dy:.2f})")
-                print(f"Distancia: {distance:.2f} km | Duración: {duration} min")
-                print("Taxis libres:", ", ".join(libres) if libres else "Ninguno")
-                print("Taxis ocupados:", ", ".join(ocupados) if ocupados else "Ninguno")
-                print("-" * 70)
-            finally:
-                self.sistema.sem_print.release()
-
-            #simular el viaje
-            self.sistema.sleep_minutes(duration)
-
-            #finalizar y actualizar
-            rating = random.randint(1, 5)
-            fare = self.sistema.compute_fare(distance)
-            self.sistema.finish_trip(taxi, dx, dy, fare, rating)
-            self.sistema.end_service()
-
-            #imprimir fin + estado taxis
-            self.sistema.sem_print.acquire()
-            try:
-                libres, ocupados = self.sistema.taxi_status_snapshot()
-                print(f"Servicio finalizado | Cliente-{self.client_id} → Taxi-{taxi.id}")
-                print(f"Hora fin real: {self.sistema.minute_to_clock(end)}")
-                print(f"Coste: {fare:.2f} € | Rating: {rating}")
-                print("Taxis libres:", ", ".join(libres) if libres else "Ninguno")
-                print("Taxis ocupados:", ", ".join(ocupados) if ocupados else "Ninguno")
-                print("-" * 70)
-            finally:
-                self.sistema.sem_print.release()
-
-            #espera razonable antes del siguiente viaje
-            wait = max(1, self.sistema.tri_int(WAIT_MIN, WAIT_MODE, WAIT_MAX))
-            self.sistema.sleep_minutes(wait)
+                self.fase = LIBRE
+                return True  #terminó el día esperando
+        else:
+            taxi = self.sistema.assign_taxi(self.client_id, ox, oy)
+        if taxi is None:
+            self.failed += 1
+            self.fase = LIBRE
+            retry = max(1, self.azar.reintento())
+            yield retry
+            return False
+
+        self.taxi = taxi
+        self.trip_start = self.sistema.now_minute()
+        duration = max(1, self.azar.duracion())
+        self.trip_end = self.trip_start + duration  #puede pasar de 24:00
+
+        self.sistema.begin_service()
+
+        #imprimir inicio + estado taxis
+        self.sistema.report_trip_start(taxi, self.client_id, self.trip_start, self.trip_end,
+                                       ox, oy, self.dx, self.dy, self.distance)
+
+        #simular el viaje
+        self.fase = EN_VIAJE
+        yield duration
+
+        yield from self._terminar_viaje()
+        return False
+
+    def _terminar_viaje(self) -> Iterator[int]:
+        #fin del viaje en curso y espera hasta el siguiente
+        taxi = self.taxi
+
+        #finalizar y actualizar
+        rating = self.azar.rating()
+        fare = self.sistema.compute_fare(self.distance, self.azar.precio_km())
+        self.sistema.finish_trip(taxi, self.dx, self.dy, fare, rating)
+        self.sistema.end_service()
+        self.trips += 1
+
+        #imprimir fin + estado taxis
+        self.sistema.report_trip_end(taxi, self.client_id, self.trip_start, self.trip_end, fare, rating,
+                                     self.ox, self.oy, self.dx, self.dy, self.distance)
+        self.taxi = None
+        self.fase = LIBRE
+
+        #espera razonable antes del siguiente viaje
+        wait = max(1, self.azar.espera())
+        yield wait
+
+    def _esperar_taxi(self, ox: float, oy: float, espera: Optional[Espera] = None
+                      ) -> Generator[Espera, None, Optional[TaxiView]]:
+        """
+        Pide taxi; si no hay ninguno al alcance, espera en la sala (yield de la Espera)
+        y vuelve a pedir cuando lo despiertan. Devuelve el taxi, o None si acabó el día.
+        Con espera (al reanudar) empieza ya parado en la sala.
+        """
+        while True:
+            if espera is None:
+                taxi = self.sistema.assign_or_wait(self.client_id, ox, oy)
+                if not isinstance(taxi, Espera):
+                    return taxi
+                self.failed += 1
+                espera = taxi
+            yield espera
+            espera = None
+            if self.sistema.is_day_finished():
+                return None
+
+    def _pedir_despacho(self, ox: float, oy: float, sol: Optional[Solicitud] = None
+                        ) -> Generator[Solicitud, None, Optional[TaxiView]]:
+        #encola la petición y espera a que el despachador la resuelva (taxi, o None si acabó el día)
+        if sol is None:
+            sol = self.sistema.despachador.submit(self.client_id, ox, oy)
+        yield sol
+        self.failed += sol.intentos
+        return sol.future.result()
+
+
+class Cliente(ClienteBase, threading.Thread):
+    """
+    Cliente persistente como hilo: cada paso es un sleep real.
+    """
+    def __init__(self, sistema: Sistema, client_id: int):
+        ClienteBase.__init__(self, sistema, client_id)
+        threading.Thread.__init__(self, daemon=True)
+
+    def start(self):
+        #cuenta para la barrera del reloj desde antes de arrancar (ver Sistema.sleep_minutes)
+        self.sistema.barrier_resume()
+        threading.Thread.start(self)
+
+    def run(self):
+        s = self.sistema
+        try:
+            for paso in self.pasos():
+                if isinstance(paso, (Espera, Solicitud)):
+                    #bloqueado hasta que finish_trip, el despachador (o el fin del día) lo despierte;
+                    #primero el aviso y luego parar: si ya estaba despierto, nunca cuenta como parado
+                    woken = threading.Event()
+                    wake = functools.partial(s.wake_thread, woken)
+                    if isinstance(paso, Espera):
+                        paso.listen(wake)
+                    else:
+                        paso.future.add_done_callback(lambda _: wake())
+                    s.wait_woken(woken)
+                else:
+                    s.sleep_minutes(paso)
+        finally:
+            s.barrier_park()
+
+
+class ClienteAsync(ClienteBase):
+    """
+    Cliente persistente como corrutina: cada paso es un asyncio.sleep.
+    Miles de clientes comparten un único hilo sin pila propia.
+    """
+    __slots__ = ()
+
+    async def run(self):
+        for paso in self.pasos():
+            if isinstance(paso, Espera):
+                #todo corre en el mismo bucle, así que el aviso puede resolver el futuro directamente
+                woken = asyncio.get_running_loop().create_future()
+                paso.listen(lambda: woken.done() or woken.set_result(None))
+                await woken
+            elif isinstance(paso, Solicitud):
+                await asyncio.wrap_future(paso.future)
+            else:
+                await self.sistema.sleep_minutes_async(paso)
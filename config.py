@@ -6,6 +6,17 @@ SIM_MINUTE_SECONDS = 0.04
 #Jornada completa: de 00:00 a 24:00 = 1440 minutos simulados.
 DAY_MINUTES = 24 * 60
 
+#Modo hilos: las esperas (viajes, reintentos, esperas entre viajes) duermen hasta un minuto
+#del reloj del Sistema en vez de un time.sleep aparte, así no se desvían del reloj.
+#Con RELOJ_RAPIDO el reloj no espera SIM_MINUTE_SECONDS: pasa al siguiente minuto
+#en cuanto todos los hilos están parados (dormidos o esperando taxi).
+RELOJ_BARRERA = True
+RELOJ_RAPIDO = False
+
+#Días seguidos a simular: el reloj sigue pasadas las 24:00, los clientes siguen pidiendo taxi
+#y las estadísticas por hora / zona se sellan cada día (las de la flota se acumulan).
+DAYS = 1
+
 #Mapa de la ciudad 
 MAP_MIN = 0.0
 MAP_MAX = 10.0
@@ -13,6 +24,64 @@ MAP_MAX = 10.0
 #Radio máximo de búsqueda: 2 km.
 SEARCH_RADIUS_KM = 2.0
 
+#Distancias por calles (ver red.py) en vez de en línea recta: búsqueda de taxi, viaje y tarifa.
+#Cuadrícula de calles cada CALLE_KM con una fracción CALLES_CORTADAS de tramos cortados
+#(la red siempre queda conectada; RED_SEMILLA fija qué tramos).
+RED_VIARIA = False
+CALLE_KM = 0.5
+CALLES_CORTADAS = 0.15
+RED_SEMILLA = 0
+
+#Hasta RED_TABLA_MAX cruces se precalcula la tabla completa de distancias cruce-cruce
+#(Floyd-Warshall, coste cúbico: ~2 s con 1000 cruces); con más, cada fila se calcula al pedirla
+#y se guardan las RED_CACHE_FILAS más recientes.
+RED_TABLA_MAX = 1000
+RED_CACHE_FILAS = 1024
+
+#Rebalanceo: cada REBALANCEO_MINUTES minutos (0 = nunca) los taxis libres de celdas que tienen
+#de sobra se acercan a las celdas con más demanda reciente, como mucho REBALANCEO_KM por ronda
+#y como mucho REBALANCEO_MAX taxis (y una fracción REBALANCEO_FRACCION de los libres).
+#Van a REBALANCEO_KMH: mientras llegan no se les puede pedir.
+#La demanda es un mapa de calor en celdas de DEMANDA_CELDA_KM: cada petición suma 1 (y
+#DEMANDA_PESO_FALLO más si se quedó sin taxi) y en cada ronda todo se multiplica por DEMANDA_OLVIDO.
+REBALANCEO_MINUTES = 0
+REBALANCEO_KM = 1.5
+REBALANCEO_MAX = 20
+REBALANCEO_FRACCION = 0.1
+REBALANCEO_KMH = 25.0
+DEMANDA_CELDA_KM = 1.0
+DEMANDA_PESO_FALLO = 2.0
+DEMANDA_OLVIDO = 0.5
+
+#Zonas de bloqueo: el mapa se parte en ZONES_PER_SIDE x ZONES_PER_SIDE regiones,
+#cada una con su propio semáforo, para que asignaciones en zonas distintas vayan en paralelo.
+ZONES_PER_SIDE = 4
+
+#Medir los semáforos del Sistema (espera, retención, adquisiciones por sitio).
+#Desactivado no cuesta nada: se usan los semáforos normales.
+LOCK_STATS = False
+
+#Cuántos taxis salen en los rankings del resumen (ganancias y rating).
+TOP_K = 3
+
+#Filas (minutos) que guarda la serie por minuto; al llenarse se pisan las más viejas.
+#Un día más una fila para lo que termina pasadas las 24:00 (con DAYS > 1 queda el último día).
+SERIES_MINUTES = 24 * 60 + 1
+
+#Fichero CSV donde main guarda la serie por minuto al terminar (None = no se guarda).
+SERIES_CSV = None
+
+#Métricas en vivo por HTTP en METRICAS_HOST:METRICAS_PUERTO (None = sin servidor; 0 = puerto libre):
+#/metrics en texto Prometheus y /metrics.json en JSON. Con el servidor activo se miden
+#también las latencias de asignación, fin de viaje y lotes del despachador.
+METRICAS_PUERTO = None
+METRICAS_HOST = "127.0.0.1"
+
+#Motor de eventos: guardar el estado cada CHECKPOINT_MINUTES minutos simulados (0 = nunca)
+#en CHECKPOINT_PATH, para poder reanudar con checkpoint.cargar().
+CHECKPOINT_MINUTES = 0
+CHECKPOINT_PATH = "checkpoint.npz"
+
 #Duración del viaje (minutos) usando distribución triangular.
 TRIP_MIN = 12
 TRIP_MODE = 20
@@ -28,10 +97,40 @@ RETRY_MIN = 2
 RETRY_MODE = 5
 RETRY_MAX = 12
 
+#Si es True, un cliente sin taxi espera en su origen y lo despierta el próximo taxi
+#que quede libre a su alcance (en vez de reintentar a ciegas con RETRY_*).
+ESPERA_EVENTOS = True
+
+#Si es True, los clientes no buscan taxi ellos mismos: encolan la petición y un despachador
+#central empareja cada minuto todas las pendientes a la vez (ver despacho.py).
+DESPACHO_CENTRAL = False
+
+#Semilla maestra de los flujos aleatorios de cada cliente (ver flujos.py).
+#None = se saca del módulo random al crear el Sistema (distinta en cada ejecución si no se siembra).
+SEMILLA = None
+
+#Uniformes que se sacan de golpe cada vez que un cliente vacía su búfer: un solo búfer por cliente
+#que comparten todas sus variables (punto, duración, espera...), así que sacar un valor más en una
+#desplaza todos los que vienen después.
+BLOQUE_ALEATORIO = 64
+
 # Tarifa simple: base + (euros_por_km * distancia).
 BASE_FEE_EUR = 2.50
 EUR_PER_KM_MIN = 1.8
 EUR_PER_KM_MAX = 3.2
 
 
-
+def aplicar(overrides: dict) -> dict:
+    """
+    Cambia parámetros de este módulo en caliente (p. ej. en una corrida por lotes).
+    Hay que hacerlo antes de crear el Sistema. Devuelve los valores anteriores
+    para poder restaurarlos con otra llamada a aplicar.
+    """
+    g = globals()
+    previos = {}
+    for nombre, valor in overrides.items():
+        if not nombre.isupper() or nombre not in g:
+            raise KeyError(f"Parámetro desconocido: {nombre}")
+        previos[nombre] = g[nombre]
+        g[nombre] = valor
+    return previos
@@ -0,0 +1,105 @@
+#mapa de calor de la demanda reciente y plan para acercar taxis libres a donde se pide
+from typing import List, Tuple
+
+import numpy as np
+
+import config
+
+
+class MapaDemanda:
+    """
+    Peticiones recientes por celda de lado cell_km (una rejilla fija sobre el mapa):
+    - cada petición suma 1 en su celda y, si se quedó sin taxi, config.DEMANDA_PESO_FALLO más
+    - envejecer() multiplica todo por config.DEMANDA_OLVIDO (se llama en cada rebalanceo),
+      así pesa más lo último sin guardar ninguna ventana de peticiones
+    Cada petición cuesta una suma en un array; sem es un semáforo binario del Sistema.
+    """
+
+    def __init__(self, map_min: float, map_max: float, cell_km: float, sem):
+        self.map_min = map_min
+        self.side = max(1, int(np.ceil((map_max - map_min) / cell_km)))
+        self.cell_km = (map_max - map_min) / self.side
+        self.sem = sem
+        self.calor = np.zeros((self.side, self.side), dtype=np.float64)     #[fila (y), columna (x)]
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        last = self.side - 1
+        c = min(max(int((x - self.map_min) / self.cell_km), 0), last)
+        r = min(max(int((y - self.map_min) / self.cell_km), 0), last)
+        return r, c
+
+    def pedido(self, x: float, y: float, fallo: bool) -> None:
+        #una petición en (x, y); fallo si no hubo taxi al alcance
+        cell = self._cell(x, y)
+        peso = 1.0 + config.DEMANDA_PESO_FALLO if fallo else 1.0
+        self.sem.acquire()
+        try:
+            self.calor[cell] += peso
+        finally:
+            self.sem.release()
+
+    def envejecer(self) -> np.ndarray:
+        #aplica el olvido y devuelve una copia del mapa ya envejecido
+        self.sem.acquire()
+        try:
+            self.calor *= config.DEMANDA_OLVIDO
+            return self.calor.copy()
+        finally:
+            self.sem.release()
+
+    def celdas(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        #celda (aplanada, fila * side + columna) de cada punto
+        last = self.side - 1
+        c = np.clip(((xs - self.map_min) / self.cell_km).astype(np.int64), 0, last)
+        r = np.clip(((ys - self.map_min) / self.cell_km).astype(np.int64), 0, last)
+        return r * self.side + c
+
+    def centro(self, cell: int) -> Tuple[float, float]:
+        r, c = divmod(cell, self.side)
+        return self.map_min + (c + 0.5) * self.cell_km, self.map_min + (r + 0.5) * self.cell_km
+
+    def plan(self, calor: np.ndarray, idx: np.ndarray, xs: np.ndarray, ys: np.ndarray,
+             max_moves: int) -> List[Tuple[int, float, float]]:
+        """
+        Qué taxis libres mover y a dónde, como (índice, x, y):
+        1. cada celda debería tener taxis libres en proporción a su calor
+        2. las celdas con falta de al menos un taxi, de la que más falta a la que menos,
+           se llevan los taxis sobrantes más cercanos (solo de celdas con sobra)
+        3. cada taxi avanza hacia el centro de su celda destino como mucho config.REBALANCEO_KM
+        idx / xs / ys son los taxis libres; max_moves limita los movimientos de la ronda.
+        """
+        total = calor.sum()
+        if total <= 0 or not len(idx) or max_moves <= 0:
+            return []
+        n_cells = self.side * self.side
+        cell = self.celdas(xs, ys)
+        supply = np.bincount(cell, minlength=n_cells)
+        target = calor.ravel() / total * len(idx)
+        spare = np.rint(supply - target).astype(np.int64)
+        missing = np.rint(target - supply).astype(np.int64)
+
+        movable = np.flatnonzero(spare[cell] > 0)
+        if not len(movable):
+            return []
+        spare = spare.tolist()
+        taken = np.zeros(len(idx), dtype=np.bool_)
+        step = config.REBALANCEO_KM
+        moves = []
+        for hot in np.argsort(-missing, kind="stable").tolist():
+            if missing[hot] <= 0 or len(moves) >= max_moves:
+                break
+            hx, hy = self.centro(hot)
+            d = np.hypot(xs[movable] - hx, ys[movable] - hy)
+            need = int(missing[hot])
+            for k in np.argsort(d, kind="stable").tolist():
+                j = movable[k]
+                if taken[j] or spare[cell[j]] <= 0:
+                    continue
+                taken[j] = True
+                spare[cell[j]] -= 1
+                f = min(1.0, step / d[k]) if d[k] > 0 else 1.0
+                moves.append((int(idx[j]), float(xs[j] + (hx - xs[j]) * f), float(ys[j] + (hy - ys[j]) * f)))
+                need -= 1
+                if not need or len(moves) >= max_moves:
+                    break
+        return moves
@@ -0,0 +1,242 @@
+#despacho centralizado: los clientes encolan peticiones y un único despachador las empareja por lotes
+import functools            #aviso de la sala de espera para volver a la cola
+
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np          #distancias de todo el lote de una vez
+
+import config
+
+
+#taxis más cercanos (como mínimo) que se miran por petición en el reparto por lotes
+#(el resto casi nunca cuenta; si todos acaban en otras peticiones, búsqueda normal)
+CANDIDATOS = 16
+
+
+class Solicitud:
+    """
+    Petición de taxi de un cliente.
+    future se resuelve con el TaxiView asignado, o con None si el día termina antes.
+    intentos cuenta los lotes en los que no hubo taxi al alcance.
+    """
+    __slots__ = ("client_id", "ox", "oy", "future", "intentos")
+
+    def __init__(self, client_id: int, ox: float, oy: float):
+        self.client_id = client_id
+        self.ox = ox
+        self.oy = oy
+        self.future: Future = Future()
+        self.intentos = 0
+
+
+class Despachador:
+    """
+    Emparejamiento por lotes en vez de una búsqueda (y un juego de semáforos) por cliente:
+    - submit() solo encola la petición
+    - despachar() saca todo lo pendiente, coge todas las zonas una vez y empareja el lote:
+      distancias de todos los pares (petición, taxi libre al alcance) vectorizadas y
+      reparto voraz por distancia (empates: mayor rating, menor id)
+    - lo que se queda sin taxi espera en la sala de espera del Sistema y vuelve a la cola
+      cuando queda libre un taxi a su alcance (no se re-empareja cada minuto en balde)
+    - close() (fin del día) resuelve lo pendiente con None
+    Se llama una vez por minuto simulado: run() en modo hilos, run_async() en asyncio
+    y el propio motor de eventos al cerrar cada minuto.
+    """
+
+    def __init__(self, sistema):
+        self.sistema = sistema
+        self._lock = sistema._new_semaphore("sem_despacho")     #protege _pending y closed (y sale en LOCK_STATS)
+        self._pending: List[Solicitud] = []
+        self.closed = False
+
+        #totales para el resumen / benchmarks
+        self.batches = 0
+        self.matched = 0
+
+    def submit(self, client_id: int, ox: float, oy: float) -> Solicitud:
+        sol = Solicitud(client_id, ox, oy)
+        self._lock.acquire()
+        try:
+            if not self.closed:
+                self._pending.append(sol)
+                return sol
+        finally:
+            self._lock.release()
+        sol.future.set_result(None)
+        return sol
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _requeue(self, sol: Solicitud) -> None:
+        #la sala de espera la despertó: entra en el siguiente lote (o None si ya acabó el día)
+        self._lock.acquire()
+        try:
+            if not self.closed:
+                self._pending.append(sol)
+                return
+        finally:
+            self._lock.release()
+        sol.future.set_result(None)
+
+    def despachar(self) -> int:
+        #empareja todo lo pendiente; devuelve cuántas peticiones se asignaron
+        self._lock.acquire()
+        try:
+            batch = self._pending
+            self._pending = []
+        finally:
+            self._lock.release()
+        if not batch:
+            return 0
+
+        s = self.sistema
+        t0 = s.latencias.start() if s.latencias is not None else 0
+        parked = []
+        s.acquire_all_zones()
+        try:
+            taxis = self._match(batch)
+
+            #sin taxi: a la sala de espera con las zonas aún cogidas (no se pierde ningún aviso)
+            for sol, taxi in zip(batch, taxis):
+                if taxi is None:
+                    sol.intentos += 1
+                    s.series.failed_one()
+                    parked.append((sol, s.waiting.park(sol.client_id, sol.ox, sol.oy)))
+        finally:
+            s.release_all_zones()
+
+        if s.demanda is not None:
+            for sol, taxi in zip(batch, taxis):
+                s.demanda.pedido(sol.ox, sol.oy, taxi is None)
+        for sol, taxi in zip(batch, taxis):
+            if taxi is not None:
+                sol.future.set_result(taxi)
+        for sol, espera in parked:
+            espera.listen(functools.partial(self._requeue, sol))
+
+        n = len(batch) - len(parked)
+        self.batches += 1
+        self.matched += n
+        if s.latencias is not None:
+            s.latencias.add("lote", t0)
+        return n
+
+    def _match(self, batch: List[Solicitud]) -> list:
+        """
+        Reparto voraz global del lote (con todas las zonas cogidas):
+        1. pares (petición, taxi libre) de los anillos más cercanos a cada petición,
+           hasta tener unos CANDIDATOS taxis, y distancias de todos los pares de una vez
+        2. cada petición sigue con sus anillos mientras puedan tener un taxi más cercano que
+           su CANDIDATOS-ésimo (o dentro del radio): así tiene seguro sus CANDIDATOS taxis
+           más cercanos, como assign_taxi, aunque el anillo siguiente tenga uno mejor que
+           los de las esquinas del anterior
+        3. pares dentro del radio ordenados por (distancia, -rating, id) y
+           cada petición se queda con el primer taxi aún sin dueño
+        4. si a una petición le quitaron todos sus candidatos pero había más taxis
+           en su radio, búsqueda normal (assign_taxi) entre lo que queda
+        """
+        s = self.sistema
+        f = s.taxis
+        grid = s.free_grid
+        ox = np.array([sol.ox for sol in batch])
+        oy = np.array([sol.oy for sol in batch])
+        radius = config.SEARCH_RADIUS_KM
+
+        req = []
+        keys = []
+        pending = {}        #petición -> (cota, claves, anillos que quedan) del primer anillo sin mirar
+        for r, sol in enumerate(batch):
+            n = 0
+            rings = grid.rings_near(sol.ox, sol.oy, grid.blocks_near(sol.ox, sol.oy))
+            for lower, ring in rings:
+                if n >= CANDIDATOS:
+                    pending[r] = (lower, ring, rings)
+                    break
+                keys.extend(ring)
+                req.extend([r] * len(ring))
+                n += len(ring)
+
+        out: List[Optional[object]] = [None] * len(batch)
+        if not keys:
+            return out
+        k, ri, d = self._pares(keys, req, ox, oy)
+
+        truncated = [False] * len(batch)
+        if pending:
+            #CANDIDATOS-ésima distancia de cada petición: pares ordenados por (petición, distancia)
+            by_req = np.lexsort((d, ri))
+            first = np.searchsorted(ri[by_req], np.arange(len(batch)))
+            req = []
+            keys = []
+            for r, (lower, ring, rings) in pending.items():
+                bound = min(d.item(by_req.item(first.item(r) + CANDIDATOS - 1)), radius) + 1e-6
+                while lower <= bound:
+                    keys.extend(ring)
+                    req.extend([r] * len(ring))
+                    nxt = next(rings, None)
+                    if nxt is None:
+                        break
+                    lower, ring = nxt
+                else:
+                    truncated[r] = True
+            if keys:
+                k2, ri2, d2 = self._pares(keys, req, ox, oy)
+                k, ri, d = np.concatenate((k, k2)), np.concatenate((ri, ri2)), np.concatenate((d, d2))
+
+        inside = np.flatnonzero(d <= radius)
+        k, ri, d = k[inside], ri[inside], d[inside]
+        order = np.lexsort((f.id[k], -f.rating_avg(k), np.round(d, 6)))
+
+        taken = set()
+        left = len(batch)
+        for r, i, dist in zip(ri[order].tolist(), k[order].tolist(), d[order].tolist()):
+            if out[r] is not None or i in taken:
+                continue
+            taken.add(i)
+            out[r] = s._reserve(i, batch[r].client_id, dist)
+            left -= 1
+            if not left:
+                break
+
+        for r, sol in enumerate(batch):
+            if out[r] is None and truncated[r]:
+                out[r] = s._assign_in_zones(sol.client_id, sol.ox, sol.oy, grid.blocks_near(sol.ox, sol.oy))
+        return out
+
+    def _pares(self, keys: List[int], req: List[int], ox: np.ndarray, oy: np.ndarray) -> tuple:
+        #(taxis, peticiones, distancias) de los pares, medidos todos de una vez
+        s = self.sistema
+        f = s.taxis
+        k = np.array(keys, dtype=np.int64)
+        ri = np.array(req, dtype=np.int64)
+        if s.red is None:
+            d = np.hypot(f.x[k] - ox[ri], f.y[k] - oy[ri])
+        else:
+            d = s.red.distancias_pares(ox[ri], oy[ri], f.x[k], f.y[k])
+        return k, ri, d
+
+    def close(self) -> None:
+        #fin del día: nadie más va a recibir taxi
+        self._lock.acquire()
+        try:
+            self.closed = True
+            late = self._pending
+            self._pending = []
+        finally:
+            self._lock.release()
+        for sol in late:
+            sol.future.set_result(None)
+
+    def run(self) -> None:
+        #modo hilos: un lote por minuto simulado hasta el fin del día (arrancar con Sistema.start_thread)
+        while not self.sistema.is_day_finished():
+            self.sistema.sleep_minutes(1)
+            self.despachar()
+
+    async def run_async(self) -> None:
+        #modo asyncio: igual que run, como corrutina
+        while not self.sistema.is_day_finished():
+            await self.sistema.sleep_minutes_async(1)
+            self.despachar()
@@ -0,0 +1,167 @@
+#clientes esperando taxi, indexados por posición, para despertarlos solo cuando queda uno libre cerca
+import itertools            #orden de llegada
+import math                 #floor y distancia
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+Cell = Tuple[int, int]
+
+#celdas de alrededor: la propia, las de los lados y al final las esquinas
+_VECINAS = ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+class Espera:
+    """
+    Un cliente sin taxi al alcance, parado en su origen (x, y).
+    El motor que ejecuta al cliente pone con listen() qué hacer al despertarlo
+    (soltar un Event, resolver un futuro, volver a meterlo en el heap...).
+    Si ya lo despertaron antes de listen(), el callback se llama en el acto.
+    """
+    __slots__ = ("client_id", "x", "y", "seq", "cell", "nodo", "leg", "woken", "_callback", "_room")
+
+    def __init__(self, client_id: int, x: float, y: float, seq: int, room: "SalaEspera"):
+        self.client_id = client_id
+        self.x = x
+        self.y = y
+        self.seq = seq              #orden de llegada (el que más lleva esperando sale primero)
+        self.cell: Optional[Cell] = None
+        self.nodo = self.leg = None     #cruce y tramo a pie (solo con red de calles)
+        self.woken = False
+        self._callback: Optional[Callable[[], None]] = None
+        self._room = room
+
+    def listen(self, callback: Callable[[], None]) -> None:
+        room = self._room
+        room.sem.acquire()
+        try:
+            if not self.woken:
+                self._callback = callback
+                return
+        finally:
+            room.sem.release()
+        callback()
+
+
+class SalaEspera:
+    """
+    Clientes esperando, repartidos en celdas de lado radius_km:
+    - park: el cliente se queda esperando en su origen
+    - wake_near: al quedar libre un taxi en (x, y) se despierta al cliente que más lleva
+      esperando dentro del radio (solo hay que mirar las 3x3 celdas de alrededor)
+    - close: fin del día, se despierta a todos y no se admiten más
+    sem es un semáforo binario del Sistema (así también se puede instrumentar).
+    Con red (ver red.py) el alcance se mide por calles: nunca menos que en línea recta,
+    así siguen bastando las 3x3 celdas; cada cliente guarda su cruce al entrar.
+    """
+
+    def __init__(self, map_min: float, radius_km: float, sem, red=None):
+        self.map_min = map_min
+        self.radius_km = radius_km
+        self.sem = sem
+        self.red = red
+        self.closed = False
+        self._cells: Dict[Cell, Dict[Espera, None]] = {}   #dict para mantener el orden de llegada
+        self._seq = itertools.count()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, x: float, y: float) -> Cell:
+        r = self.radius_km
+        return int(math.floor((x - self.map_min) / r)), int(math.floor((y - self.map_min) / r))
+
+    def park(self, client_id: int, x: float, y: float) -> Espera:
+        #el llamador aún tiene cogidas las zonas de la búsqueda fallida: ningún taxi
+        #puede quedar libre cerca entre el fallo y este punto, así que no se pierde ningún aviso
+        self.sem.acquire()
+        try:
+            espera = Espera(client_id, x, y, next(self._seq), self)
+            if self.closed:
+                espera.woken = True
+                return espera
+            espera.cell = self._cell(x, y)
+            if self.red is not None:
+                espera.nodo, espera.leg = self.red.nodo(x, y)
+            bucket = self._cells.get(espera.cell)
+            if bucket is None:
+                bucket = self._cells[espera.cell] = {}
+            bucket[espera] = None
+            self._count += 1
+            return espera
+        finally:
+            self.sem.release()
+
+    def _take(self, espera: Espera) -> Optional[Callable[[], None]]:
+        #saca a un cliente de la sala y lo marca despierto (con self.sem cogido)
+        bucket = self._cells[espera.cell]
+        del bucket[espera]
+        if not bucket:
+            del self._cells[espera.cell]
+        self._count -= 1
+        espera.woken = True
+        cb = espera._callback
+        espera._callback = None
+        return cb
+
+    def wake_near(self, x: float, y: float) -> Optional[Espera]:
+        #despierta al cliente que más lleva esperando a radius_km o menos de (x, y)
+        if not self._count:
+            return None
+        r = self.radius_km
+        cx, cy = self._cell(x, y)
+        #hueco hasta el borde de la celda propia en cada lado: con él se descartan
+        #las esquinas que quedan enteras fuera del radio
+        fx = x - self.map_min - cx * r
+        fy = y - self.map_min - cy * r
+        gaps = ((fx, r - fx), (fy, r - fy))
+        red = self.red
+        if red is not None:
+            na, la = red.nodo(x, y)
+            row = red.fila(na).item
+        self.sem.acquire()
+        try:
+            best = None
+            #primero la celda propia y las de los lados, que casi siempre tienen a alguien dentro:
+            #con un candidato pronto, en las demás celdas solo se miran los que llegaron antes
+            for dx, dy in _VECINAS:
+                bucket = self._cells.get((cx + dx, cy + dy))
+                if not bucket:
+                    continue
+                if dx and dy and gaps[0][dx > 0] ** 2 + gaps[1][dy > 0] ** 2 > r * r:
+                    continue
+                #dentro de cada celda el primero es el más antiguo
+                for e in bucket:
+                    if best is not None and e.seq > best.seq:
+                        break
+                    if red is None:
+                        d = math.hypot(e.x - x, e.y - y)
+                    elif e.nodo == na:
+                        d = abs(e.x - x) + abs(e.y - y)
+                    else:
+                        d = la + row(e.nodo) + e.leg
+                    if d <= r:
+                        best = e
+                        break
+            if best is None:
+                return None
+            cb = self._take(best)
+        finally:
+            self.sem.release()
+        if cb is not None:
+            cb()
+        return best
+
+    def close(self) -> None:
+        #fin del día: todos despiertos (verán day_finished y terminarán)
+        self.sem.acquire()
+        try:
+            self.closed = True
+            pending: List[Espera] = [e for bucket in self._cells.values() for e in bucket]
+            callbacks = [self._take(e) for e in pending]
+        finally:
+            self.sem.release()
+        for cb in callbacks:
+            if cb is not None:
+                cb()
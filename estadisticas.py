@@ -0,0 +1,175 @@
+#agregados que se mantienen viaje a viaje, para que los resúmenes no recorran la flota
+import heapq                #top-k con invalidación perezosa
+
+from typing import Dict, List, Tuple
+
+import numpy as np          #totales por hora y por zona
+
+
+class TopK:
+    """
+    Máximos de un valor por clave que cambia con el tiempo (ganancias, rating medio):
+    - update() solo apunta el valor nuevo y mete una entrada en el heap (O(log n))
+    - las entradas viejas no se borran: se descartan al consultar si ya no coinciden
+      con el valor actual (invalidación perezosa)
+    - si el heap crece demasiado con entradas viejas se rehace con los valores actuales
+    Empates: gana la clave menor (igual que argmax).
+    """
+
+    def __init__(self):
+        self._value: Dict[int, float] = {}
+        self._heap: List[Tuple[float, int, float]] = []     #(-valor, clave, valor)
+
+    def update(self, key: int, value: float) -> None:
+        self._value[key] = value
+        heapq.heappush(self._heap, (-value, key, value))
+        if len(self._heap) > 2 * len(self._value) + 64:
+            self._heap = [(-v, k, v) for k, v in self._value.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, k: int) -> List[Tuple[int, float]]:
+        #las k claves con mayor valor, como (clave, valor)
+        heap = self._heap
+        out = []
+        seen = set()
+        while heap and len(out) < k:
+            entry = heapq.heappop(heap)
+            _, key, value = entry
+            if key in seen or self._value.get(key) != value:
+                continue   #entrada vieja: se tira
+            seen.add(key)
+            out.append(entry)
+        for entry in out:
+            heapq.heappush(heap, entry)
+        return [(key, value) for _, key, value in out]
+
+
+class Agregados:
+    """
+    Estadísticas actualizadas en cada finish_trip:
+    - top-k de ganancias y de rating medio por taxi (acumulados de toda la corrida)
+    - servicios, ganancias y suma de ratings por hora (la del fin del viaje; la última
+      cubeta junta lo que acaba pasadas las 24:00 del último día) y por zona de destino
+    - totales del día en curso y acumulados
+    Al cambiar de día, cerrar_dia() sella las cubetas y totales del día en self.dias
+    y los pone a cero; top-k y acumulados siguen.
+    Consultar cuesta O(k) (más las cubetas), sin tocar los arrays de la flota.
+    sem es un semáforo binario del Sistema (así también se puede instrumentar).
+    """
+
+    def __init__(self, n_hours: int, n_zones: int, sem):
+        self.sem = sem
+        self.earnings = TopK()
+        self.rating = TopK()
+
+        #día en curso (0, 1, ...) y minuto absoluto en que empezó
+        self.day = 0
+        self.day_start = 0
+
+        self.hour_services = np.zeros(n_hours, dtype=np.int64)
+        self.hour_earnings = np.zeros(n_hours, dtype=np.float64)
+        self.hour_rating_sum = np.zeros(n_hours, dtype=np.float64)
+        self.zone_services = np.zeros(n_zones, dtype=np.int64)
+        self.zone_earnings = np.zeros(n_zones, dtype=np.float64)
+
+        self.day_services = 0
+        self.day_earnings = 0.0
+        self.day_rating_sum = 0.0
+
+        #acumulados de todos los días
+        self.services = 0
+        self.total_earnings = 0.0
+        self.rating_sum = 0.0
+
+        #días ya sellados, del primero al último (ver cerrar_dia)
+        self.dias: List[dict] = []
+
+    def record(self, i: int, minute: int, zone: int, fare: float, rating: int,
+               earnings_i: float, rating_avg_i: float) -> None:
+        #un viaje terminado por el taxi i en minute (con sus ganancias y rating medio ya actualizados)
+        self.sem.acquire()
+        try:
+            #un fin que llega justo tras sellar el día anterior cuenta en la primera hora del nuevo
+            hour = min(max(minute - self.day_start, 0) // 60, len(self.hour_services) - 1)
+
+            self.earnings.update(i, earnings_i)
+            self.rating.update(i, rating_avg_i)
+
+            self.hour_services[hour] += 1
+            self.hour_earnings[hour] += fare
+            self.hour_rating_sum[hour] += rating
+            self.zone_services[zone] += 1
+            self.zone_earnings[zone] += fare
+
+            self.day_services += 1
+            self.day_earnings += fare
+            self.day_rating_sum += rating
+
+            self.services += 1
+            self.total_earnings += fare
+            self.rating_sum += rating
+        finally:
+            self.sem.release()
+
+    def _dia(self) -> dict:
+        #cubetas y totales del día en curso (con self.sem cogido)
+        return {
+            "dia": self.day,
+            "por_hora": {
+                "services": self.hour_services.tolist(),
+                "earnings": self.hour_earnings.tolist(),
+                "rating_sum": self.hour_rating_sum.tolist(),
+            },
+            "por_zona": {
+                "services": self.zone_services.tolist(),
+                "earnings": self.zone_earnings.tolist(),
+            },
+            "servicios": self.day_services,
+            "ganancias": self.day_earnings,
+            "rating_medio": self.day_rating_sum / self.day_services if self.day_services else 0.0,
+        }
+
+    def cerrar_dia(self, next_start: int) -> dict:
+        #sella el día en curso (lo añade a self.dias y lo devuelve) y empieza otro en next_start
+        self.sem.acquire()
+        try:
+            sellado = self._dia()
+            self.dias.append(sellado)
+
+            self.day += 1
+            self.day_start = next_start
+            for buckets in (self.hour_services, self.hour_earnings, self.hour_rating_sum,
+                            self.zone_services, self.zone_earnings):
+                buckets.fill(0)
+            self.day_services = 0
+            self.day_earnings = 0.0
+            self.day_rating_sum = 0.0
+            return sellado
+        finally:
+            self.sem.release()
+
+    def resumen(self, k: int) -> dict:
+        """
+        Foto de los agregados:
+        - top_earnings / top_rating: [(índice de taxi, valor)] de mayor a menor
+        - dia, por_hora / por_zona: número y copias de las cubetas del día en curso
+        - servicios, ganancias y rating medio acumulados de todos los días
+        - hoy: totales del día en curso; dias: los días ya sellados
+        """
+        self.sem.acquire()
+        try:
+            hoy = self._dia()
+            return {
+                "top_earnings": self.earnings.top(k),
+                "top_rating": self.rating.top(k),
+                "dia": self.day,
+                "por_hora": hoy.pop("por_hora"),
+                "por_zona": hoy.pop("por_zona"),
+                "servicios": self.services,
+                "ganancias": self.total_earnings,
+                "rating_medio": self.rating_sum / self.services if self.services else 0.0,
+                "hoy": hoy,
+                "dias": list(self.dias),
+            }
+        finally:
+            self.sem.release()
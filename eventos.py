@@ -0,0 +1,266 @@
+#salida de eventos de viaje: una cola que vacía un hilo escritor en lotes, con varios destinos
+import json                 #para el destino en líneas JSON (y los metadatos del log en columnas)
+import os                   #carpeta del log en columnas
+import queue                #cola entre los clientes y el escritor
+import struct               #para el registro binario compacto
+import sys                  #para escribir en stdout de golpe
+import threading            #hilo escritor
+
+from dataclasses import dataclass, asdict
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+import numpy as np          #columnas del log de viajes
+
+
+INICIO = 0                  #tipo de evento: empieza un servicio
+FIN = 1                     #tipo de evento: termina un servicio
+
+
+@dataclass(slots=True)
+class EventoViaje:
+    tipo: int               #INICIO o FIN
+    taxi_id: int
+    client_id: int
+    start: int              #minuto de inicio
+    end: int                #minuto de fin (previsto en INICIO)
+    ox: float = 0.0
+    oy: float = 0.0
+    dx: float = 0.0
+    dy: float = 0.0
+    distance: float = 0.0
+    fare: float = 0.0       #solo en FIN
+    rating: int = 0         #solo en FIN
+
+    #estado de taxis en el momento del evento (solo si el destino lo pide)
+    libres: Optional[List[str]] = None
+    ocupados: Optional[List[str]] = None
+
+
+class EventSink:
+    """
+    Destino de eventos. El escritor le pasa lotes ya en orden.
+    needs_status indica si hay que adjuntar el estado libres/ocupados a cada evento.
+    """
+    needs_status = False
+
+    def write_batch(self, events: List[EventoViaje]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(EventSink):
+    #modo silencioso: no se genera ni se escribe nada (para benchmarks)
+    def write_batch(self, events: List[EventoViaje]) -> None:
+        pass
+
+
+class ConsoleSink(EventSink):
+    """
+    Texto por consola, con el mismo formato de siempre.
+    Todo el lote se escribe con un único write.
+    """
+    needs_status = True
+
+    def __init__(self, stream=None):
+        from sistema import Sistema   #solo para minute_to_clock (import aquí para evitar el ciclo)
+
+        self.stream = stream if stream is not None else sys.stdout
+        self.clock = Sistema.minute_to_clock
+
+    def write_batch(self, events: List[EventoViaje]) -> None:
+        clock = self.clock
+        lines = []
+        for e in events:
+            if e.tipo == INICIO:
+                lines.append(f"\nTaxi-{e.taxi_id} inicia servicio con Cliente-{e.client_id}")
+                lines.append(f"Hora inicio: {clock(e.start)}")
+                lines.append(f"Hora fin prevista: {clock(e.end)}")
+                lines.append(f"Origen: ({e.ox:.2f}, {e.oy:.2f}) → Destino: ({e.dx:.2f}, {e.dy:.2f})")
+                lines.append(f"Distancia: {e.distance:.2f} km | Duración: {e.end - e.start} min")
+            else:
+                lines.append(f"Servicio finalizado | Cliente-{e.client_id} → Taxi-{e.taxi_id}")
+                lines.append(f"Hora fin real: {clock(e.end)}")
+                lines.append(f"Coste: {e.fare:.2f} € | Rating: {e.rating}")
+            lines.append("Taxis libres: " + (", ".join(e.libres) if e.libres else "Ninguno"))
+            lines.append("Taxis ocupados: " + (", ".join(e.ocupados) if e.ocupados else "Ninguno"))
+            lines.append("-" * 70)
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+
+class JsonLinesSink(EventSink):
+    #un objeto JSON por línea (sin el estado de la flota)
+    def __init__(self, path: str):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write_batch(self, events: List[EventoViaje]) -> None:
+        out = []
+        for e in events:
+            d = asdict(e)
+            del d["libres"], d["ocupados"]
+            d["tipo"] = "inicio" if e.tipo == INICIO else "fin"
+            out.append(json.dumps(d, ensure_ascii=False))
+        self.f.write("\n".join(out) + "\n")
+
+    def close(self) -> None:
+        self.f.close()
+
+
+#registro binario: tipo, taxi, cliente, inicio, fin, ox, oy, dx, dy, distancia, coste, rating
+RECORD = struct.Struct("<BqqiiffffffB")
+
+
+class BinarySink(EventSink):
+    #registros de tamaño fijo (RECORD.size bytes), little-endian
+    def __init__(self, path: str):
+        self.f = open(path, "wb")
+
+    def write_batch(self, events: List[EventoViaje]) -> None:
+        pack = RECORD.pack
+        self.f.write(b"".join(
+            pack(e.tipo, e.taxi_id, e.client_id, e.start, e.end,
+                 e.ox, e.oy, e.dx, e.dy, e.distance, e.fare, e.rating)
+            for e in events
+        ))
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def read_binary(f: BinaryIO) -> Iterator[EventoViaje]:
+    #lee un fichero escrito por BinarySink
+    for fields in RECORD.iter_unpack(f.read()):
+        yield EventoViaje(*fields)
+
+
+#columnas del log de viajes terminados: nombre -> tipo (ancho fijo, little-endian)
+COLUMNAS_VIAJE = {
+    "taxi_id": "<i8",
+    "client_id": "<i8",
+    "start": "<i4",
+    "end": "<i4",
+    "duration": "<i4",
+    "ox": "<f4",
+    "oy": "<f4",
+    "dx": "<f4",
+    "dy": "<f4",
+    "distance": "<f4",
+    "fare": "<f8",
+    "rating": "u1",
+}
+
+
+class ColumnarSink(EventSink):
+    """
+    Log de viajes terminados en columnas: un fichero binario por campo (COLUMNAS_VIAJE)
+    dentro de la carpeta path, más meta.json con los tipos y el número de filas.
+    - Los viajes se acumulan en arrays de chunk filas y se escriben de golpe al llenarse
+    - Solo se guardan los eventos FIN (llevan todo el detalle del viaje)
+    - abrir_viajes() abre las columnas como arrays NumPy mapeados en memoria
+    """
+
+    def __init__(self, path: str, chunk: int = 65536):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk = chunk
+        self.rows = 0
+        self._n = 0
+        self._buf = {c: np.empty(chunk, dtype=t) for c, t in COLUMNAS_VIAJE.items()}
+        self._files = {c: open(os.path.join(path, c + ".bin"), "wb") for c in COLUMNAS_VIAJE}
+
+    def write_batch(self, events: List[EventoViaje]) -> None:
+        b = self._buf
+        for e in events:
+            if e.tipo != FIN:
+                continue
+            n = self._n
+            b["taxi_id"][n] = e.taxi_id
+            b["client_id"][n] = e.client_id
+            b["start"][n] = e.start
+            b["end"][n] = e.end
+            b["duration"][n] = e.end - e.start
+            b["ox"][n] = e.ox
+            b["oy"][n] = e.oy
+            b["dx"][n] = e.dx
+            b["dy"][n] = e.dy
+            b["distance"][n] = e.distance
+            b["fare"][n] = e.fare
+            b["rating"][n] = e.rating
+            self._n = n + 1
+            if self._n == self.chunk:
+                self._flush()
+
+    def _flush(self) -> None:
+        n = self._n
+        if not n:
+            return
+        for c, f in self._files.items():
+            self._buf[c][:n].tofile(f)
+        self.rows += n
+        self._n = 0
+
+    def close(self) -> None:
+        self._flush()
+        for f in self._files.values():
+            f.close()
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"rows": self.rows, "columns": COLUMNAS_VIAJE}, f, indent=2)
+
+
+def abrir_viajes(path: str) -> Dict[str, np.ndarray]:
+    #columnas de un log escrito por ColumnarSink, mapeadas en memoria (solo lectura)
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    rows = meta["rows"]
+    out = {}
+    for c, t in meta["columns"].items():
+        if rows:
+            out[c] = np.memmap(os.path.join(path, c + ".bin"), dtype=t, mode="r", shape=(rows,))
+        else:
+            out[c] = np.empty(0, dtype=t)
+    return out
+
+
+class BufferedEventWriter:
+    """
+    Cola de eventos + hilo escritor:
+    - emit() solo encola (no bloquea por la consola ni por el disco)
+    - el hilo saca lo que haya (hasta batch_size) y lo escribe de una vez
+    - close() vacía la cola y cierra el destino
+    """
+    _STOP = object()
+
+    def __init__(self, sink: EventSink, batch_size: int = 512):
+        self.sink = sink
+        self.batch_size = batch_size
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def emit(self, event: EventoViaje) -> None:
+        self._queue.put(event)
+
+    def _drain(self) -> None:
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is self._STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self.sink.write_batch(batch)
+            if stop:
+                break
+
+    def close(self) -> None:
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self.sink.close()
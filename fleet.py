@@ -0,0 +1,214 @@
+#flota como estructura de arrays (NumPy): un array contiguo por campo en vez de un objeto por taxi
+import random               #semilla para el generador de NumPy
+
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from models import Taxi
+
+
+NO_CLIENT = -1              #valor de current_client cuando el taxi no lleva cliente
+FLUJO_FLOTA = 0            #spawn_key del flujo de posiciones (no coincide con el [semilla, client_id] de un cliente)
+
+
+class Fleet:
+    """
+    Datos de todos los taxis en arrays paralelos:
+    - id, x, y, free, current_client
+    - services, earnings, rating_sum, rating_count
+    El taxi i es la posición i de cada array. Los accesos por taxi
+    pasan por TaxiView, así el código que espera objetos Taxi sigue funcionando.
+    No tiene semáforos propios: los pone quien lo usa (Sistema).
+    Para leer sin semáforos (read / snapshot), quien escribe un taxi i sube seq[i]
+    antes y después de tocar sus campos: impar = escritura a medias.
+    """
+
+    #campos por taxi, en el orden de __init__
+    FIELDS = ("id", "x", "y", "free", "current_client", "services", "earnings", "rating_sum", "rating_count")
+
+    def __init__(self, n: int):
+        self.id = np.arange(1, n + 1, dtype=np.int64)
+        self.x = np.zeros(n, dtype=np.float64)
+        self.y = np.zeros(n, dtype=np.float64)
+        self.free = np.ones(n, dtype=np.bool_)
+        self.current_client = np.full(n, NO_CLIENT, dtype=np.int64)
+        self.services = np.zeros(n, dtype=np.int64)
+        self.earnings = np.zeros(n, dtype=np.float64)
+        self.rating_sum = np.zeros(n, dtype=np.float64)
+        self.rating_count = np.zeros(n, dtype=np.int64)
+        self.seq = np.zeros(n, dtype=np.int64)      #contador de escrituras por taxi (seqlock)
+
+    @classmethod
+    def from_taxis(cls, taxis: List[Taxi]) -> "Fleet":
+        #copia una lista de Taxi (dataclass) a arrays
+        fleet = cls(len(taxis))
+        for i, t in enumerate(taxis):
+            fleet.id[i] = t.id
+            fleet.x[i] = t.x
+            fleet.y[i] = t.y
+            fleet.free[i] = t.free
+            fleet.current_client[i] = NO_CLIENT if t.current_client_id is None else t.current_client_id
+            fleet.services[i] = t.services
+            fleet.earnings[i] = t.earnings
+            fleet.rating_sum[i] = t.rating_sum
+            fleet.rating_count[i] = t.rating_count
+        return fleet
+
+    @classmethod
+    def random(cls, n: int, map_min: float, map_max: float, semilla: Optional[int] = None) -> "Fleet":
+        #n taxis libres en posiciones uniformes; con la semilla maestra del Sistema la flota se repite,
+        #sin ella la semilla se toma del módulo random
+        fleet = cls(n)
+        if semilla is None:
+            rng = np.random.default_rng(random.getrandbits(64))
+        else:
+            rng = np.random.default_rng(np.random.SeedSequence(semilla, spawn_key=(FLUJO_FLOTA,)))
+        fleet.x[:] = rng.uniform(map_min, map_max, n)
+        fleet.y[:] = rng.uniform(map_min, map_max, n)
+        return fleet
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def __getitem__(self, i: int) -> "TaxiView":
+        if i < 0:
+            i += len(self)
+        return TaxiView(self, i)
+
+    def __iter__(self) -> Iterator["TaxiView"]:
+        for i in range(len(self)):
+            yield TaxiView(self, i)
+
+    def read(self, fields: Tuple[str, ...]) -> List[np.ndarray]:
+        """
+        Copia de los campos pedidos, coherente taxi a taxi, sin coger ningún semáforo:
+        se copia todo y se vuelven a copiar solo los taxis cuyo seq cambió mientras
+        tanto o estaba impar (hasta que salgan enteros). Los escritores no esperan nunca.
+        """
+        seq = self.seq
+        before = seq.copy()
+        out = [getattr(self, c).copy() for c in fields]
+        redo = np.flatnonzero((seq != before) | (before & 1).astype(np.bool_))
+        while len(redo):
+            before = seq[redo]
+            for c, arr in zip(fields, out):
+                arr[redo] = getattr(self, c)[redo]
+            redo = redo[(seq[redo] != before) | (before & 1).astype(np.bool_)]
+        return out
+
+    def snapshot(self) -> "Fleet":
+        #foto de toda la flota (ver read) como otra Fleet que ya nadie modifica
+        copy = Fleet(0)
+        for c, arr in zip(self.FIELDS, self.read(self.FIELDS)):
+            setattr(copy, c, arr)
+        copy.seq = np.zeros(len(copy.id), dtype=np.int64)
+        return copy
+
+    def rating_avg(self, idx=None) -> np.ndarray:
+        #rating medio de todos los taxis (o de los índices idx); 0 si no tiene ratings
+        s = self.rating_sum if idx is None else self.rating_sum[idx]
+        c = self.rating_count if idx is None else self.rating_count[idx]
+        return np.divide(s, c, out=np.zeros(len(s), dtype=np.float64), where=c > 0)
+
+    def rating_avg_of(self, i: int) -> float:
+        #rating medio de un solo taxi, sin crear arrays
+        c = self.rating_count.item(i)
+        return (self.rating_sum.item(i) / c) if c else 0.0
+
+
+class TaxiView:
+    """
+    Vista ligera de un taxi dentro de la flota: mismos atributos que models.Taxi,
+    pero lee y escribe directamente en los arrays.
+    """
+    __slots__ = ("fleet", "index")
+
+    def __init__(self, fleet: Fleet, index: int):
+        self.fleet = fleet
+        self.index = index
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TaxiView) and other.fleet is self.fleet and other.index == self.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.fleet), self.index))
+
+    def __repr__(self) -> str:
+        return (f"TaxiView(id={self.id}, x={self.x:.2f}, y={self.y:.2f}, free={self.free}, "
+                f"services={self.services}, earnings={self.earnings:.2f})")
+
+    @property
+    def id(self) -> int:
+        return int(self.fleet.id[self.index])
+
+    @property
+    def x(self) -> float:
+        return float(self.fleet.x[self.index])
+
+    @x.setter
+    def x(self, v: float) -> None:
+        self.fleet.x[self.index] = v
+
+    @property
+    def y(self) -> float:
+        return float(self.fleet.y[self.index])
+
+    @y.setter
+    def y(self, v: float) -> None:
+        self.fleet.y[self.index] = v
+
+    @property
+    def free(self) -> bool:
+        return bool(self.fleet.free[self.index])
+
+    @free.setter
+    def free(self, v: bool) -> None:
+        self.fleet.free[self.index] = v
+
+    @property
+    def current_client_id(self) -> Optional[int]:
+        c = int(self.fleet.current_client[self.index])
+        return None if c == NO_CLIENT else c
+
+    @current_client_id.setter
+    def current_client_id(self, v: Optional[int]) -> None:
+        self.fleet.current_client[self.index] = NO_CLIENT if v is None else v
+
+    @property
+    def services(self) -> int:
+        return int(self.fleet.services[self.index])
+
+    @services.setter
+    def services(self, v: int) -> None:
+        self.fleet.services[self.index] = v
+
+    @property
+    def earnings(self) -> float:
+        return float(self.fleet.earnings[self.index])
+
+    @earnings.setter
+    def earnings(self, v: float) -> None:
+        self.fleet.earnings[self.index] = v
+
+    @property
+    def rating_sum(self) -> float:
+        return float(self.fleet.rating_sum[self.index])
+
+    @rating_sum.setter
+    def rating_sum(self, v: float) -> None:
+        self.fleet.rating_sum[self.index] = v
+
+    @property
+    def rating_count(self) -> int:
+        return int(self.fleet.rating_count[self.index])
+
+    @rating_count.setter
+    def rating_count(self, v: int) -> None:
+        self.fleet.rating_count[self.index] = v
+
+    @property
+    def rating_avg(self) -> float:
+        #rating medio
+        c = self.rating_count
+        return (self.rating_sum / c) if c else 0.0
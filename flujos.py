@@ -0,0 +1,93 @@
+#números aleatorios de cada cliente: un generador propio por cliente, muestreado por bloques
+import math                 #sqrt de la triangular
+
+from typing import List, Tuple
+
+import numpy as np
+
+import config
+
+
+class FlujoCliente:
+    """
+    Flujo aleatorio de un cliente, derivado de la semilla maestra y de su client_id:
+    - no comparte estado con nadie (sin contención entre hilos en el módulo random)
+    - cada cliente saca siempre la misma secuencia, se ejecute en el motor que se ejecute
+      y en el orden que sea, así un día con la misma semilla sale igual bit a bit
+    - los uniformes [0, 1) salen de NumPy en bloques de config.BLOQUE_ALEATORIO y se
+      guardan como lista: sacar uno es un pop(); cada variable (punto, duración, espera,
+      reintento, precio por km, rating) se obtiene de uno con una cuenta en Python
+    Un solo búfer para todas las variables: un cliente de pocos viajes rellena una vez
+    (a cambio, un valor más en una variable desplaza todos los siguientes del cliente).
+    Los parámetros (TRIP_*, WAIT_*...) se leen de config en cada valor.
+    """
+    __slots__ = ("rng", "_buf")
+
+    def __init__(self, semilla: int, client_id: int):
+        self.rng = np.random.Generator(np.random.PCG64(np.random.SeedSequence([semilla, client_id])))
+        self._buf: List[float] = []
+
+    def _u(self) -> float:
+        #siguiente uniforme del bloque (y bloque nuevo si se acabó)
+        buf = self._buf
+        if not buf:
+            buf = self._buf = self.rng.random(config.BLOQUE_ALEATORIO).tolist()
+        return buf.pop()
+
+    def _tri(self, a: int, mode: int, b: int) -> int:
+        #triangular redondeada a entero, por la inversa de su distribución
+        u = self._u()
+        if a == b:
+            return a
+        if u < (mode - a) / (b - a):
+            x = a + math.sqrt(u * (b - a) * (mode - a))
+        else:
+            x = b - math.sqrt((1.0 - u) * (b - a) * (b - mode))
+        return int(round(x))
+
+    def desfase(self) -> int:
+        #desfase inicial: entero en [0, 10]
+        return int(self._u() * 11)
+
+    def punto(self) -> Tuple[float, float]:
+        #punto uniforme en el mapa
+        lo = config.MAP_MIN
+        span = config.MAP_MAX - lo
+        return lo + span * self._u(), lo + span * self._u()
+
+    def duracion(self) -> int:
+        return self._tri(config.TRIP_MIN, config.TRIP_MODE, config.TRIP_MAX)
+
+    def espera(self) -> int:
+        return self._tri(config.WAIT_MIN, config.WAIT_MODE, config.WAIT_MAX)
+
+    def reintento(self) -> int:
+        return self._tri(config.RETRY_MIN, config.RETRY_MODE, config.RETRY_MAX)
+
+    def precio_km(self) -> float:
+        lo = config.EUR_PER_KM_MIN
+        return lo + (config.EUR_PER_KM_MAX - lo) * self._u()
+
+    def rating(self) -> int:
+        #entero en [1, 5]
+        return int(self._u() * 5) + 1
+
+    def estado(self) -> Tuple[List[int], List[float]]:
+        """
+        Para guardar (ver checkpoint.py):
+        - estado del PCG64 como [state, inc, has_uint32, uinteger]
+        - lo que queda sin usar del bloque actual
+        """
+        st = self.rng.bit_generator.state
+        gen = [st["state"]["state"], st["state"]["inc"], st["has_uint32"], st["uinteger"]]
+        return gen, list(self._buf)
+
+    def restaurar(self, gen: List[int], buf: List[float]) -> None:
+        #inverso de estado()
+        self.rng.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {"state": gen[0], "inc": gen[1]},
+            "has_uint32": gen[2],
+            "uinteger": gen[3],
+        }
+        self._buf = list(buf)
@@ -0,0 +1,307 @@
+#índice espacial de rejilla uniforme para localizar taxis libres sin recorrer toda la flota
+import functools            #para compartir la tabla de anillos
+import math                 #para floor, ceil y hypot
+
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np          #celdas y enlaces de las claves en arrays
+
+
+Cell = Tuple[int, int]
+
+EMPTY = -1                  #sin clave (fin de la lista de una celda) o clave fuera de la rejilla
+
+
+class GridIndex:
+    """
+    Rejilla uniforme de celdas cuadradas de lado cell_km sobre el mapa.
+    - Cada celda es una lista enlazada de claves (índices de taxi) guardada en arrays de NumPy:
+      la celda de cada clave, su siguiente y su anterior (int32) y la primera de cada celda;
+      unos 12 bytes por clave y 12 por celda, sin un objeto de Python por celda ni por clave
+    - Cada bloque lleva además la lista compacta de sus celdas no vacías, para recorrer
+      solo esas cuando hay pocos taxis libres
+    - Las celdas se agrupan en bloques (zonas) de cells_per_block x cells_per_block;
+      una celda solo la tocan las claves de su bloque, así cada zona puede protegerse
+      con su propio semáforo
+    - Se recorren anillos de celdas del más cercano al más lejano
+    - La búsqueda para en cuanto el siguiente anillo ya no puede mejorar al mejor candidato
+    No tiene semáforos propios: los pone quien lo usa (Sistema).
+    """
+
+    def __init__(self, n_keys: int, map_min: float, map_max: float,
+                 radius_km: float, blocks_per_side: int, cells_per_block: int):
+        self.map_min = map_min
+        self.radius_km = radius_km
+        self.blocks_per_side = blocks_per_side
+        self.cells_per_block = cells_per_block
+        self.cells_per_side = blocks_per_side * cells_per_block
+        self.cell_km = (map_max - map_min) / self.cells_per_side
+
+        #celda c = cy * cells_per_side + cx; EMPTY = ninguna clave / ninguna celda
+        self._head = np.full(self.cells_per_side * self.cells_per_side, EMPTY, dtype=np.int32)
+        self._cell_of = np.full(n_keys, EMPTY, dtype=np.int32)
+        self._next = np.full(n_keys, EMPTY, dtype=np.int32)
+        self._prev = np.full(n_keys, EMPTY, dtype=np.int32)
+
+        #celdas no vacías de cada bloque: las _occupied[b] primeras de su tramo de _occ
+        #(tramo b = [b * cells_per_block², (b + 1) * cells_per_block²)); _occ_pos = posición de cada celda
+        n_blocks = blocks_per_side * blocks_per_side
+        self._occupied: List[int] = [0] * n_blocks
+        self._occ = np.full(n_blocks * cells_per_block * cells_per_block, EMPTY, dtype=np.int32)
+        self._occ_pos = np.full(len(self._head), EMPTY, dtype=np.int32)
+
+        #anillos de celdas que pueden tocar el disco de búsqueda (compartidos entre rejillas)
+        self._rings = _rings_for(self.cell_km, radius_km)
+        self._ring_cells = sum(len(ring) for _, ring in self._rings)
+
+        #(k, desplazamientos de celda) de cada anillo, para los que caen enteros dentro del mapa
+        cps = self.cells_per_side
+        self._ring_offsets = [(max(abs(ring[0][0]), abs(ring[0][1])), [dy * cps + dx for dx, dy in ring])
+                              for _, ring in self._rings]
+
+    @staticmethod
+    def cells_per_block_for(block_km: float, radius_km: float, area_km2: float, n_items: int) -> int:
+        """
+        Celdas por lado de bloque recomendadas:
+        - Celda nunca mayor que el radio de búsqueda
+        - Unos 2 elementos por celda con la densidad media de la flota
+        - Como máximo 128 celdas por lado de bloque (cada celda vacía cuesta 12 bytes)
+        """
+        target = radius_km
+        if n_items > 0 and area_km2 > 0:
+            target = min(radius_km, math.sqrt(2.0 * area_km2 / n_items))
+        return max(1, min(128, int(math.ceil(block_km / target))))
+
+    def _axis(self, v: float) -> int:
+        #índice de celda en un eje, recortado a los bordes del mapa
+        return min(self.cells_per_side - 1, max(0, int(math.floor((v - self.map_min) / self.cell_km))))
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return self._axis(x), self._axis(y)
+
+    def _block_of_cell(self, cx: int, cy: int) -> int:
+        return (cy // self.cells_per_block) * self.blocks_per_side + cx // self.cells_per_block
+
+    def _block_of_code(self, c: int) -> int:
+        cy, cx = divmod(c, self.cells_per_side)
+        return self._block_of_cell(cx, cy)
+
+    def block_at(self, x: float, y: float) -> int:
+        #bloque (zona) al que pertenece un punto
+        return self._block_of_cell(*self._cell(x, y))
+
+    def _cell_box(self, x: float, y: float) -> Tuple[int, int, int, int]:
+        #rango de celdas del cuadrado que envuelve el disco de búsqueda
+        r = self.radius_km
+        return self._axis(x - r), self._axis(x + r), self._axis(y - r), self._axis(y + r)
+
+    def blocks_near(self, x: float, y: float) -> List[int]:
+        #bloques que toca el cuadrado que envuelve el disco de búsqueda, en orden creciente
+        x0, x1, y0, y1 = self._cell_box(x, y)
+        cpb = self.cells_per_block
+        return [by * self.blocks_per_side + bx
+                for by in range(y0 // cpb, y1 // cpb + 1)
+                for bx in range(x0 // cpb, x1 // cpb + 1)]
+
+    def add(self, key: int, x: float, y: float) -> None:
+        #inserta (o mueve) la clave al principio de la celda de (x, y)
+        if self._cell_of.item(key) != EMPTY:
+            self.remove(key)
+        cx, cy = self._cell(x, y)
+        c = cy * self.cells_per_side + cx
+        head = self._head.item(c)
+        self._next[key] = head
+        self._prev[key] = EMPTY
+        if head != EMPTY:
+            self._prev[head] = key
+        else:
+            self._occupy(self._block_of_cell(cx, cy), c)
+        self._head[c] = key
+        self._cell_of[key] = c
+
+    def add_many(self, keys: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        Inserta de golpe claves que aún no están (arranque o reanudación):
+        celdas y enlaces calculados con NumPy, en vez de add() clave a clave.
+        Cada grupo de claves nuevas de una celda queda delante de las que ya tenía.
+        """
+        keys = np.asarray(keys, dtype=np.int32)
+        if not len(keys):
+            return
+        last = self.cells_per_side - 1
+        cx = np.clip(np.floor((np.asarray(xs) - self.map_min) / self.cell_km), 0, last).astype(np.int32)
+        cy = np.clip(np.floor((np.asarray(ys) - self.map_min) / self.cell_km), 0, last).astype(np.int32)
+        code = cy * self.cells_per_side + cx
+        order = np.lexsort((keys, code))
+        keys, code = keys[order], code[order]
+
+        #dentro de cada celda, cada clave apunta a la siguiente del grupo
+        same = code[1:] == code[:-1]
+        nxt = np.full(len(keys), EMPTY, dtype=np.int32)
+        prv = np.full(len(keys), EMPTY, dtype=np.int32)
+        nxt[:-1] = np.where(same, keys[1:], EMPTY)
+        prv[1:] = np.where(same, keys[:-1], EMPTY)
+        starts = np.flatnonzero(np.r_[True, ~same])
+        ends = np.r_[starts[1:] - 1, len(keys) - 1]
+
+        #la última del grupo enlaza con lo que ya hubiera en la celda
+        cells = code[starts]
+        old = self._head[cells]
+        nxt[ends] = old
+        joined = old != EMPTY
+        self._prev[old[joined]] = keys[ends[joined]]
+
+        self._next[keys] = nxt
+        self._prev[keys] = prv
+        self._cell_of[keys] = code
+        self._head[cells] = keys[starts]
+
+        #celdas que pasan de vacías a ocupadas: al final de la lista de su bloque
+        cpb = self.cells_per_block
+        fresh = cells[~joined]
+        blocks = (fresh // self.cells_per_side // cpb) * self.blocks_per_side + (fresh % self.cells_per_side) // cpb
+        order = np.argsort(blocks, kind="stable")
+        fresh, blocks = fresh[order], blocks[order]
+        ids, first, counts = np.unique(blocks, return_index=True, return_counts=True)
+        already = np.array([self._occupied[b] for b in ids.tolist()], dtype=np.int64)
+        pos = np.arange(len(fresh)) - np.repeat(first, counts) + np.repeat(already, counts)
+        self._occ[blocks * cpb * cpb + pos] = fresh
+        self._occ_pos[fresh] = pos
+        for b, n in zip(ids.tolist(), counts.tolist()):
+            self._occupied[b] += n
+
+    def remove(self, key: int) -> None:
+        #quita la clave si estaba (desenlazándola de su celda)
+        c = self._cell_of.item(key)
+        if c == EMPTY:
+            return
+        prev = self._prev.item(key)
+        nxt = self._next.item(key)
+        if prev != EMPTY:
+            self._next[prev] = nxt
+        else:
+            self._head[c] = nxt
+            if nxt == EMPTY:
+                self._vacate(self._block_of_code(c), c)
+        if nxt != EMPTY:
+            self._prev[nxt] = prev
+        self._cell_of[key] = EMPTY
+
+    def _occupy(self, b: int, c: int) -> None:
+        #la celda c (del bloque b) deja de estar vacía
+        p = self._occupied[b]
+        self._occ[b * self.cells_per_block * self.cells_per_block + p] = c
+        self._occ_pos[c] = p
+        self._occupied[b] = p + 1
+
+    def _vacate(self, b: int, c: int) -> None:
+        #la celda c (del bloque b) se queda vacía: la última de la lista ocupa su hueco
+        base = b * self.cells_per_block * self.cells_per_block
+        p = self._occ_pos.item(c)
+        last = self._occupied[b] - 1
+        moved = self._occ.item(base + last)
+        self._occ[base + p] = moved
+        self._occ_pos[moved] = p
+        self._occ_pos[c] = EMPTY
+        self._occupied[b] = last
+
+    def _keys(self, c: int, out: List[int]) -> None:
+        #añade a out las claves de la celda c
+        k = self._head.item(c)
+        nxt = self._next.item
+        while k != EMPTY:
+            out.append(k)
+            k = nxt(k)
+
+    def rings_near(self, x: float, y: float, blocks: Iterable[int]) -> Iterator[Tuple[float, List[int]]]:
+        """
+        Recorre los anillos de celdas alrededor del punto, del más cercano al más lejano,
+        como (distancia mínima del punto al anillo, claves del anillo), solo anillos con alguna clave.
+        Así el llamador puede medir todo un anillo de golpe (vectorizado).
+        blocks son los bloques que el llamador ya tiene bloqueados (los de blocks_near).
+        """
+        blocks = list(blocks)
+        occupied = 0
+        for b in blocks:
+            occupied += self._occupied[b]
+
+        #con pocas celdas ocupadas sale más barato medirlas todas de una vez que recorrer celdas vacías
+        if occupied * 4 < self._ring_cells:
+            c = self.cell_km
+            m = self.map_min
+            area = self.cells_per_block * self.cells_per_block
+            cps = self.cells_per_side
+            rr = self.radius_km * self.radius_km
+            near = []
+            for b in blocks:
+                n = self._occupied[b]
+                if not n:
+                    continue
+                for code in self._occ[b * area:b * area + n].tolist():
+                    cy, cx = divmod(code, cps)
+                    gx = max(m + cx * c - x, 0.0, x - (m + (cx + 1) * c))
+                    gy = max(m + cy * c - y, 0.0, y - (m + (cy + 1) * c))
+                    if gx * gx + gy * gy <= rr:
+                        self._keys(code, near)
+            if near:
+                yield 0.0, near
+            return
+
+        #solo celdas dentro del cuadrado del disco: sus bloques son justo los de blocks_near
+        cx, cy = self._cell(x, y)
+        x0, x1, y0, y1 = self._cell_box(x, y)
+
+        #al anillo k hay (k - 1) celdas enteras más lo que separa al punto del borde de su celda
+        c = self.cell_km
+        left = self.map_min + cx * c
+        bottom = self.map_min + cy * c
+        edge = max(0.0, min(x - left, left + c - x, y - bottom, bottom + c - y))
+        cps = self.cells_per_side
+        head = self._head.item
+        nxt = self._next.item
+        c0 = cy * cps + cx
+        for (lower, ring), (r, offsets) in zip(self._rings, self._ring_offsets):
+            keys = []
+            if cx - r >= x0 and cx + r <= x1 and cy - r >= y0 and cy + r <= y1:
+                #anillo entero dentro del cuadrado: sin comprobar cada celda
+                for off in offsets:
+                    k = head(c0 + off)
+                    while k != EMPTY:
+                        keys.append(k)
+                        k = nxt(k)
+            else:
+                for dx, dy in ring:
+                    nx = cx + dx
+                    ny = cy + dy
+                    if nx < x0 or nx > x1 or ny < y0 or ny > y1:
+                        continue
+                    k = head(ny * cps + nx)
+                    while k != EMPTY:
+                        keys.append(k)
+                        k = nxt(k)
+            if keys:
+                yield (lower + edge if r else 0.0), keys
+
+
+@functools.lru_cache(maxsize=None)
+def _rings_for(cell_km: float, radius_km: float) -> List[Tuple[float, List[Tuple[int, int]]]]:
+    """
+    Anillos de celdas alrededor de la celda central (anillo k = celdas con max(|dx|, |dy|) == k),
+    solo con las celdas que pueden tocar el disco de búsqueda.
+    La distancia mínima desde cualquier punto de la celda central a una celda del anillo k
+    es al menos cell_km * (k - 1).
+    """
+    reach = int(math.ceil(radius_km / cell_km)) + 1
+    rings = []
+    for k in range(reach + 1):
+        ring = []
+        for dx in range(-k, k + 1):
+            for dy in range(-k, k + 1):
+                if max(abs(dx), abs(dy)) != k:
+                    continue
+                lower = cell_km * math.hypot(max(abs(dx) - 1, 0), max(abs(dy) - 1, 0))
+                if lower <= radius_km:
+                    ring.append((dx, dy))
+        if ring:
+            rings.append((cell_km * max(k - 1, 0), ring))
+    return rings
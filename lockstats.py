@@ -0,0 +1,166 @@
+#instrumentación opcional de semáforos: espera, retención y número de adquisiciones
+import sys                  #para saber desde qué método se coge el semáforo
+import threading            #lock interno de las estadísticas
+import time                 #perf_counter_ns
+
+from typing import Dict, List, Tuple
+
+
+#cubetas del histograma: potencias de 2 en microsegundos (<1µs, <2µs, <4µs, ... , <2^20µs, resto)
+N_BUCKETS = 22
+
+#métodos auxiliares que solo cogen semáforos por encargo: el sitio es quien los llama
+HELPERS = frozenset({"_acquire_zones", "_release_zones", "acquire_all_zones", "release_all_zones"})
+
+
+def _bucket(ns: int) -> int:
+    #cubeta de una duración en nanosegundos
+    return min(N_BUCKETS - 1, (ns // 1000).bit_length())
+
+
+def _bucket_label(b: int) -> str:
+    return f"<{1 << b}µs" if b < N_BUCKETS - 1 else f">={1 << (b - 1)}µs"
+
+
+class Histograma:
+    #histograma logarítmico + totales (todo en nanosegundos)
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, ns: int) -> None:
+        self.buckets[_bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def mean_us(self) -> float:
+        return self.total / self.count / 1000.0 if self.count else 0.0
+
+    def percentile_us(self, p: float) -> float:
+        #límite superior de la cubeta donde cae el percentil p (0-100)
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100.0
+        acc = 0
+        for b, n in enumerate(self.buckets):
+            acc += n
+            if acc >= target:
+                return float(1 << b) if b < N_BUCKETS - 1 else self.max / 1000.0
+        return self.max / 1000.0
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_us": self.mean_us(),
+            "p50_us": self.percentile_us(50),
+            "p99_us": self.percentile_us(99),
+            "max_us": self.max / 1000.0,
+            "buckets": {_bucket_label(b): n for b, n in enumerate(self.buckets) if n},
+        }
+
+
+class LockStats:
+    """
+    Estadísticas de todos los semáforos instrumentados de un Sistema.
+    Por cada (semáforo, sitio) guarda un histograma de espera y otro de retención.
+    El sitio es el método que coge el semáforo (assign_taxi, finish_trip, now_minute...).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[Tuple[str, str], Tuple[Histograma, Histograma]] = {}
+
+    def record(self, name: str, site: str, wait_ns: int, hold_ns: int) -> None:
+        key = (name, site)
+        self._lock.acquire()
+        try:
+            h = self._data.get(key)
+            if h is None:
+                h = self._data[key] = (Histograma(), Histograma())
+            h[0].add(wait_ns)
+            h[1].add(hold_ns)
+        finally:
+            self._lock.release()
+
+    def as_dict(self) -> List[dict]:
+        #para exportar (JSON)
+        self._lock.acquire()
+        try:
+            items = sorted(self._data.items())
+        finally:
+            self._lock.release()
+        return [{"lock": name, "site": site, "wait": w.as_dict(), "hold": h.as_dict()}
+                for (name, site), (w, h) in items]
+
+    def report(self) -> str:
+        """
+        Tabla por semáforo y sitio:
+        - n: adquisiciones
+        - espera / retención: media y p99 (límite de cubeta) en µs
+        - histograma de espera (cubetas no vacías)
+        """
+        lines = [
+            f"{'Semáforo':<16} {'Sitio':<22} {'n':>9} {'esp. media':>11} {'esp. p99':>10} "
+            f"{'ret. media':>11} {'ret. p99':>10}",
+        ]
+        for e in self.as_dict():
+            w, h = e["wait"], e["hold"]
+            lines.append(
+                f"{e['lock']:<16} {e['site']:<22} {w['count']:>9} {w['mean_us']:>9.2f}µs "
+                f"{w['p99_us']:>8.0f}µs {h['mean_us']:>9.2f}µs {h['p99_us']:>8.0f}µs"
+            )
+            lines.append(" " * 40 + "espera: " + " ".join(f"{k}:{n}" for k, n in w["buckets"].items()))
+        return "\n".join(lines)
+
+
+def _call_site() -> str:
+    #primer método por encima de acquire que no sea un auxiliar de zonas
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_name in HELPERS:
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else "?"
+
+
+class InstrumentedLock:
+    """
+    Envuelve un semáforo binario (Semaphore(1) o Lock) con la misma interfaz acquire/release
+    y apunta en LockStats cuánto se esperó para cogerlo y cuánto se tuvo.
+    Al ser binario solo hay un dueño a la vez, así que basta un hueco para
+    el instante de adquisición y el sitio.
+    """
+    __slots__ = ("name", "inner", "stats", "_t_acquired", "_wait", "_site")
+
+    def __init__(self, name: str, inner, stats: LockStats):
+        self.name = name
+        self.inner = inner
+        self.stats = stats
+        self._t_acquired = 0
+        self._wait = 0
+        self._site = ""
+
+    def acquire(self, blocking: bool = True, timeout: float = None) -> bool:
+        site = _call_site()
+        t0 = time.perf_counter_ns()
+        if timeout is None:
+            ok = self.inner.acquire(blocking)
+        else:
+            ok = self.inner.acquire(blocking, timeout)
+        if ok:
+            t1 = time.perf_counter_ns()
+            self._t_acquired = t1
+            self._wait = t1 - t0
+            self._site = site
+        return ok
+
+    def release(self) -> None:
+        hold = time.perf_counter_ns() - self._t_acquired
+        wait = self._wait
+        site = self._site
+        self.inner.release()
+        self.stats.record(self.name, site, wait, hold)
@@ -1,11 +1,26 @@
-import random
+import asyncio
+import os
 import threading
 import time
 
-from config import MAP_MIN, MAP_MAX
-from models import Taxi
-from sistema import Sistema
-from cliente import Cliente
+import config
+from fleet import Fleet
+from eventos import BinarySink, ColumnarSink, ConsoleSink, JsonLinesSink, NullSink
+from sistema import Sistema, semilla_maestra
+from cliente import Cliente, ClienteAsync, ClienteBase
+from simulador import SimuladorEventos
+import checkpoint
+import metricas
+
+
+#destinos de los eventos de viaje que se pueden elegir al arrancar
+SALIDAS = {
+    "consola": ConsoleSink,
+    "jsonl": lambda: JsonLinesSink("viajes.jsonl"),
+    "binario": lambda: BinarySink("viajes.bin"),
+    "columnas": lambda: ColumnarSink("viajes_col"),
+    "ninguna": NullSink,
+}
 
 
 def read_positive_int(prompt: str) -> int:
@@ -19,53 +34,100 @@ def read_positive_int(prompt: str) -> int:
         print("Introduce un entero positivo.")
 
 
+def read_choice(prompt: str, options) -> str:
+    while True:
+        v = input(prompt).strip().lower()
+        if v in options:
+            return v
+        print("Opciones válidas:", ", ".join(options))
+
+
 def resumen_final(sistema: Sistema):
  
-    sistema.sem_taxis.acquire()
-    try:
-        taxis = list(sistema.taxis)
-    finally:
-        sistema.sem_taxis.release()
+    #foto de la flota (una pasada, sin objetos por taxi ni semáforos) para el listado por taxi
+    f = sistema.taxis.snapshot()
+    ids, services, earnings, rating_avg = f.id, f.services, f.earnings, f.rating_avg()
 
     print("\n" + "=" * 50)
-    print("RESUMEN FINAL DEL DÍA")
+    print("RESUMEN FINAL DEL DÍA" if config.DAYS == 1 else f"RESUMEN FINAL ({config.DAYS} DÍAS)")
     print("=" * 50)
+    print(f"Semilla: {sistema.semilla} (config.SEMILLA para repetir el día)")
 
-    top_g = None
-    top_r = None
-
-    for t in taxis:
+    for tid, sv, g, r in zip(ids.tolist(), services.tolist(), earnings.tolist(), rating_avg.tolist()):
         print(
-            f"Taxi-{t.id} | Servicios: {t.services} | "
-            f"Ganancias: {t.earnings:.2f} € | "
-            f"Rating medio: {t.rating_avg:.2f}"
+            f"Taxi-{tid} | Servicios: {sv} | "
+            f"Ganancias: {g:.2f} € | "
+            f"Rating medio: {r:.2f}"
         )
 
-        if top_g is None or t.earnings > top_g.earnings:
-            top_g = t
-        if top_r is None or t.rating_avg > top_r.rating_avg:
-            top_r = t
-
-    if top_g:
-        print(f"\n🏆 Taxi con más ganancias: Taxi-{top_g.id}")
-    if top_r:
-        print(f"⭐ Taxi mejor valorado: Taxi-{top_r.id} ({top_r.rating_avg:.2f})")
-
+    resumen_agregados(sistema)
+
+
+def resumen_agregados(sistema: Sistema):
+    """
+    Rankings y totales por hora / zona a partir de los agregados del Sistema.
+    Cuesta O(k): no recorre ni bloquea la flota, así que vale también a mitad de día.
+    """
+    if not len(sistema.taxis):
+        return
+    ids = sistema.taxis.id
+    r = sistema.stats.resumen(config.TOP_K)
+
+    #sin viajes gana el primer taxi (con 0), igual que argmax
+    top_g = r["top_earnings"] or [(0, 0.0)]
+    top_r = r["top_rating"] or [(0, 0.0)]
+    print(f"\n🏆 Taxi con más ganancias: Taxi-{ids.item(top_g[0][0])}")
+    print(f"⭐ Taxi mejor valorado: Taxi-{ids.item(top_r[0][0])} ({top_r[0][1]:.2f})")
+
+    print(f"\nTop {config.TOP_K} ganancias: " +
+          ", ".join(f"Taxi-{ids.item(i)} ({v:.2f} €)" for i, v in r["top_earnings"]))
+    print(f"Top {config.TOP_K} rating: " +
+          ", ".join(f"Taxi-{ids.item(i)} ({v:.2f})" for i, v in r["top_rating"]))
+    print(f"Servicios: {r['servicios']} | Ganancias: {r['ganancias']:.2f} € | "
+          f"Rating medio: {r['rating_medio']:.2f}")
+
+    #días sellados y el último (el que aún está abierto)
+    if r["dias"]:
+        print("\nPor día:")
+        for d in r["dias"] + [r["hoy"]]:
+            print(f"  Día {d['dia'] + 1:>3} | Servicios: {d['servicios']:>6} | "
+                  f"Ganancias: {d['ganancias']:>10.2f} € | Rating medio: {d['rating_medio']:.2f}")
+
+    print("\nPor hora (fin del viaje):" if not r["dias"] else f"\nPor hora, día {r['dia'] + 1} (fin del viaje):")
+    h = r["por_hora"]
+    for hour, (sv, g) in enumerate(zip(h["services"], h["earnings"])):
+        if sv:
+            etiqueta = f"{hour:02d}h" if hour < config.DAY_MINUTES // 60 else "+1d"
+            print(f"  {etiqueta} | Servicios: {sv:>6} | Ganancias: {g:>10.2f} €")
+
+    print("Por zona (destino):" if not r["dias"] else f"Por zona, día {r['dia'] + 1} (destino):")
+    z = r["por_zona"]
+    for zone, (sv, g) in enumerate(zip(z["services"], z["earnings"])):
+        print(f"  Zona {zone:>2} | Servicios: {sv:>6} | Ganancias: {g:>10.2f} €")
+
+
+def resumen_semaforos(sistema: Sistema):
+    #solo con config.LOCK_STATS = True
+    if sistema.lock_stats is None:
+        return
+    print("\n" + "=" * 50)
+    print("SEMÁFOROS (espera / retención por sitio)")
+    print("=" * 50)
+    print(sistema.lock_stats.report())
 
-def main():
-    n_taxis = read_positive_int("Ingrese número de taxis: ")
-    n_clients = read_positive_int("Ingrese número de clientes: ")
 
-    taxis = [
-        Taxi(id=i + 1, x=random.uniform(MAP_MIN, MAP_MAX), y=random.uniform(MAP_MIN, MAP_MAX))
-        for i in range(n_taxis)
-    ]
+def arrancar_metricas(sistema: Sistema):
+    #servidor de métricas en vivo si config.METRICAS_PUERTO lo pide (ver metricas.py)
+    servidor = metricas.arrancar(sistema)
+    if servidor is not None:
+        print(f"Métricas en http://{config.METRICAS_HOST}:{servidor.port}/metrics (y /metrics.json)")
+    return servidor
 
-    sistema = Sistema(taxis)
 
-    #teloj 24h
-    clock = threading.Thread(target=sistema.clock_loop)
-    clock.start()
+def simular_hilos(sistema: Sistema, n_clients: int):
+    #despachador central (si está activo en config)
+    if sistema.despachador is not None:
+        sistema.start_thread(sistema.despachador.run)
 
     #clientes persistentes
     clients = [Cliente(sistema, client_id=i + 1) for i in range(n_clients)]
@@ -73,6 +135,10 @@ def main():
     for c in clients:
         c.start()
 
+    #teloj 24h: arranca el último, así la barrera del reloj ya cuenta con todos los hilos
+    clock = threading.Thread(target=sistema.clock_loop)
+    clock.start()
+
     #esperar fin del día + servicios activos == 0
     while True:
         finished = sistema.is_day_finished()
@@ -80,8 +146,76 @@ def main():
         if finished and active == 0:
             break
         time.sleep(0.1)
+    return clients
+
+
+def simular_eventos(sistema: Sistema, n_clients: int):
+    #mismo día, pero saltando de evento en evento con reloj virtual
+    clients = [ClienteBase(sistema, client_id=i + 1) for i in range(n_clients)]
+    SimuladorEventos(sistema, clients).run()
+    return clients
+
+
+async def simular_async(sistema: Sistema, n_clients: int):
+    #un único hilo: reloj y clientes son corrutinas del mismo bucle
+    clients = [ClienteAsync(sistema, client_id=i + 1) for i in range(n_clients)]
 
+    #cada cliente termina tras su último viaje, así que basta esperar a todos
+    loops = [sistema.clock_loop_async()]
+    if sistema.despachador is not None:
+        loops.append(sistema.despachador.run_async())
+    await asyncio.gather(*loops, *(c.run() for c in clients))
+    return clients
+
+
+def main():
+    n_taxis = read_positive_int("Ingrese número de taxis: ")
+    n_clients = read_positive_int("Ingrese número de clientes: ")
+    motor = read_choice("Motor (hilos/asyncio/eventos): ", ("hilos", "asyncio", "eventos"))
+    salida = read_choice("Salida de viajes (" + "/".join(SALIDAS) + "): ", tuple(SALIDAS))
+
+    #una semilla para flota y clientes: con config.SEMILLA el día se repite entero
+    semilla = semilla_maestra()
+    taxis = Fleet.random(n_taxis, config.MAP_MIN, config.MAP_MAX, semilla)
+    sink = SALIDAS[salida]()
+
+    if motor == "eventos" and config.CHECKPOINT_MINUTES and os.path.exists(config.CHECKPOINT_PATH) \
+            and read_choice(f"Reanudar desde {config.CHECKPOINT_PATH}? (si/no): ", ("si", "no")) == "si":
+        #flota, clientes y reloj salen del checkpoint (los números de arriba no cuentan)
+        sim = checkpoint.cargar(config.CHECKPOINT_PATH, sink=sink)
+        sistema = sim.sistema
+        servidor = arrancar_metricas(sistema)
+        sim.run()
+    elif motor == "eventos":
+        #reloj virtual: un solo hilo, sin sleeps
+        sistema = Sistema(taxis, concurrent=False, sink=sink, semilla=semilla)
+        servidor = arrancar_metricas(sistema)
+        simular_eventos(sistema, n_clients)
+    elif motor == "asyncio":
+        #mismo reloj en tiempo real, pero clientes como corrutinas en un solo hilo
+        sistema = Sistema(taxis, concurrent=False, sink=sink, semilla=semilla)
+        servidor = arrancar_metricas(sistema)
+        asyncio.run(simular_async(sistema, n_clients))
+    else:
+        sistema = Sistema(taxis, sink=sink, semilla=semilla)
+        servidor = arrancar_metricas(sistema)
+        simular_hilos(sistema, n_clients)
+
+    #última fila de la serie: lo que terminó pasadas las 24:00
+    sistema.close_minutes(sistema.now_minute() + 1)
+
+    #que salga todo lo encolado antes del resumen
+    sistema.close_events()
     resumen_final(sistema)
+    resumen_semaforos(sistema)
+
+    #serie por minuto para graficar (si config.SERIES_CSV tiene ruta)
+    if config.SERIES_CSV:
+        sistema.series.to_csv(config.SERIES_CSV)
+        print(f"\nSerie por minuto guardada en {config.SERIES_CSV}")
+
+    if servidor is not None:
+        servidor.close()
 
 
 if __name__ == "__main__":
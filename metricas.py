@@ -0,0 +1,188 @@
+#métricas en vivo de una simulación por HTTP en localhost: texto Prometheus (/metrics) y JSON (/metrics.json)
+import json                 #salida /metrics.json
+import threading            #hilo del servidor
+import time                 #perf_counter_ns para las latencias
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import config
+from lockstats import Histograma, N_BUCKETS
+
+
+#latencias que se miden con el servidor activo (nombre -> qué es)
+LATENCIAS = {
+    "asignacion": "assign_taxi / assign_or_wait, semáforos incluidos",
+    "fin_viaje": "finish_trip, semáforos incluidos",
+    "lote": "un lote del despachador central",
+}
+
+
+class Latencias:
+    """
+    Histogramas logarítmicos (los de lockstats) de las operaciones de LATENCIAS.
+    Quien mide los actualiza con sem (semáforo binario del Sistema, solo entre ellos);
+    el servidor los lee sin cogerlo: como mucho ve una medida a medio sumar.
+    """
+
+    def __init__(self, sem):
+        self.sem = sem
+        self.hist: Dict[str, Histograma] = {name: Histograma() for name in LATENCIAS}
+
+    @staticmethod
+    def start() -> int:
+        return time.perf_counter_ns()
+
+    def add(self, name: str, t0: int) -> None:
+        #apunta lo que pasó desde t0 (de start())
+        ns = time.perf_counter_ns() - t0
+        h = self.hist[name]
+        self.sem.acquire()
+        try:
+            h.add(ns)
+        finally:
+            self.sem.release()
+
+
+def recoger(sistema) -> dict:
+    """
+    Estado actual a partir de contadores ya agregados, sin coger ningún semáforo del Sistema:
+    reloj, libres / ocupados (tupla publicada), servicios activos, asignaciones y fallos
+    acumulados, la última fila cerrada de la serie, el despachador, la sala de espera,
+    los totales de los agregados y las latencias.
+    """
+    s = sistema
+    libres, ocupados = s.taxi_status_counts()
+    se = s.series
+    rows = se.rows
+    ultimo = None
+    if rows:
+        j = (rows - 1) % se.capacity
+        ultimo = {
+            "minuto": int(se.minute[j]),
+            "asignaciones": int(se.assigned[j]),
+            "fallidas": int(se.failed[j]),
+            "recogida_km": float(se.pickup_km[j]),
+            "ingresos": float(se.revenue[j]),
+        }
+    st = s.stats
+    desp = s.despachador
+    out = {
+        "minuto": s.current_minute,
+        "hora": s.minute_to_clock(s.current_minute),
+        "minuto_virtual": s.virtual_minute,
+        "fin": s.day_finished,
+        "dia": st.day,
+        "taxis_libres": libres,
+        "taxis_ocupados": ocupados,
+        "servicios_activos": s.services_active,
+        "esperando": len(s.waiting),
+        "asignaciones": se.total_assigned,
+        "fallidas": se.total_failed,
+        "ultimo_minuto": ultimo,
+        "servicios": st.services,
+        "ganancias": st.total_earnings,
+        "rebalanceados": s.rebalanced,
+        "despacho": None if desp is None else {
+            "lotes": desp.batches,
+            "emparejadas": desp.matched,
+            "pendientes": desp.pending(),
+        },
+        "latencias": {},
+    }
+    if s.latencias is not None:
+        out["latencias"] = {name: h.as_dict() for name, h in s.latencias.hist.items()}
+    return out
+
+
+def _linea(lines: list, name: str, kind: str, help_: str, value) -> None:
+    lines.append(f"# HELP taxi_{name} {help_}")
+    lines.append(f"# TYPE taxi_{name} {kind}")
+    lines.append(f"taxi_{name} {float(value)!r}")
+
+
+def prometheus(sistema) -> str:
+    #lo mismo que recoger(), en formato de texto de Prometheus (latencias en segundos)
+    d = recoger(sistema)
+    lines = []
+    _linea(lines, "minuto", "gauge", "Minuto simulado actual.", d["minuto"])
+    _linea(lines, "fin", "gauge", "1 si ya terminó el último día.", int(d["fin"]))
+    _linea(lines, "libres", "gauge", "Taxis libres.", d["taxis_libres"])
+    _linea(lines, "ocupados", "gauge", "Taxis ocupados.", d["taxis_ocupados"])
+    _linea(lines, "servicios_activos", "gauge", "Servicios en curso.", d["servicios_activos"])
+    _linea(lines, "esperando", "gauge", "Clientes en la sala de espera.", d["esperando"])
+    _linea(lines, "asignaciones_total", "counter", "Asignaciones con taxi.", d["asignaciones"])
+    _linea(lines, "fallidas_total", "counter", "Búsquedas sin taxi al alcance.", d["fallidas"])
+    _linea(lines, "servicios_total", "counter", "Viajes terminados.", d["servicios"])
+    _linea(lines, "ganancias_euros_total", "counter", "Lo cobrado en viajes terminados.", d["ganancias"])
+    _linea(lines, "rebalanceados_total", "counter", "Taxis libres movidos por el rebalanceo.", d["rebalanceados"])
+    if d["despacho"] is not None:
+        _linea(lines, "despacho_lotes_total", "counter", "Lotes del despachador.", d["despacho"]["lotes"])
+        _linea(lines, "despacho_emparejadas_total", "counter", "Peticiones emparejadas por el despachador.",
+               d["despacho"]["emparejadas"])
+        _linea(lines, "despacho_pendientes", "gauge", "Peticiones en cola.", d["despacho"]["pendientes"])
+
+    if sistema.latencias is not None:
+        for name, h in sistema.latencias.hist.items():
+            metric = f"taxi_latencia_{name}_segundos"
+            lines.append(f"# HELP {metric} Latencia de {LATENCIAS[name]}.")
+            lines.append(f"# TYPE {metric} histogram")
+            buckets = list(h.buckets)
+            acc = 0
+            for b, n in enumerate(buckets):
+                acc += n
+                le = "+Inf" if b == N_BUCKETS - 1 else repr((1 << b) / 1e6)
+                lines.append(f'{metric}_bucket{{le="{le}"}} {acc}')
+            lines.append(f"{metric}_sum {h.total / 1e9!r}")
+            lines.append(f"{metric}_count {acc}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        sistema = self.server.sistema
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = prometheus(sistema).encode("utf-8")
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(recoger(sistema)).encode("utf-8")
+            ctype = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        #sin una línea por petición en la consola de la simulación
+        pass
+
+
+class ServidorMetricas:
+    """
+    Servidor HTTP en un hilo daemon (un hilo más por petición) sobre un Sistema:
+    cada petición lee los contadores en el momento, así un scraper nunca frena el reparto.
+    """
+
+    def __init__(self, sistema, host: str, port: int):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.sistema = sistema
+        self.port = self.httpd.server_address[1]     #el real si se pidió el 0
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def arrancar(sistema) -> Optional[ServidorMetricas]:
+    #servidor en config.METRICAS_HOST:config.METRICAS_PUERTO, o None si está desactivado
+    if config.METRICAS_PUERTO is None:
+        return None
+    return ServidorMetricas(sistema, config.METRICAS_HOST, config.METRICAS_PUERTO)
@@ -4,7 +4,7 @@ from dataclasses import dataclass  #para definir estructuras de datos de forma l
 from typing import Optional        #para tipos opcionales 
 
 
-@dataclass
+@dataclass(slots=True)
 class Taxi:
     #identificador del taxi
     id: int
@@ -0,0 +1,185 @@
+#muchos días independientes en paralelo (un proceso por núcleo) para dimensionar flotas
+import argparse             #parámetros por línea de comandos
+import asyncio              #corridas con el motor asyncio
+import os                   #número de núcleos
+import random               #semilla de cada corrida
+import time                 #duración real de cada corrida
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+import config
+from fleet import Fleet
+from sistema import Sistema, semilla_maestra
+from main import simular_async, simular_eventos, simular_hilos
+
+
+#métricas de cada día que se agregan al final
+METRICAS = ("earnings", "services", "rating", "failed")
+
+#motores con los que se puede simular una corrida (hilos y asyncio van a SIM_MINUTE_SECONDS por minuto)
+MOTORES = ("eventos", "asyncio", "hilos")
+
+
+@dataclass
+class Corrida:
+    #un día a simular: tamaño de flota, clientes y cambios de config.py solo para esta corrida
+    run_id: int
+    seed: int
+    n_taxis: int
+    n_clients: int
+    overrides: Dict[str, object] = field(default_factory=dict)
+    motor: str = "eventos"
+
+
+def run_seed(master_seed: int, run_id: int) -> int:
+    #semilla determinista de la corrida run_id (no depende del orden ni del proceso que la ejecute)
+    return int(np.random.SeedSequence([master_seed, run_id]).generate_state(1, dtype=np.uint64)[0])
+
+
+def semilla_lote(master_seed: int, overrides: Dict[str, object] = None) -> Tuple[int, Dict[str, object]]:
+    #SEMILLA en los overrides repetiría el mismo día en todas las corridas:
+    #pasa a ser la semilla maestra y cada corrida saca la suya con run_seed
+    overrides = dict(overrides or {})
+    semilla = overrides.pop("SEMILLA", None)
+    return (master_seed if semilla is None else semilla), overrides
+
+
+def corridas(master_seed: int, n_runs: int, n_taxis: int, n_clients: int,
+             overrides: Dict[str, object] = None, motor: str = "eventos") -> List[Corrida]:
+    #n_runs días con la misma configuración y semillas distintas
+    master_seed, overrides = semilla_lote(master_seed, overrides)
+    return [Corrida(i, run_seed(master_seed, i), n_taxis, n_clients, dict(overrides), motor)
+            for i in range(n_runs)]
+
+
+def simular_dia(c: Corrida) -> dict:
+    """
+    Simula un día completo con el motor de la corrida (sin consola) y devuelve sus totales
+    y cuántos segundos reales tardó.
+    Se ejecuta en un proceso del pool; config se restaura al terminar porque
+    el proceso se reutiliza para otras corridas.
+    """
+    previos = config.aplicar(c.overrides)
+    try:
+        random.seed(c.seed)
+        semilla = semilla_maestra()
+        sistema = Sistema(Fleet.random(c.n_taxis, config.MAP_MIN, config.MAP_MAX, semilla),
+                          verbose=False, concurrent=c.motor == "hilos", semilla=semilla)
+        t0 = time.perf_counter()
+        if c.motor == "hilos":
+            clients = simular_hilos(sistema, c.n_clients)
+        elif c.motor == "asyncio":
+            clients = asyncio.run(simular_async(sistema, c.n_clients))
+        else:
+            clients = simular_eventos(sistema, c.n_clients)
+        segundos = time.perf_counter() - t0
+
+        f = sistema.taxis
+        rated = f.rating_count.sum()
+        return {
+            "run_id": c.run_id,
+            "seed": c.seed,
+            "n_taxis": c.n_taxis,
+            "n_clients": c.n_clients,
+            "motor": c.motor,
+            "overrides": c.overrides,
+            "earnings": float(f.earnings.sum()),
+            "services": int(f.services.sum()),
+            "rating": float(f.rating_sum.sum() / rated) if rated else 0.0,
+            "failed": sum(cl.failed for cl in clients),
+            "segundos": segundos,
+        }
+    finally:
+        config.aplicar(previos)
+
+
+def ejecutar(lote: Iterable[Corrida], workers: int = None) -> Iterator[dict]:
+    #reparte las corridas entre todos los núcleos y devuelve cada resultado en cuanto termina
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(simular_dia, c) for c in lote]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
+def agregar(resultados: List[dict]) -> Dict[str, Dict[str, float]]:
+    #media y percentiles de cada métrica
+    out = {}
+    for m in METRICAS:
+        v = np.array([r[m] for r in resultados], dtype=np.float64)
+        p5, p50, p95 = np.percentile(v, [5, 50, 95]) if len(v) else (0.0, 0.0, 0.0)
+        out[m] = {
+            "mean": float(v.mean()) if len(v) else 0.0,
+            "p5": float(p5),
+            "p50": float(p50),
+            "p95": float(p95),
+        }
+    return out
+
+
+def imprimir_agregado(agregado: Dict[str, Dict[str, float]], n: int) -> None:
+    print("\n" + "=" * 50)
+    print(f"MONTE CARLO: {n} días")
+    print("=" * 50)
+    nombres = {
+        "earnings": "Ganancias (€)",
+        "services": "Servicios",
+        "rating": "Rating medio",
+        "failed": "Asignaciones fallidas",
+    }
+    for m in METRICAS:
+        a = agregado[m]
+        print(f"{nombres[m]:<22} media {a['mean']:>11.2f} | p5 {a['p5']:>11.2f} | "
+              f"p50 {a['p50']:>11.2f} | p95 {a['p95']:>11.2f}")
+
+
+def parse_valor(nombre: str, texto: str):
+    #texto -> valor con el tipo del valor actual de config (los None admiten número o texto)
+    actual = getattr(config, nombre)
+    if isinstance(actual, bool):
+        return texto.lower() in ("1", "true", "si", "sí")
+    if actual is None:
+        for tipo in (int, float):
+            try:
+                return tipo(texto)
+            except ValueError:
+                pass
+        return None if texto == "None" else texto
+    return type(actual)(texto)
+
+
+def parse_override(texto: str):
+    #"NOMBRE=valor" -> (NOMBRE, valor con el tipo del valor actual de config)
+    nombre, _, valor = texto.partition("=")
+    return nombre, parse_valor(nombre, valor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula muchos días independientes en paralelo.")
+    parser.add_argument("--dias", type=int, default=100)
+    parser.add_argument("--taxis", type=int, default=50)
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--motor", choices=MOTORES, default="eventos")
+    parser.add_argument("--set", action="append", default=[], metavar="NOMBRE=valor",
+                        help="cambia un parámetro de config.py (se puede repetir)")
+    args = parser.parse_args()
+
+    overrides = dict(parse_override(t) for t in args.set)
+    lote = corridas(args.semilla, args.dias, args.taxis, args.clientes, overrides, args.motor)
+
+    resultados = []
+    for r in ejecutar(lote, args.procesos):
+        resultados.append(r)
+        print(f"Día {r['run_id']:>4} | Servicios: {r['services']:>6} | "
+              f"Ganancias: {r['earnings']:>10.2f} € | Fallidas: {r['failed']:>6}")
+
+    imprimir_agregado(agregar(resultados), len(resultados))
+
+
+if __name__ == "__main__":
+    main()
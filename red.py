@@ -0,0 +1,189 @@
+#red de calles: distancias por carretera en vez de en línea recta
+import functools            #red compartida por configuración y caché de filas
+import heapq                #Dijkstra en redes grandes
+import math                 #infinito inicial de Dijkstra
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+class RedViaria:
+    """
+    Cuadrícula de calles cada calle_km sobre el mapa, con una fracción de tramos cortados:
+    - los nodos son los cruces; cada punto entra y sale de la red por su cruce más cercano
+      (a pie de calle, en distancia Manhattan)
+    - siempre queda conectada: los cortes solo se hacen fuera de un árbol generador aleatorio
+    - con pocos cruces (tabla_max, config.RED_TABLA_MAX) se precalcula la tabla completa cruce-cruce
+      (Floyd-Warshall con NumPy); con más, cada fila sale de un Dijkstra y se guarda en una
+      caché LRU de cache_filas (config.RED_CACHE_FILAS) filas
+    Nunca da menos que la línea recta, así la rejilla de taxis libres (que poda por
+    distancia euclídea) sigue encontrando a todos los que están dentro del radio.
+    """
+
+    def __init__(self, map_min: float, map_max: float, calle_km: float, cortadas: float, semilla: int,
+                 tabla_max: int, cache_filas: int):
+        self.map_min = map_min
+        self.side = max(2, int(round((map_max - map_min) / calle_km)) + 1)
+        self.calle_km = (map_max - map_min) / (self.side - 1)
+        n = self.side * self.side
+
+        #tramos entre cruces vecinos: (a, b)
+        edges = []
+        for r in range(self.side):
+            for c in range(self.side):
+                a = r * self.side + c
+                if c + 1 < self.side:
+                    edges.append((a, a + 1))
+                if r + 1 < self.side:
+                    edges.append((a, a + self.side))
+
+        #árbol generador aleatorio (Kruskal con pesos al azar) + el resto de tramos salvo los cortados
+        rng = np.random.default_rng(semilla)
+        order = rng.permutation(len(edges)).tolist()
+        parent = list(range(n))
+
+        def find(v: int) -> int:
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        kept = []
+        rest = []
+        for e in order:
+            a, b = edges[e]
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[ra] = rb
+                kept.append(edges[e])
+            else:
+                rest.append(edges[e])
+        n_cut = int(round(cortadas * len(edges)))
+        kept += rest[min(n_cut, len(rest)):]
+
+        self.adj: List[List[int]] = [[] for _ in range(n)]
+        for a, b in kept:
+            self.adj[a].append(b)
+            self.adj[b].append(a)
+
+        #tabla completa si cabe (solo como array: n * n floats); si no, filas bajo demanda con LRU
+        self.tabla = None
+        if n <= tabla_max:
+            self.tabla = self._floyd_warshall(n, kept)
+        else:
+            self._fila = functools.lru_cache(maxsize=cache_filas)(self._dijkstra)
+
+    def _floyd_warshall(self, n: int, edges: List[Tuple[int, int]]) -> np.ndarray:
+        t = np.full((n, n), np.inf)
+        np.fill_diagonal(t, 0.0)
+        a = np.array([e[0] for e in edges])
+        b = np.array([e[1] for e in edges])
+        t[a, b] = t[b, a] = self.calle_km
+        for k in range(n):
+            np.minimum(t, t[:, k, None] + t[None, k, :], out=t)
+        return t
+
+    def _dijkstra(self, src: int) -> np.ndarray:
+        #distancias desde src a todos los cruces
+        dist = [math.inf] * len(self.adj)
+        dist[src] = 0.0
+        heap = [(0.0, src)]
+        step = self.calle_km
+        adj = self.adj
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > dist[v]:
+                continue
+            for w in adj[v]:
+                nd = d + step
+                if nd < dist[w]:
+                    dist[w] = nd
+                    heapq.heappush(heap, (nd, w))
+        return np.array(dist)
+
+    def nodo(self, x: float, y: float) -> Tuple[int, float]:
+        #cruce más cercano y distancia a pie de calle hasta él
+        s = self.calle_km
+        fx = (x - self.map_min) / s
+        fy = (y - self.map_min) / s
+        last = self.side - 1
+        c = min(max(int(fx + 0.5), 0), last)
+        r = min(max(int(fy + 0.5), 0), last)
+        return r * self.side + c, (abs(fx - c) + abs(fy - r)) * s
+
+    def nodos(self, xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        #igual que nodo, para arrays
+        s = self.calle_km
+        fx = (xs - self.map_min) / s
+        fy = (ys - self.map_min) / s
+        last = self.side - 1
+        c = np.clip(np.floor(fx + 0.5), 0, last)
+        r = np.clip(np.floor(fy + 0.5), 0, last)
+        return (r * self.side + c).astype(np.int64), (np.abs(fx - c) + np.abs(fy - r)) * s
+
+    def fila(self, na: int) -> np.ndarray:
+        #distancias por la red desde el cruce na a todos los cruces (para consultas sueltas, .item)
+        return self.tabla[na] if self.tabla is not None else self._fila(na)
+
+    def distancia(self, ax: float, ay: float, bx: float, by: float) -> float:
+        #distancia por la red de a a b: los redondeos de nodo en línea y una consulta a la tabla
+        #(o a una fila en caché); para muchos puntos contra uno fijo, distancias_nodos
+        m = self.map_min
+        s = self.calle_km
+        last = self.side - 1
+        fx = (ax - m) / s
+        fy = (ay - m) / s
+        gx = (bx - m) / s
+        gy = (by - m) / s
+        if not (0.0 <= fx <= last and 0.0 <= fy <= last and 0.0 <= gx <= last and 0.0 <= gy <= last):
+            #fuera del mapa: nodo lleva al cruce del borde
+            na, la = self.nodo(ax, ay)
+            nb, lb = self.nodo(bx, by)
+            if na == nb:
+                return abs(ax - bx) + abs(ay - by)
+            return la + self.fila(na).item(nb) + lb
+        ca = int(fx + 0.5)
+        ra = int(fy + 0.5)
+        cb = int(gx + 0.5)
+        rb = int(gy + 0.5)
+        if ca == cb and ra == rb:
+            return abs(ax - bx) + abs(ay - by)
+        na = ra * self.side + ca
+        nb = rb * self.side + cb
+        mid = self.tabla.item(na, nb) if self.tabla is not None else self._fila(na).item(nb)
+        return (abs(fx - ca) + abs(fy - ra) + abs(gx - cb) + abs(gy - rb)) * s + mid
+
+    @staticmethod
+    def distancias_nodos(ox: float, oy: float, origen: Tuple[int, float, np.ndarray], xs: np.ndarray,
+                         ys: np.ndarray, nb: np.ndarray, lb: np.ndarray) -> np.ndarray:
+        #distancias por la red desde (ox, oy) a cada punto (xs, ys), con sus cruces nb y tramos a pie lb;
+        #origen = (cruce de o, tramo a pie, fila de distancias del cruce), ya calculado por quien llama
+        na, la, fila = origen
+        d = la + fila[nb] + lb
+        same = nb == na
+        if same.any():
+            d[same] = np.abs(xs[same] - ox) + np.abs(ys[same] - oy)
+        return d
+
+    def distancias_pares(self, ax: np.ndarray, ay: np.ndarray, bx: np.ndarray, by: np.ndarray) -> np.ndarray:
+        #distancia por la red de cada a[k] a su b[k]
+        na, la = self.nodos(ax, ay)
+        nb, lb = self.nodos(bx, by)
+        if self.tabla is not None:
+            mid = self.tabla[na, nb]
+        else:
+            mid = np.array([self._fila(a).item(b) for a, b in zip(na.tolist(), nb.tolist())])
+        d = la + mid + lb
+        same = na == nb
+        if same.any():
+            d[same] = np.abs(ax[same] - bx[same]) + np.abs(ay[same] - by[same])
+        return d
+
+
+@functools.lru_cache(maxsize=4)
+def red_para(map_min: float, map_max: float, calle_km: float, cortadas: float, semilla: int,
+             tabla_max: int, cache_filas: int) -> RedViaria:
+    #una sola red por configuración (los Sistema de un lote Monte Carlo la comparten); tabla_max y
+    #cache_filas (config.RED_TABLA_MAX, config.RED_CACHE_FILAS) también la cambian: tabla o filas con LRU
+    return RedViaria(map_min, map_max, calle_km, cortadas, semilla, tabla_max, cache_filas)
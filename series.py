@@ -0,0 +1,116 @@
+#métricas minuto a minuto en arrays de tamaño fijo (anillo), exportables para graficar
+from typing import Dict
+
+import numpy as np
+
+
+#columnas de la serie, en el orden del CSV
+COLUMNAS = ("minute", "free", "active", "assigned", "failed", "pickup_km", "revenue")
+
+
+class SerieMinutos:
+    """
+    Una fila por minuto simulado en arrays preasignados de capacity filas:
+    - free / active: taxis libres y servicios activos al cerrar el minuto
+    - assigned / failed: asignaciones con y sin taxi durante el minuto
+    - pickup_km: distancia media taxi-cliente de las asignaciones del minuto
+    - revenue: lo cobrado en los viajes que terminaron en el minuto
+    Al llenarse se sobrescriben las filas más viejas, así la memoria no crece con la duración.
+    Los contadores del minuto en curso se protegen con sem (semáforo binario del Sistema).
+    """
+
+    def __init__(self, capacity: int, sem):
+        self.capacity = capacity
+        self.sem = sem
+
+        self.minute = np.zeros(capacity, dtype=np.int64)
+        self.free = np.zeros(capacity, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=np.int64)
+        self.assigned = np.zeros(capacity, dtype=np.int64)
+        self.failed = np.zeros(capacity, dtype=np.int64)
+        self.pickup_km = np.zeros(capacity, dtype=np.float64)
+        self.revenue = np.zeros(capacity, dtype=np.float64)
+
+        self.rows = 0               #filas escritas en total (puede pasar de capacity)
+        self.next_minute = 0        #primer minuto aún sin fila
+
+        #acumulados desde el principio (para métricas en vivo, se leen sin sem)
+        self.total_assigned = 0
+        self.total_failed = 0
+
+        #minuto en curso
+        self._assigned = 0
+        self._failed = 0
+        self._pickup_sum = 0.0
+        self._revenue = 0.0
+
+    def assigned_one(self, distance_km: float) -> None:
+        self.sem.acquire()
+        try:
+            self._assigned += 1
+            self.total_assigned += 1
+            self._pickup_sum += distance_km
+        finally:
+            self.sem.release()
+
+    def failed_one(self) -> None:
+        self.sem.acquire()
+        try:
+            self._failed += 1
+            self.total_failed += 1
+        finally:
+            self.sem.release()
+
+    def revenue_add(self, fare: float) -> None:
+        self.sem.acquire()
+        try:
+            self._revenue += fare
+        finally:
+            self.sem.release()
+
+    def advance(self, to_minute: int, free: int, active: int) -> None:
+        """
+        Cierra los minutos [next_minute, to_minute): el primero se lleva lo acumulado
+        y los demás (saltos del motor de eventos) quedan con contadores a cero.
+        """
+        self.sem.acquire()
+        try:
+            for m in range(self.next_minute, to_minute):
+                j = self.rows % self.capacity
+                self.minute[j] = m
+                self.free[j] = free
+                self.active[j] = active
+                self.assigned[j] = self._assigned
+                self.failed[j] = self._failed
+                self.pickup_km[j] = self._pickup_sum / self._assigned if self._assigned else 0.0
+                self.revenue[j] = self._revenue
+                self.rows += 1
+
+                self._assigned = 0
+                self._failed = 0
+                self._pickup_sum = 0.0
+                self._revenue = 0.0
+            self.next_minute = max(self.next_minute, to_minute)
+        finally:
+            self.sem.release()
+
+    def as_arrays(self) -> Dict[str, np.ndarray]:
+        #copia de las filas guardadas, de la más vieja a la más nueva
+        self.sem.acquire()
+        try:
+            n = min(self.rows, self.capacity)
+            start = self.rows - n
+            order = (np.arange(start, self.rows) % self.capacity) if n else np.zeros(0, dtype=np.int64)
+            return {c: getattr(self, c)[order].copy() for c in COLUMNAS}
+        finally:
+            self.sem.release()
+
+    def to_csv(self, path: str) -> None:
+        cols = self.as_arrays()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(",".join(COLUMNAS) + "\n")
+            for row in zip(*(cols[c].tolist() for c in COLUMNAS)):
+                f.write(",".join(str(v) for v in row) + "\n")
+
+    def to_npz(self, path: str) -> None:
+        np.savez(path, **self.as_arrays())
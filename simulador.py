@@ -0,0 +1,163 @@
+#motor de eventos discretos: mismo Sistema y mismos clientes, pero con reloj virtual
+import functools            #para el aviso de despertar de cada cliente
+import heapq                #cola de eventos ordenada por minuto
+import itertools            #contador para desempatar eventos del mismo minuto
+
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import config
+from sistema import Sistema
+from cliente import ClienteBase
+from espera import Espera
+from despacho import Solicitud
+
+
+class SimuladorEventos:
+    """
+    Simulación sin sleeps reales:
+    - Cada cliente es un generador (ClienteBase.pasos) que devuelve cuántos minutos esperar
+    - Los eventos (inicio de viaje, fin de viaje, reintento, fin de espera) van a un heap por minuto
+    - Un cliente en la sala de espera sale del heap y vuelve cuando finish_trip lo despierta
+    - Con despachador, las peticiones de cada minuto se emparejan en un lote al cerrar ese minuto
+    - El reloj salta directamente al siguiente evento
+    - Con config.CHECKPOINT_MINUTES se guarda el estado cada tantos minutos (ver checkpoint.py)
+    Reutiliza assign_taxi, finish_trip, compute_fare y los muestreos triangulares del Sistema,
+    así que resumen_final sale igual que en el modo con hilos.
+    """
+
+    def __init__(self, sistema: Sistema, clientes: List[ClienteBase],
+                 agenda: Optional[List[Tuple[int, int]]] = None,
+                 pendientes: Optional[Dict[int, Union[Espera, Solicitud]]] = None):
+        self.sistema = sistema
+        self.clientes = clientes
+
+        #(minuto, orden de llegada, posición del cliente en self.clientes)
+        self._queue: List[Tuple[int, int, int]] = []
+        self._seq = itertools.count()
+
+        #generador de cada cliente (None si ya terminó o aún no arrancó)
+        self._pasos: List[Optional[Iterator[int]]] = [None] * len(clientes)
+
+        #Espera / Solicitud en la que está parado cada cliente (None si no espera taxi)
+        self.pendientes: List[Union[Espera, Solicitud, None]] = [None] * len(clientes)
+
+        #al reanudar: (minuto, posición) de los clientes que estaban en la cola, ya en su orden,
+        #y la Espera / Solicitud rehecha de cada cliente que esperaba taxi
+        self._agenda = agenda
+        self._restored = pendientes or {}
+
+        #próximo minuto en el que toca guardar estado (si está activado)
+        every = config.CHECKPOINT_MINUTES
+        self._next_checkpoint = (sistema.current_minute // every + 1) * every if every else None
+
+    def _schedule(self, minute: int, idx: int) -> None:
+        heapq.heappush(self._queue, (minute, next(self._seq), idx))
+
+    def _wake(self, idx: int) -> None:
+        #cliente despertado en la sala de espera: sigue en el minuto actual
+        self._schedule(self.sistema.current_minute, idx)
+
+    def agenda(self) -> List[Tuple[int, int]]:
+        #(minuto, posición) de los clientes en la cola, en el orden en que se atenderían
+        return [(m, idx) for m, _, idx in sorted(self._queue)]
+
+    def _advance(self, minute: int) -> None:
+        #mueve el reloj virtual; igual que clock_loop, se para en 24:00 del último día
+        end = self.sistema.end_minute()
+        closing = False
+        self.sistema.sem_clock.acquire()
+        try:
+            self.sistema.current_minute = min(minute, end)
+            if minute >= end:
+                closing = not self.sistema.day_finished
+                self.sistema.day_finished = True
+        finally:
+            self.sistema.sem_clock.release()
+
+        #filas de la serie por minuto hasta aquí (también las de los minutos saltados),
+        #días que se sellan por el camino y rebalanceo si toca
+        self.sistema.close_minutes(min(minute, end))
+        self.sistema.roll_days(min(minute, end))
+        self.sistema.rebalance_due(min(minute, end))
+
+        #los que esperan taxi vuelven al heap para ver que el día terminó
+        if closing:
+            self.sistema.release_waiters()
+
+    def run(self) -> None:
+        if self._agenda is None:
+            #todos los clientes arrancan en 00:00
+            for idx, c in enumerate(self.clientes):
+                self._pasos[idx] = c.pasos()
+                self._schedule(0, idx)
+        else:
+            #reanudación: cada cliente sigue desde su fase; los que esperaban taxi vuelven a quedar
+            #parados en su Espera / Solicitud (el primer paso solo la devuelve)
+            queued = set()
+            for minute, idx in self._agenda:
+                self._resume(idx)
+                self._schedule(minute, idx)
+                queued.add(idx)
+            for idx in self._restored:
+                if idx not in queued:
+                    self._hook(idx, self._resume(idx))
+
+        self._drain()
+
+        #sin eventos pendientes la corrida está cerrada (y los que seguían esperando terminan)
+        self._advance(self.sistema.end_minute())
+        self._drain()
+
+    def _drain(self) -> None:
+        desp = self.sistema.despachador
+        while True:
+            #al cerrar cada minuto el despachador reparte lo que se pidió en él
+            if desp is not None and desp.pending() and (
+                    not self._queue or self._queue[0][0] > self.sistema.current_minute):
+                desp.despachar()
+            if not self._queue:
+                break
+
+            #minuto cerrado y el siguiente evento ya es posterior: momento estable para guardar
+            if self._next_checkpoint is not None and self._queue[0][0] >= self._next_checkpoint:
+                self._checkpoint()
+
+            minute, _, idx = heapq.heappop(self._queue)
+            self._advance(minute)
+
+            #el cliente avanza hasta su siguiente espera; si termina, sale de la cola
+            try:
+                wait = next(self._pasos[idx])
+            except StopIteration:
+                self._pasos[idx] = None
+                self.pendientes[idx] = None
+                continue
+            if isinstance(wait, (Espera, Solicitud)):
+                self._hook(idx, wait)
+            else:
+                self.pendientes[idx] = None
+                self._schedule(minute + wait, idx)
+
+    def _hook(self, idx: int, wait: Union[Espera, Solicitud]) -> None:
+        #cliente parado esperando taxi: sale de la cola hasta que lo despierten
+        self.pendientes[idx] = wait
+        if isinstance(wait, Espera):
+            wait.listen(functools.partial(self._wake, idx))
+        else:
+            wait.future.add_done_callback(lambda _, idx=idx: self._wake(idx))
+
+    def _resume(self, idx: int) -> Union[Espera, Solicitud, None]:
+        #generador de un cliente reanudado; si esperaba taxi, ya parado en su Espera / Solicitud
+        pendiente = self._restored.get(idx)
+        self._pasos[idx] = self.clientes[idx].continuar(pendiente)
+        if pendiente is not None:
+            next(self._pasos[idx])
+            self.pendientes[idx] = pendiente
+        return pendiente
+
+    def _checkpoint(self) -> None:
+        import checkpoint   #aquí para evitar el import circular (checkpoint crea simuladores)
+
+        checkpoint.guardar(self, config.CHECKPOINT_PATH)
+        every = config.CHECKPOINT_MINUTES
+        self._next_checkpoint = (self._queue[0][0] // every + 1) * every
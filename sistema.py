@@ -1,108 +1,572 @@
+import asyncio              #para el modo de clientes como corrutinas
 import math                 #para calcular distancia euclídea
 import random               #para aleatoriedad
 import threading            #para semáforos binarios
 import time                 #para sleep real
 
-from typing import List, Optional, Tuple  #tipos para claridad
-
-from config import (        #parámetros de configuración
-    SIM_MINUTE_SECONDS,
-    DAY_MINUTES,
-    MAP_MIN,
-    MAP_MAX,
-    SEARCH_RADIUS_KM,
-    BASE_FEE_EUR,
-    EUR_PER_KM_MIN,
-    EUR_PER_KM_MAX,
-)
+from typing import Callable, Dict, List, Optional, Tuple, Union  #tipos para claridad
+
+import numpy as np          #búsqueda de candidatos vectorizada
+
+import config               #parámetros (se leen al usarlos para poder cambiarlos en caliente)
 
 from models import Taxi     #modelo taxi
+from fleet import Fleet, TaxiView, NO_CLIENT  #flota en arrays
+from grid import GridIndex  #índice espacial de taxis libres
+from lockstats import InstrumentedLock, LockStats  #medición opcional de semáforos
+from espera import Espera, SalaEspera  #clientes esperando taxi
+from despacho import Despachador  #emparejamiento centralizado por lotes
+from estadisticas import Agregados  #top-k y totales por hora / zona
+from series import SerieMinutos     #métricas minuto a minuto
+from flujos import FlujoCliente     #números aleatorios propios de cada cliente
+from red import RedViaria, red_para #distancias por calles (opcional)
+from metricas import Latencias      #latencias para el servidor de métricas (opcional)
+from demanda import MapaDemanda     #mapa de calor de la demanda para el rebalanceo (opcional)
+from eventos import (       #salida de eventos de viaje
+    BufferedEventWriter, ConsoleSink, EventSink, EventoViaje, NullSink, INICIO, FIN,
+)
+
+
+#a partir de cuántos taxis por anillo compensa medir distancias con NumPy
+VECTORIZE_MIN = 32
+
+
+def semilla_maestra() -> int:
+    #config.SEMILLA, o una al azar del módulo random si es None (el resumen la imprime para repetir el día)
+    return config.SEMILLA if config.SEMILLA is not None else random.getrandbits(64)
 
 
 class Sistema:
     """
     Recursos importantes:
-    - Lista/estado de taxis
-    - Reloj global
+    - Flota de taxis (arrays NumPy, ver fleet.Fleet)
+    - Reloj global (en modo hilos, con barrera: los hilos duermen hasta un minuto del reloj)
     - Contador de servicios activos
-    - Salida por consola (para que no se mezcle)
+    - Salida de eventos de viaje (cola + hilo escritor, ver eventos.py)
+    - Índice espacial (rejilla) de taxis libres, partido en zonas del mapa
+    - Recuento de libres / ocupados publicado como tupla inmutable (lectura sin semáforo)
+    - Sala de espera de clientes sin taxi al alcance (ver espera.py)
+    - Modelo de distancias: línea recta o red de calles (config.RED_VIARIA, ver red.py)
+    - Despachador por lotes opcional (config.DESPACHO_CENTRAL, ver despacho.py)
+    - Mapa de calor de la demanda y rebalanceo de taxis libres opcional (config.REBALANCEO_MINUTES,
+      ver demanda.py)
+    - Agregados (top-k, por hora, por zona) al día en cada viaje, sellados por día (ver estadisticas.py)
+    - Serie por minuto (libres, activos, asignaciones, recogida, ingresos) en un anillo fijo
+    - Latencias de asignación, fin de viaje y lotes si hay servidor de métricas (ver metricas.py)
     Se protege todo con semáforos binarios: threading.Semaphore(1)
+    Los taxis no tienen un semáforo global: cada zona tiene el suyo y
+    se cogen siempre en orden creciente de zona para evitar interbloqueos.
+    Los lectores no cogen semáforos: reloj y servicios activos son un atributo que solo
+    cambia quien escribe (leerlo es atómico), el recuento de libres / ocupados es una
+    tupla que se sustituye entera y los arrays de la flota se leen con seq (Fleet.read).
     """
 
-    def __init__(self, taxis: List[Taxi]):
+    def __init__(self, taxis: Union[Fleet, List[Taxi]], verbose: bool = True, concurrent: bool = True,
+                 sink: Optional[EventSink] = None, semilla: Optional[int] = None):
         
-        self.taxis = taxis
+        #la flota vive en arrays; self.taxis[i] devuelve una vista tipo Taxi
+        self.taxis = taxis if isinstance(taxis, Fleet) else Fleet.from_taxis(taxis)
+
+        #si es False no se imprime cada viaje (útil para simulaciones grandes)
+        self.verbose = verbose
+
+        #EVENTOS DE VIAJE
+        #van a una cola que vacía un hilo escritor; sin destino (o NullSink) no se genera nada
+        if sink is None:
+            sink = ConsoleSink() if verbose else NullSink()
+        self.sink = sink
+        self.events = None if isinstance(sink, NullSink) else BufferedEventWriter(sink)
+
+        #si es False todo corre en un único hilo (motor de eventos)
+        self.concurrent = concurrent
+
+        #con config.LOCK_STATS cada semáforo apunta esperas y retenciones (si no, None y coste cero)
+        self.lock_stats = LockStats() if config.LOCK_STATS else None
 
-        
         #SEMÁFOROS BINARIOS
-        self.sem_taxis = threading.Semaphore(1)     #protege datos de taxis 
-        self.sem_clock = threading.Semaphore(1)     #protege current_minute y day_finished
-        self.sem_services = threading.Semaphore(1)  #protege services_active
-        self.sem_print = threading.Semaphore(1)     #protege prints para que no se solapen
+        self.sem_clock = self._new_semaphore("sem_clock")        #ordena las escrituras del reloj (y la barrera)
+        self.sem_services = self._new_semaphore("sem_services")  #ordena las escrituras de services_active
+        self.sem_print = self._new_semaphore("sem_print")        #mantiene juntos estado + evento al encolar
+        self.sem_status = self._new_semaphore("sem_status")      #ordena a quien publica _status
+
+        #DISTANCIAS
+        #con config.RED_VIARIA, por calles (búsqueda, viaje y tarifa); si no, en línea recta
+        #cruce más cercano de cada taxi y tramo a pie hasta él (se rehacen en finish_trip),
+        #así medir a un candidato es una consulta a la tabla de la red y dos sumas
+        self.red: Optional[RedViaria] = None
+        self.taxi_nodo = self.taxi_leg = None
+        if config.RED_VIARIA:
+            self.red = red_para(config.MAP_MIN, config.MAP_MAX, config.CALLE_KM, config.CALLES_CORTADAS,
+                                config.RED_SEMILLA, config.RED_TABLA_MAX, config.RED_CACHE_FILAS)
+            self.taxi_nodo, self.taxi_leg = self.red.nodos(self.taxis.x, self.taxis.y)
+
+        #ZONAS DEL MAPA
+        #rejilla de taxis libres (claves = posición en self.taxis) partida en zonas;
+        #el semáforo de cada zona protege sus celdas y los datos de los taxis que están en ella
+        zone_km = (config.MAP_MAX - config.MAP_MIN) / config.ZONES_PER_SIDE
+        area = (config.MAP_MAX - config.MAP_MIN) ** 2
+        fleet = self.taxis
+        cells_per_zone = GridIndex.cells_per_block_for(zone_km, config.SEARCH_RADIUS_KM, area, len(fleet))
+        self.free_grid = GridIndex(len(fleet), config.MAP_MIN, config.MAP_MAX, config.SEARCH_RADIUS_KM,
+                                   config.ZONES_PER_SIDE, cells_per_zone)
+        self.sem_zones = [self._new_semaphore(f"sem_zones[{z}]")
+                          for z in range(config.ZONES_PER_SIDE * config.ZONES_PER_SIDE)]
+
+        free = np.flatnonzero(fleet.free)
+        self.free_grid.add_many(free, fleet.x[free], fleet.y[free])
+
+        #ESTADO LIBRES / OCUPADOS
+        #(versión, libres, ocupados): assign_taxi y finish_trip publican una tupla nueva en O(1);
+        #la versión invalida la caché de textos, que también se publica como tupla
+        n_free = int(np.count_nonzero(fleet.free))
+        self._status = (0, n_free, len(fleet) - n_free)
+        self._status_cache = None                                    #(versión, libres, ocupados)
+
+        #SALA DE ESPERA
+        #clientes sin taxi al alcance; finish_trip despierta solo a los que quedan cerca del taxi
+        self.waiting = SalaEspera(config.MAP_MIN, config.SEARCH_RADIUS_KM, self._new_semaphore("sem_waiting"),
+                                  self.red)
+
+        #DESPACHO CENTRAL
+        #si está activo los clientes no buscan taxi: encolan la petición y esperan su futuro
+        self.despachador = Despachador(self) if config.DESPACHO_CENTRAL else None
+
+        #DEMANDA Y REBALANCEO
+        #peticiones recientes por celda; cada config.REBALANCEO_MINUTES se acercan taxis libres a las calientes
+        self.demanda: Optional[MapaDemanda] = None
+        self.next_rebalance = 0
+        self.rebalanced = 0          #taxis movidos en total
+        #taxis de camino a su celda destino, por minuto de llegada: [(índice, x, y)]; mientras tanto
+        #siguen libres pero fuera de la rejilla, así que nadie puede pedirlos
+        self.en_camino: Dict[int, List[Tuple[int, float, float]]] = {}
+        if config.REBALANCEO_MINUTES:
+            self.demanda = MapaDemanda(config.MAP_MIN, config.MAP_MAX, config.DEMANDA_CELDA_KM,
+                                       self._new_semaphore("sem_demanda"))
+            self.next_rebalance = config.REBALANCEO_MINUTES
+
+        #AGREGADOS
+        #se actualizan en finish_trip y se sellan al cambiar de día;
+        #una hora más para lo que termina pasadas las 24:00 del último día
+        self.stats = Agregados(config.DAY_MINUTES // 60 + 1, len(self.sem_zones), self._new_semaphore("sem_stats"))
+
+        #SERIE POR MINUTO
+        #se cierra una fila en cada tick del reloj (o salto del motor de eventos)
+        self.series = SerieMinutos(config.SERIES_MINUTES, self._new_semaphore("sem_series"))
+
+        #LATENCIAS
+        #solo con servidor de métricas (config.METRICAS_PUERTO); si no, None y coste cero
+        self.latencias = None
+        if config.METRICAS_PUERTO is not None:
+            self.latencias = Latencias(self._new_semaphore("sem_latencias"))
+
+        #SEMILLA MAESTRA
+        #de ella sale el flujo aleatorio de cada cliente (flujo()) y, si se le pasa la misma a
+        #Fleet.random, la flota; con la misma semilla el día se repite
+        self.semilla = semilla if semilla is not None else semilla_maestra()
 
-      
-       
         #RELOJ
         self.current_minute = 0      
         self.day_finished = False    
 
+        #BARRERA DEL RELOJ (modo hilos con config.RELOJ_BARRERA, protegida por sem_clock)
+        #sleep_minutes duerme hasta un minuto del reloj en vez de hacer su propio time.sleep;
+        #virtual_minute sigue contando pasadas las 24:00 del último día (viajes que acaban después)
+        self.barrier = concurrent and config.RELOJ_BARRERA
+        self.virtual_minute = 0
+        self._alarms: Dict[int, list] = {}      #minuto -> [Event, hilos dormidos hasta él]
+        self._running = 0                       #hilos de la simulación que no están parados
+        self._all_parked = threading.Event()    #_running == 0 (el reloj rápido espera a esto)
+        self._all_parked.set()
+        self._clock_stopped = False
+        self._hilo = threading.local()          #.minute: minuto lógico del hilo (en el que despertó)
+        self._alarms_async: Dict[int, asyncio.Future] = {}  #modo asyncio: minuto -> futuro que resuelve el reloj
+
         
         #SERVICIOS ACTIVOS
         self.services_active = 0     #cuántos servicios están ocurriendo ahora mismo
 
-    def sleep_minutes(self, minutes: int) -> None:
-        #convierte minutos simulados a segundos reales y duerme
-        time.sleep(minutes * SIM_MINUTE_SECONDS)
+    def _new_semaphore(self, name: str):
+        #semáforo binario; con un solo hilo basta un Lock (misma interfaz, implementado en C)
+        sem = threading.Semaphore(1) if self.concurrent else threading.Lock()
+        if self.lock_stats is not None:
+            return InstrumentedLock(name, sem, self.lock_stats)
+        return sem
 
-    def now_minute(self) -> int:
-        #lee el minuto actual protegido por sem_clock
+    def zone_of(self, x: float, y: float) -> int:
+        #zona a la que pertenece un punto
+        return self.free_grid.block_at(x, y)
+
+    def _acquire_zones(self, zones: List[int]) -> None:
+        #zones en orden creciente: así dos hilos nunca se esperan en círculo
+        sems = self.sem_zones
+        for z in zones:
+            sems[z].acquire()
+
+    def _release_zones(self, zones: List[int]) -> None:
+        sems = self.sem_zones
+        for z in reversed(zones):
+            sems[z].release()
+
+    def acquire_all_zones(self) -> None:
+        #para lecturas de toda la flota (estado, resumen)
+        self._acquire_zones(range(len(self.sem_zones)))
+
+    def release_all_zones(self) -> None:
+        self._release_zones(range(len(self.sem_zones)))
+
+    def sleep_minutes(self, minutes: int) -> None:
+        """
+        Espera minutes minutos simulados:
+        - con barrera, hasta que el reloj llegue a ese minuto: el hilo cuenta como parado
+          y tick lo despierta (y lo vuelve a contar en marcha) justo en él
+        - los minutos cuentan desde el minuto lógico del hilo (en el que le tocaba despertar),
+          no desde el reloj: un hilo que despertó tarde no pierde ese tiempo, y si su minuto
+          ya pasó sigue sin pararse hasta alcanzar al reloj
+        - sin barrera, sleep real de minutes * SIM_MINUTE_SECONDS
+        """
+        if not self.barrier:
+            time.sleep(minutes * config.SIM_MINUTE_SECONDS)
+            return
+        if minutes <= 0:
+            return
         self.sem_clock.acquire()
         try:
-            return self.current_minute
+            if self._clock_stopped:
+                return
+            now = self.virtual_minute
+            base = getattr(self._hilo, "minute", None)
+            target = (now if base is None else base) + minutes
+            self._hilo.minute = target
+            if target <= now:
+                return
+            alarm = self._alarms.get(target)
+            if alarm is None:
+                alarm = self._alarms[target] = [threading.Event(), 0]
+            alarm[1] += 1
+            self._park(1)
+        finally:
+            self.sem_clock.release()
+        alarm[0].wait()
+
+    def _park(self, n: int) -> None:
+        #(con sem_clock) n hilos dejan de estar en marcha
+        self._running -= n
+        if self._running == 0:
+            self._all_parked.set()
+
+    def _unpark(self, n: int) -> None:
+        #(con sem_clock) n hilos vuelven a estar en marcha
+        self._running += n
+        if self._running:
+            self._all_parked.clear()
+
+    def barrier_park(self) -> None:
+        #el hilo actual se para fuera de sleep_minutes (esperando taxi) o termina
+        if not self.barrier:
+            return
+        self.sem_clock.acquire()
+        try:
+            self._park(1)
         finally:
             self.sem_clock.release()
 
-    def is_day_finished(self) -> bool:
-        #lee la bandera day_finished protegida por sem_clock.
+    def barrier_resume(self) -> None:
+        #un hilo más en marcha: uno que va a arrancar, o uno parado al que se despierta
+        if not self.barrier:
+            return
         self.sem_clock.acquire()
         try:
-            return self.day_finished
+            self._unpark(1)
         finally:
             self.sem_clock.release()
 
+    def wake_thread(self, woken: threading.Event) -> None:
+        #aviso para un hilo parado: se cuenta en marcha antes de soltarlo (el reloj rápido no se adelanta);
+        #apunta el minuto del reloj en el aviso, desde el que seguirá el hilo (ver wait_woken)
+        woken.minute = self.virtual_minute
+        self.barrier_resume()
+        woken.set()
+
+    def wait_woken(self, woken: threading.Event) -> None:
+        #el hilo actual se para hasta wake_thread(woken) y sigue en el minuto del aviso (nunca antes del suyo)
+        self.barrier_park()
+        woken.wait()
+        own = getattr(self._hilo, "minute", None)
+        self._hilo.minute = woken.minute if own is None else max(own, woken.minute)
+
+    def start_thread(self, target: Callable[[], None]) -> threading.Thread:
+        #hilo daemon que cuenta para la barrera mientras corre target
+        def run():
+            try:
+                target()
+            finally:
+                self.barrier_park()
+
+        self.barrier_resume()
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+        return t
+
+    def now_minute(self) -> int:
+        #minuto actual sin semáforo: solo lo cambia quien mueve el reloj (con sem_clock)
+        #y leer un atributo es atómico; los clientes lo miran en cada vuelta
+        return self.current_minute
+
+    @staticmethod
+    def end_minute() -> int:
+        #minuto absoluto en que se para el reloj: fin del último de config.DAYS días
+        return config.DAYS * config.DAY_MINUTES
+
+    def is_day_finished(self) -> bool:
+        #bandera day_finished (fin del último día), sin semáforo como now_minute
+        return self.day_finished
+
     def clock_loop(self) -> None:
         """
         Reloj del sistema:
         avanza minuto a minuto
-        cuando llega a 24:00 (1440), marca day_finished=True
+        a cada 24:00 sella las estadísticas del día y sigue con el siguiente
+        cuando llega a 24:00 del último día (config.DAYS), marca day_finished=True
+        Con barrera (config.RELOJ_BARRERA) hay que arrancarlo después de los hilos:
+        - cada minuto acaba SIM_MINUTE_SECONDS después del anterior contando desde el arranque
+          (el tiempo de los semáforos no se acumula), o con config.RELOJ_RAPIDO en cuanto
+          todos los hilos están parados
+        - tras el último día sigue en horas extra (sin mover current_minute) hasta que
+          no queda ningún hilo dormido ni en marcha
         """
-        while True:
-            #espera 1 minuto simulado
-            self.sleep_minutes(1)
+        if not self.barrier:
+            while True:
+                #espera 1 minuto simulado
+                self.sleep_minutes(1)
 
-            #wntra en sección crítica del reloj
-            self.sem_clock.acquire()
-            try:
-                #si ya llegamos al final del día, cerramos el reloj
-                if self.current_minute >= DAY_MINUTES:
-                    self.day_finished = True
+                if not self.tick():
+                    self.release_waiters()
                     break
+            return
+
+        t0 = time.perf_counter()
+        ticks = 1
+        self._wait_tick(t0, ticks)
+        while self.tick():
+            ticks += 1
+            self._wait_tick(t0, ticks)
+        self.release_waiters()
+
+        while self._overtime_tick():
+            ticks += 1
+            self._wait_tick(t0, ticks)
+
+    def _wait_tick(self, t0: float, ticks: int) -> None:
+        #fin del minuto número ticks del reloj con barrera
+        if config.RELOJ_RAPIDO:
+            self._all_parked.wait()
+            return
+        delay = t0 + ticks * config.SIM_MINUTE_SECONDS - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _fire(self, minute: int) -> None:
+        #despierta a los hilos dormidos hasta minute
+        self.sem_clock.acquire()
+        try:
+            alarm = self._alarms.pop(minute, None)
+            if alarm is not None:
+                self._unpark(alarm[1])
+                alarm[0].set()
+        finally:
+            self.sem_clock.release()
 
-                #avanzamos el tiempo
-                self.current_minute += 1
-            finally:
-                #salimos de sección crítica del reloj
-                self.sem_clock.release()
+    def _overtime_tick(self) -> bool:
+        #minuto de horas extra; False (y reloj parado) cuando ya no queda nadie
+        self.sem_clock.acquire()
+        try:
+            if not self._alarms and self._running == 0:
+                self._clock_stopped = True
+                return False
+            self.virtual_minute += 1
+            minute = self.virtual_minute
+        finally:
+            self.sem_clock.release()
+        self._fire(minute)
+        return True
+
+    async def sleep_minutes_async(self, minutes: int) -> None:
+        """
+        Igual que sleep_minutes con barrera, pero cediendo el control al bucle de asyncio:
+        espera a que clock_loop_async llegue al minuto virtual_minute + minutes, así que
+        un reloj con retraso retrasa también a los clientes y los resultados no cambian.
+        """
+        if minutes <= 0 or self._clock_stopped:
+            return
+        target = self.virtual_minute + minutes
+        alarm = self._alarms_async.get(target)
+        if alarm is None:
+            alarm = self._alarms_async[target] = asyncio.get_running_loop().create_future()
+        await alarm
+
+    async def clock_loop_async(self) -> None:
+        """
+        Reloj del modo asyncio: mismo avance que clock_loop con barrera, sin bloquear el bucle.
+        Cada minuto acaba SIM_MINUTE_SECONDS después del anterior contando desde el arranque
+        (lo que tardan el tick y los clientes no se acumula) y despierta a quien dormía hasta él;
+        tras el último día sigue en horas extra mientras quede alguien dormido.
+        """
+        t0 = asyncio.get_running_loop().time()
+        ticks = 1
+        await self._wait_tick_async(t0, ticks)
+        while self.tick():
+            self._fire_async(self.virtual_minute)
+            ticks += 1
+            await self._wait_tick_async(t0, ticks)
+        self.release_waiters()
+
+        #los despertados ya han vuelto a dormirse (o han terminado) cuando acaba la espera
+        while self._alarms_async:
+            self.virtual_minute += 1
+            self._fire_async(self.virtual_minute)
+            ticks += 1
+            await self._wait_tick_async(t0, ticks)
+        self._clock_stopped = True
+
+    @staticmethod
+    async def _wait_tick_async(t0: float, ticks: int) -> None:
+        #fin del minuto número ticks del reloj asyncio; siempre cede el bucle, aunque vaya tarde
+        delay = t0 + ticks * config.SIM_MINUTE_SECONDS - asyncio.get_running_loop().time()
+        await asyncio.sleep(max(delay, 0))
+
+    def _fire_async(self, minute: int) -> None:
+        #despierta a las corrutinas dormidas hasta minute
+        alarm = self._alarms_async.pop(minute, None)
+        if alarm is not None:
+            alarm.set_result(None)
+
+    def tick(self) -> bool:
+        """
+        Avanza el reloj un minuto.
+        Devuelve False cuando el último día ya ha terminado (y marca day_finished=True).
+        """
+        #entra en sección crítica del reloj
+        self.sem_clock.acquire()
+        try:
+            #si ya llegamos al final del último día, cerramos el reloj
+            if self.current_minute >= self.end_minute():
+                self.day_finished = True
+                return False
+
+            #avanzamos el tiempo
+            self.current_minute += 1
+            minute = self.virtual_minute = self.current_minute
+        finally:
+            #salimos de sección crítica del reloj
+            self.sem_clock.release()
+
+        #fila de la serie del minuto que acaba de cerrarse, a las 24:00 cambio de día y rebalanceo si toca
+        self.close_minutes(minute)
+        self.roll_days(minute)
+        self.rebalance_due(minute)
+
+        #con barrera, los que dormían hasta este minuto siguen ya con él cerrado
+        if self.barrier:
+            self._fire(minute)
+        return True
+
+    def close_minutes(self, to_minute: int) -> None:
+        #cierra en la serie los minutos anteriores a to_minute con el estado actual
+        if to_minute <= self.series.next_minute:
+            return
+        self.series.advance(to_minute, self.taxi_status_counts()[0], self.active_services())
+
+    def roll_days(self, minute: int) -> None:
+        """
+        Sella las estadísticas de cada día que termina en minute o antes y empieza el siguiente.
+        El último día no se sella: lo que acaba pasadas sus 24:00 se queda en él.
+        Solo lo llama quien mueve el reloj (tick o el motor de eventos).
+        """
+        day = config.DAY_MINUTES
+        while self.stats.day + 1 < config.DAYS and (self.stats.day + 1) * day <= minute:
+            self.stats.cerrar_dia((self.stats.day + 1) * day)
+
+    def rebalance_due(self, minute: int) -> None:
+        """
+        Rebalanceo cada config.REBALANCEO_MINUTES y llegadas de los taxis que se movieron.
+        Como roll_days, solo lo llama quien mueve el reloj; si el motor de eventos salta varios
+        minutos de golpe, llegadas y rondas se hacen en su orden (las llegadas primero si coinciden).
+        """
+        if self.demanda is None:
+            return
+        every = config.REBALANCEO_MINUTES
+        while True:
+            llegada = min(self.en_camino) if self.en_camino else math.inf
+            if llegada <= minute and llegada <= self.next_rebalance:
+                self._llegar(self.en_camino.pop(llegada))
+            elif self.next_rebalance <= minute:
+                ronda = self.next_rebalance
+                self.next_rebalance += every
+                self.rebalancear(ronda)
+            else:
+                break
+
+    def rebalancear(self, minute: int) -> int:
+        """
+        Manda taxis libres hacia las celdas con más demanda reciente (plan en demanda.py):
+        como mucho config.REBALANCEO_MAX por ronda (y la fracción REBALANCEO_FRACCION de los libres).
+        Cada taxi sale de la rejilla de libres ya en el minuto de la ronda y vuelve a ella al llegar,
+        config.REBALANCEO_KMH mediante (ver _llegar): el viaje en vacío no es gratis.
+        Devuelve cuántos taxis salieron.
+        """
+        calor = self.demanda.envejecer()
+        f = self.taxis
+        self.acquire_all_zones()
+        try:
+            #los que ya van de camino no cuentan como libres para el plan
+            idx = np.flatnonzero(f.free)
+            if self.en_camino:
+                idx = np.setdiff1d(idx, [i for grupo in self.en_camino.values() for i, _, _ in grupo])
+            cap = min(config.REBALANCEO_MAX, math.ceil(len(idx) * config.REBALANCEO_FRACCION))
+            moves = self.demanda.plan(calor, idx, f.x[idx], f.y[idx], cap)
+            for i, x, y in moves:
+                self.free_grid.remove(i)
+                km = self.distancia(f.x.item(i), f.y.item(i), x, y)
+                llegada = minute + max(1, math.ceil(km / config.REBALANCEO_KMH * 60))
+                self.en_camino.setdefault(llegada, []).append((i, x, y))
+        finally:
+            self.release_all_zones()
+        self.rebalanced += len(moves)
+        return len(moves)
+
+    def _llegar(self, grupo: List[Tuple[int, float, float]]) -> None:
+        #taxis rebalanceados que llegan: vuelven a la rejilla en su destino y despiertan a quien
+        #quede a su alcance en la sala de espera, igual que finish_trip
+        f = self.taxis
+        self.acquire_all_zones()
+        try:
+            for i, x, y in grupo:
+                f.seq[i] += 1
+                f.x[i] = x
+                f.y[i] = y
+                f.seq[i] += 1
+                if self.red is not None:
+                    self.taxi_nodo[i], self.taxi_leg[i] = self.red.nodo(x, y)
+                self.free_grid.add(i, x, y)
+                self.waiting.wake_near(x, y)
+        finally:
+            self.release_all_zones()
+
+    def release_waiters(self) -> None:
+        #fin del último día: despierta a quien sigue esperando taxi (sala de espera y despachador)
+        self.waiting.close()
+        if self.despachador is not None:
+            self.despachador.close()
 
     
     @staticmethod
     def minute_to_clock(m: int) -> str:
         """
-        Convierte un minuto absoluto a HH:MM.
-        Si pasa de 24:00, lo marca como (+1d), (+2d), etc.
+        Convierte un minuto absoluto (desde las 00:00 del primer día) a HH:MM.
+        Del segundo día en adelante lo marca como (+1d), (+2d), etc.
         """
-        day_offset = m // DAY_MINUTES          #cuántos días se ha pasado.
-        mm = m % DAY_MINUTES                   #minuto dentro del día.
+        day_offset = m // config.DAY_MINUTES   #cuántos días se ha pasado.
+        mm = m % config.DAY_MINUTES            #minuto dentro del día.
         hh = mm // 60                          #hora.
         mi = mm % 60                           #minuto.
 
@@ -131,119 +595,315 @@ class Sistema:
             self.sem_services.release()
         #estado de servicios activos
     def active_services(self) -> int:
-      
-        self.sem_services.acquire()
-        try:
-            return self.services_active
-        finally:
-            self.sem_services.release()
+        #sin semáforo: solo lo cambian begin_service / end_service (con sem_services)
+        return self.services_active
 
         #estado de taxis
+    def taxi_status_counts(self) -> Tuple[int, int]:
+        #(libres, ocupados) en O(1) y sin semáforo: la última tupla publicada
+        _, n_free, n_busy = self._status
+        return n_free, n_busy
+
     def taxi_status_snapshot(self) -> Tuple[List[str], List[str]]:
         """
-        Devuelve (libres, ocupados) como listas de strings para imprimir.
-        Se protege con sem_taxis porque lee estados compartidos.
+        Devuelve (libres, ocupados) como listas de strings para imprimir (no modificarlas).
+        Los textos se guardan en caché y solo se rehacen si algún taxi cambió de estado;
+        se rehacen desde una copia de free / current_client (Fleet.read) sin coger semáforos
+        y se publican con la versión leída antes de copiar (si algo cambió entretanto,
+        el siguiente lector verá otra versión y los rehará).
         """
-        self.sem_taxis.acquire()
-        try:
-            libres = []    #lista de taxis libres
-            ocupados = []  #lista de taxis ocupados
+        version = self._status[0]
+        cache = self._status_cache
+        if cache is not None and cache[0] == version:
+            return cache[1], cache[2]
+
+        free, client = self.taxis.read(("free", "current_client"))
+        ids = self.taxis.id
+
+        #en el orden de la flota, como siempre
+        libres = [f"Taxi-{t}" for t in ids[free].tolist()]
+
+        #ocupados, con su cliente si lo tienen
+        busy = np.flatnonzero(~free)
+        ocupados = [f"Taxi-{t}(Cliente-{c})" if c != NO_CLIENT else f"Taxi-{t}"
+                    for t, c in zip(ids[busy].tolist(), client[busy].tolist())]
 
-            #recorremos taxis y clasificamos
-            for t in self.taxis:
-                if t.free:
-                    libres.append(f"Taxi-{t.id}")
-                else:
-                    
-                    if t.current_client_id is not None:
-                        ocupados.append(f"Taxi-{t.id}(Cliente-{t.current_client_id})")
-                    else:
-                        ocupados.append(f"Taxi-{t.id}")
+        self._status_cache = (version, libres, ocupados)
+        return libres, ocupados
+
+    def _mark_busy(self) -> None:
+        #un taxi pasa a ocupado (O(1)): publica el recuento nuevo
+        self.sem_status.acquire()
+        try:
+            version, n_free, n_busy = self._status
+            self._status = (version + 1, n_free - 1, n_busy + 1)
+        finally:
+            self.sem_status.release()
 
-            return libres, ocupados
+    def _mark_free(self) -> None:
+        #un taxi vuelve a estar libre (O(1)): publica el recuento nuevo
+        self.sem_status.acquire()
+        try:
+            version, n_free, n_busy = self._status
+            self._status = (version + 1, n_free + 1, n_busy - 1)
+        finally:
+            self.sem_status.release()
+
+    def report_trip_start(self, taxi: TaxiView, client_id: int, start: int, end: int,
+                          ox: float, oy: float, dx: float, dy: float,
+                          distance: float) -> None:
+        #encola el inicio de un servicio (+ estado de taxis si el destino lo quiere)
+        if self.events is None:
+            return
+        self._emit(EventoViaje(INICIO, taxi.id, client_id, start, end,
+                               ox, oy, dx, dy, distance))
+
+    def report_trip_end(self, taxi: TaxiView, client_id: int, start: int, end: int,
+                        fare: float, rating: int, ox: float = 0.0, oy: float = 0.0,
+                        dx: float = 0.0, dy: float = 0.0, distance: float = 0.0) -> None:
+        #encola el fin de un servicio con todo su detalle (+ estado de taxis si el destino lo quiere)
+        if self.events is None:
+            return
+        self._emit(EventoViaje(FIN, taxi.id, client_id, start, end,
+                               ox, oy, dx, dy, distance, fare, rating))
+
+    def _emit(self, event: EventoViaje) -> None:
+        if not self.sink.needs_status:
+            self.events.emit(event)
+            return
+
+        #el estado y el evento se encolan juntos para que la salida salga en orden
+        self.sem_print.acquire()
+        try:
+            event.libres, event.ocupados = self.taxi_status_snapshot()
+            self.events.emit(event)
         finally:
-            self.sem_taxis.release()
+            self.sem_print.release()
+
+    def close_events(self) -> None:
+        #espera a que el escritor vacíe la cola y cierra el destino
+        if self.events is not None:
+            self.events.close()
+            self.events = None
 
     #asignar taxi
-    def assign_taxi(self, client_id: int, ox: float, oy: float) -> Optional[Taxi]:
+    def assign_taxi(self, client_id: int, ox: float, oy: float) -> Optional[TaxiView]:
         """
         - Taxi libre
         - A 2 km del origen 
         - Elegir el mas cercano
         - Empate en distancia: mayor rating medio
         """
-        self.sem_taxis.acquire()
-        try:
-            candidates = []  # lista de candidatos .
-
-            #buscamos taxis libres dentro del radio.
-            for t in self.taxis:
-                if not t.free:
-                    continue
-
-                #distancia del taxi al origen
-                d = math.dist((ox, oy), (t.x, t.y))
+        t0 = Latencias.start() if self.latencias is not None else 0
 
-                #si está dentro del radio, es candidato
-                if d <= SEARCH_RADIUS_KM:
-                    # Ordenamos por distancia, -rating, id
-                    candidates.append((round(d, 6), -t.rating_avg, t.id, t))
-
-            #si no hay taxis disponibles, devolvemos None
-            if not candidates:
-                return None
-
-            #elegimos el mejor candidato
-            candidates.sort()
-            chosen = candidates[0][3]
-
-            #marcamos taxi como ocupado y registramos el cliente
-            chosen.free = False
-            chosen.current_client_id = client_id
-
-            return chosen
+        #zonas que puede tocar el disco de búsqueda (ya en orden creciente)
+        zones = self.free_grid.blocks_near(ox, oy)
+        self._acquire_zones(zones)
+        try:
+            taxi = self._assign_in_zones(client_id, ox, oy, zones)
         finally:
-            self.sem_taxis.release()
-
-    def finish_trip(self, taxi: Taxi, dx: float, dy: float, fare: float, rating: int) -> None:
+            self._release_zones(zones)
+        if taxi is None:
+            self.series.failed_one()
+        if self.demanda is not None:
+            self.demanda.pedido(ox, oy, taxi is None)
+        if self.latencias is not None:
+            self.latencias.add("asignacion", t0)
+        return taxi
+
+    def assign_or_wait(self, client_id: int, ox: float, oy: float) -> Union[TaxiView, Espera]:
+        """
+        Como assign_taxi, pero si no hay taxi el cliente se queda en la sala de espera
+        (con las zonas aún cogidas) y se devuelve su Espera: finish_trip lo despertará
+        cuando quede libre un taxi a su alcance, o close() al terminar el día.
+        """
+        t0 = Latencias.start() if self.latencias is not None else 0
+        zones = self.free_grid.blocks_near(ox, oy)
+        self._acquire_zones(zones)
+        try:
+            taxi = self._assign_in_zones(client_id, ox, oy, zones)
+            if self.demanda is not None:
+                self.demanda.pedido(ox, oy, taxi is None)
+            if taxi is None:
+                self.series.failed_one()
+                return self.waiting.park(client_id, ox, oy)
+            return taxi
+        finally:
+            self._release_zones(zones)
+            if self.latencias is not None:
+                self.latencias.add("asignacion", t0)
+
+    def _assign_in_zones(self, client_id: int, ox: float, oy: float, zones: List[int]) -> Optional[TaxiView]:
+        #búsqueda y reserva del taxi; el llamador ya tiene cogidas las zonas de blocks_near
+        f = self.taxis
+        cands = []                #(distancia, índice) de los candidatos dentro del radio
+        best_d = math.inf         #distancia del candidato más cercano visto
+        origen = self._origen(ox, oy)
+
+        #solo miramos los anillos de celdas que tocan el disco, del más cercano al más lejano
+        for lower, keys in self.free_grid.rings_near(ox, oy, zones):
+            #ningún anillo posterior puede tener un taxi más cercano (margen por el redondeo)
+            if lower > best_d + 1e-6:
+                break
+
+            for d, i in self._within_radius(keys, ox, oy, origen):
+                #uno más lejano que el mejor ya visto no puede empatar con el final
+                if d <= best_d + 1e-6:
+                    cands.append((d, i))
+                    if d < best_d:
+                        best_d = d
+
+        #si no hay taxis disponibles, devolvemos None
+        if not cands:
+            return None
+
+        # Ordenamos por distancia, -rating, id (solo los que pueden empatar con el más cercano)
+        best = None
+        for d, i in cands:
+            if d <= best_d + 1e-6:
+                key = (round(d, 6), -f.rating_avg_of(i), f.id.item(i), i)
+                if best is None or key < best:
+                    best = key
+        return self._reserve(best[3], client_id, best[0])
+
+    def _reserve(self, i: int, client_id: int, distance: float) -> TaxiView:
+        #taxi i pasa a ocupado por client_id, a distance km de él (con su zona cogida)
+        f = self.taxis
+        self.series.assigned_one(distance)
+
+        #sacamos al elegido del índice de libres
+        self.free_grid.remove(i)
+
+        #marcamos taxi como ocupado y registramos el cliente (seq impar mientras tanto: ver Fleet.read)
+        f.seq[i] += 1
+        f.free[i] = False
+        f.current_client[i] = client_id
+        f.seq[i] += 1
+        self._mark_busy()
+
+        return f[i]
+
+    def _origen(self, ox: float, oy: float) -> Optional[Tuple[int, float, np.ndarray]]:
+        #con red de calles: cruce del cliente, tramo a pie hasta él y su fila de distancias (una vez por búsqueda)
+        red = self.red
+        if red is None:
+            return None
+        na, la = red.nodo(ox, oy)
+        return na, la, red.fila(na)
+
+    def _within_radius(self, keys: List[int], ox: float, oy: float,
+                       origen: Optional[Tuple[int, float, np.ndarray]] = None) -> List[Tuple[float, int]]:
+        """
+        (distancia, índice) de los taxis dados (los de un anillo) que están dentro del radio.
+        Con muchos taxis se mide todo de una vez sobre los arrays; con pocos
+        sale más barato un bucle normal que pagar el coste fijo de NumPy.
+        Con red de calles (origen, ver _origen) la distancia es por la red: nunca menor que
+        la recta, así la poda por anillos de la rejilla sigue valiendo. El cruce de cada taxi
+        ya está en taxi_nodo/taxi_leg, así que cada candidato es una lectura de la fila.
+        """
+        f = self.taxis
+
+        if len(keys) >= VECTORIZE_MIN:
+            idx = np.array(keys, dtype=np.int64)
+            if origen is None:
+                d = np.hypot(f.x[idx] - ox, f.y[idx] - oy)
+            else:
+                d = self.red.distancias_nodos(ox, oy, origen, f.x[idx], f.y[idx],
+                                              self.taxi_nodo[idx], self.taxi_leg[idx])
+            inside = np.flatnonzero(d <= config.SEARCH_RADIUS_KM)
+            return list(zip(d[inside].tolist(), idx[inside].tolist()))
+
+        x = f.x.item
+        y = f.y.item
+        radius = config.SEARCH_RADIUS_KM
+        out = []
+        if origen is None:
+            for i in keys:
+                d = math.hypot(x(i) - ox, y(i) - oy)
+                if d <= radius:
+                    out.append((d, i))
+            return out
+
+        na, la, fila = origen
+        row = fila.item
+        nodo = self.taxi_nodo.item
+        leg = self.taxi_leg.item
+        for i in keys:
+            nb = nodo(i)
+            d = la + row(nb) + leg(i) if nb != na else abs(x(i) - ox) + abs(y(i) - oy)
+            if d <= radius:
+                out.append((d, i))
+        return out
+
+    def distancia(self, ax: float, ay: float, bx: float, by: float) -> float:
+        #distancia de un viaje: por la red de calles si está activa, si no en línea recta
+        if self.red is None:
+            return math.dist((ax, ay), (bx, by))
+        return self.red.distancia(ax, ay, bx, by)
+
+    def finish_trip(self, taxi: TaxiView, dx: float, dy: float, fare: float, rating: int) -> None:
         """
         Al finalizar un viaje:
         - liberar taxi
         - acumular stats
         - mover taxi a destino (para reparto realista)
+        Mientras está ocupado el taxi no está en ninguna rejilla, así que
+        migrar de zona es simplemente insertarlo en la zona de destino.
         """
-        self.sem_taxis.acquire()
+        t0 = Latencias.start() if self.latencias is not None else 0
+        f = self.taxis
+        i = taxi.index
+        z = self.zone_of(dx, dy)
+        self.sem_zones[z].acquire()
         try:
-            #liberamos taxi
-            taxi.free = True
-            taxi.current_client_id = None
+            #liberamos taxi (seq impar hasta que sus campos quedan al día: ver Fleet.read)
+            f.seq[i] += 1
+            f.free[i] = True
+            f.current_client[i] = NO_CLIENT
 
             #actualizamos estadísticas
-            taxi.services += 1
-            taxi.earnings += fare
-            taxi.rating_sum += rating
-            taxi.rating_count += 1
+            f.services[i] += 1
+            f.earnings[i] += fare
+            f.rating_sum[i] += rating
+            f.rating_count[i] += 1
 
             #el taxi queda en el destino del viaje
-            taxi.x = dx
-            taxi.y = dy
+            f.x[i] = dx
+            f.y[i] = dy
+            f.seq[i] += 1
+
+            #los agregados cogen sus propios semáforos: fuera de la ventana del seq
+            self.stats.record(i, self.now_minute(), z, fare, rating,
+                              f.earnings.item(i), f.rating_avg_of(i))
+            self.series.revenue_add(fare)
+            if self.red is not None:
+                self.taxi_nodo[i], self.taxi_leg[i] = self.red.nodo(dx, dy)
+
+            #vuelve al índice de libres, en la zona de su nueva posición
+            self.free_grid.add(i, dx, dy)
+            self._mark_free()
+
+            #avisa al cliente que más lleva esperando a su alcance (si hay alguno)
+            self.waiting.wake_near(dx, dy)
         finally:
-            self.sem_taxis.release()
-
-    @staticmethod
-    def tri_int(a: int, mode: int, b: int) -> int:
-        #distribución triangular: más “realista” que uniform
-        return int(round(random.triangular(a, b, mode)))
+            self.sem_zones[z].release()
+        if self.latencias is not None:
+            self.latencias.add("fin_viaje", t0)
 
     @staticmethod
     def rand_point() -> Tuple[float, float]:
         #punto aleatorio en el mapa
-        return random.uniform(MAP_MIN, MAP_MAX), random.uniform(MAP_MIN, MAP_MAX)
+        return random.uniform(config.MAP_MIN, config.MAP_MAX), random.uniform(config.MAP_MIN, config.MAP_MAX)
 
     @staticmethod
-    def compute_fare(distance_km: float) -> float:
-        # Tarifa base + precio_por_km * distancia.
-        eur_km = random.uniform(EUR_PER_KM_MIN, EUR_PER_KM_MAX)
-        return round(BASE_FEE_EUR + distance_km * eur_km, 2)
+    def compute_fare(distance_km: float, eur_km: Optional[float] = None) -> float:
+        # Tarifa base + precio_por_km * distancia (precio del flujo del cliente, o del módulo random).
+        if eur_km is None:
+            eur_km = random.uniform(config.EUR_PER_KM_MIN, config.EUR_PER_KM_MAX)
+        return round(config.BASE_FEE_EUR + distance_km * eur_km, 2)
+
+    def flujo(self, client_id: int) -> FlujoCliente:
+        #flujo aleatorio del cliente: solo depende de la semilla maestra y de su id
+        return FlujoCliente(self.semilla, client_id)
 
 
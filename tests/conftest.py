@@ -0,0 +1,22 @@
+#los módulos del simulador están en la raíz del repositorio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config   # noqa: E402
+
+
+@pytest.fixture
+def ajustes():
+    #aplicar(overrides) para un test; al acabar, config.py vuelve a como estaba
+    previos = {}
+
+    def aplicar(overrides: dict) -> None:
+        for nombre, valor in config.aplicar(overrides).items():
+            previos.setdefault(nombre, valor)
+
+    yield aplicar
+    config.aplicar(previos)
@@ -0,0 +1,67 @@
+#guardar a media jornada y reanudar da exactamente el mismo día que sin parar
+import numpy as np
+import pytest
+
+import checkpoint
+import config
+from cliente import ClienteBase
+from fleet import Fleet
+from sistema import Sistema
+from simulador import SimuladorEventos
+
+
+class Parada(Exception):
+    pass
+
+
+def _simulador(fleet: Fleet, n_clients: int) -> SimuladorEventos:
+    s = Sistema(fleet.snapshot(), verbose=False, concurrent=False)
+    return SimuladorEventos(s, [ClienteBase(s, client_id=i + 1) for i in range(n_clients)])
+
+
+def _resultado(sim: SimuladorEventos) -> dict:
+    s = sim.sistema
+    return {
+        "servicios": s.stats.services,
+        "ganancias": s.stats.total_earnings,
+        "asignaciones": s.series.total_assigned,
+        "fallidas": s.series.total_failed,
+        "taxi_ganancias": s.taxis.earnings.tolist(),
+        "taxi_x": s.taxis.x.tolist(),
+        "viajes": [c.trips for c in sim.clientes],
+        "rebalanceados": s.rebalanced,
+    }
+
+
+@pytest.mark.parametrize("extra", [{}, {"ESPERA_EVENTOS": False}, {"DESPACHO_CENTRAL": True},
+                                   {"REBALANCEO_MINUTES": 7, "SEARCH_RADIUS_KM": 1.0, "REBALANCEO_KMH": 5.0}])
+def test_reanudar_igual_que_sin_parar(tmp_path, monkeypatch, ajustes, extra):
+    ajustes({"SEMILLA": 11, "CHECKPOINT_PATH": str(tmp_path / "ck.npz"), **extra})
+    fleet = Fleet.random(40, config.MAP_MIN, config.MAP_MAX, config.SEMILLA)
+
+    seguido = _simulador(fleet, 150)
+    seguido.run()
+    if config.REBALANCEO_MINUTES:
+        assert seguido.sistema.rebalanced
+
+    #la misma corrida, parada en el primer guardado (a media jornada)
+    ajustes({"CHECKPOINT_MINUTES": config.DAY_MINUTES // 2})
+
+    def guardar_y_parar(sim):
+        checkpoint.guardar(sim, config.CHECKPOINT_PATH)
+        raise Parada
+
+    monkeypatch.setattr(SimuladorEventos, "_checkpoint", guardar_y_parar)
+    with pytest.raises(Parada):
+        _simulador(fleet, 150).run()
+    ajustes({"CHECKPOINT_MINUTES": 0})
+
+    reanudado = checkpoint.cargar(config.CHECKPOINT_PATH)
+    assert reanudado.sistema.current_minute < config.DAY_MINUTES
+    if config.REBALANCEO_MINUTES:
+        #a 5 km/h hay taxis de camino en el momento del guardado
+        assert reanudado.sistema.en_camino
+    reanudado.run()
+
+    assert _resultado(reanudado) == _resultado(seguido)
+    assert np.array_equal(reanudado.sistema.stats.hour_services, seguido.sistema.stats.hour_services)
@@ -0,0 +1,53 @@
+#el reparto por lotes da a cada petición su taxi más cercano, igual que assign_taxi
+import random
+
+import config
+from fleet import Fleet
+from grid import GridIndex
+from sistema import Sistema
+
+
+def _flota_esquinas() -> tuple:
+    """
+    Flota con 16 taxis en las esquinas lejanas de las celdas de esquina del primer anillo
+    alrededor de la petición y uno más cerca, en línea recta, en una celda del segundo anillo.
+    El resto, lejos del radio, para que la rejilla recorra anillos (y no todas las celdas).
+    """
+    rng = random.Random(5)
+    n_lejos = 1000
+    n = n_lejos + 17
+    side = config.MAP_MAX - config.MAP_MIN
+    cell = side / GridIndex.cells_per_block_for(side, config.SEARCH_RADIUS_KM, side * side, n)
+    mid = config.MAP_MIN + side / 2
+    ox = oy = config.MAP_MIN + (int((mid - config.MAP_MIN) / cell) + 0.5) * cell
+
+    pts = []
+    while len(pts) < n_lejos:
+        x, y = rng.uniform(config.MAP_MIN, config.MAP_MAX), rng.uniform(config.MAP_MIN, config.MAP_MAX)
+        if (x - ox) ** 2 + (y - oy) ** 2 > (config.SEARCH_RADIUS_KM + cell) ** 2:
+            pts.append((x, y))
+    for sx in (-1, 1):
+        for sy in (-1, 1):
+            for fx, fy in ((1.45, 1.45), (1.40, 1.45), (1.45, 1.40), (1.40, 1.40)):
+                pts.append((ox + sx * fx * cell, oy + sy * fy * cell))
+    pts.append((ox + 1.55 * cell, oy))
+
+    fleet = Fleet(n)
+    fleet.x[:] = [p[0] for p in pts]
+    fleet.y[:] = [p[1] for p in pts]
+    return fleet, ox, oy
+
+
+def test_lote_igual_que_assign_taxi(ajustes):
+    ajustes({"ZONES_PER_SIDE": 1})
+    fleet, ox, oy = _flota_esquinas()
+
+    solo = Sistema(fleet.snapshot(), verbose=False, concurrent=False)
+    esperado = solo.assign_taxi(1, ox, oy)
+    assert esperado.index == len(fleet) - 1
+
+    ajustes({"DESPACHO_CENTRAL": True})
+    lote = Sistema(fleet.snapshot(), verbose=False, concurrent=False)
+    sol = lote.despachador.submit(1, ox, oy)
+    lote.despachador.despachar()
+    assert sol.future.result().index == esperado.index
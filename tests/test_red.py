@@ -0,0 +1,32 @@
+#red de calles: distancia suelta en línea y red compartida por configuración
+import random
+
+import config
+from fleet import Fleet
+from sistema import Sistema
+
+
+def _red(ajustes, overrides: dict):
+    ajustes({"RED_VIARIA": True, **overrides})
+    return Sistema(Fleet(0), verbose=False, concurrent=False).red
+
+
+def test_distancia_igual_que_por_nodos(ajustes):
+    #también con puntos fuera del mapa, que van al cruce del borde
+    red = _red(ajustes, {})
+    rng = random.Random(3)
+    lo, hi = config.MAP_MIN - 1.0, config.MAP_MAX + 1.0
+    for _ in range(2000):
+        ax, ay, bx, by = (rng.uniform(lo, hi) for _ in range(4))
+        na, la = red.nodo(ax, ay)
+        nb, lb = red.nodo(bx, by)
+        ref = abs(ax - bx) + abs(ay - by) if na == nb else la + red.fila(na).item(nb) + lb
+        assert abs(red.distancia(ax, ay, bx, by) - ref) < 1e-9
+
+
+def test_red_nueva_si_cambia_el_modo(ajustes):
+    #con --set RED_TABLA_MAX=... la red se rehace en vez de reutilizar la del modo anterior
+    con_tabla = _red(ajustes, {})
+    sin_tabla = _red(ajustes, {"RED_TABLA_MAX": 0})
+    assert con_tabla.tabla is not None and sin_tabla.tabla is None
+    assert sin_tabla.distancia(1.0, 2.0, 8.0, 7.5) == con_tabla.distancia(1.0, 2.0, 8.0, 7.5)
@@ -0,0 +1,49 @@
+#con la misma config.SEMILLA el día se repite entero: flota, clientes y resultados
+import pytest
+
+import config
+from fleet import Fleet
+from main import simular_eventos
+from montecarlo import corridas, simular_dia
+from sistema import Sistema, semilla_maestra
+
+
+def _dia(n_taxis: int, n_clients: int) -> dict:
+    #lo mismo que main.main con el motor de eventos, sin consola
+    semilla = semilla_maestra()
+    sistema = Sistema(Fleet.random(n_taxis, config.MAP_MIN, config.MAP_MAX, semilla),
+                      verbose=False, concurrent=False, semilla=semilla)
+    x0 = sistema.taxis.x.tolist()
+    clients = simular_eventos(sistema, n_clients)
+    return {
+        "semilla": sistema.semilla,
+        "flota": x0,
+        "servicios": sistema.stats.services,
+        "ganancias": sistema.stats.total_earnings,
+        "fallidas": sistema.series.total_failed,
+        "taxi_ganancias": sistema.taxis.earnings.tolist(),
+        "viajes": [c.trips for c in clients],
+    }
+
+
+@pytest.mark.parametrize("extra", [{}, {"DESPACHO_CENTRAL": True}])
+def test_misma_semilla_mismo_dia(ajustes, extra):
+    ajustes({"SEMILLA": 1, **extra})
+    assert _dia(60, 300) == _dia(60, 300)
+
+
+def test_semilla_distinta_otra_flota(ajustes):
+    ajustes({"SEMILLA": 1})
+    a = Fleet.random(20, config.MAP_MIN, config.MAP_MAX, semilla_maestra())
+    ajustes({"SEMILLA": 2})
+    b = Fleet.random(20, config.MAP_MIN, config.MAP_MAX, semilla_maestra())
+    assert a.x.tolist() != b.x.tolist()
+
+
+def test_montecarlo_semilla_fija_no_repite_dias():
+    #--set SEMILLA=7 hace de semilla maestra: cada corrida tiene la suya y los días no salen iguales
+    lote = corridas(1, 3, 10, 40, {"SEMILLA": 7})
+    assert len({c.seed for c in lote}) == 3
+    assert all("SEMILLA" not in c.overrides for c in lote)
+    assert [c.seed for c in lote] == [c.seed for c in corridas(7, 3, 10, 40)]
+    assert len({simular_dia(c)["earnings"] for c in lote}) > 1